@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+志愿抽签选课离线分配
+志愿提交截止后，为指定学期一次性分配名额并批量写入选课记录
+
+用法: python allocate_wishes.py --year 2024 --semester 1 [--force] [--dry-run]
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.services.exceptions import ServiceError
+from app.services.lottery_service import LotteryService
+
+def allocate_wishes(args):
+    """分配学期志愿"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            result = LotteryService.allocate_round(
+                args.year, args.semester, force=args.force, dry_run=args.dry_run
+            )
+        except ServiceError as e:
+            db.session.rollback()
+            print(f"志愿分配失败: {e.message}")
+            return 1
+    
+    print(f"{result['academic_year']} 学年第 {'一' if result['semester'] else '二'} 学期志愿分配"
+          f"{'（试算，未写入）' if result['dry_run'] else '完成'}")
+    print(f"分配顺序: {result['policy']}，随机种子 {result['seed']}")
+    print(f"学生 {result['student_count']} 人，志愿 {result['wish_count']} 条，录取 {result['admitted_count']} 条，"
+          f"第一志愿录取率 {result['first_choice_rate']:.1%}")
+    for name, count in sorted(result['results'].items(), key=lambda item: -item[1]):
+        print(f"  {name}: {count}")
+    timings = result['timings']
+    print(f"耗时: 加载 {timings['load_ms']} ms，分配 {timings['allocate_ms']} ms"
+          + (f"，写入 {timings['write_ms']} ms" if 'write_ms' in timings else ''))
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='志愿抽签选课离线分配')
+    parser.add_argument('--year', required=True, help='学年，如 2024')
+    parser.add_argument('--semester', type=int, required=True, choices=(0, 1), help='学期：1 第一学期 / 0 第二学期')
+    parser.add_argument('--force', action='store_true', help='未到截止时间也立即分配')
+    parser.add_argument('--dry-run', action='store_true', help='只计算分配结果，不写数据库')
+    sys.exit(allocate_wishes(parser.parse_args()))
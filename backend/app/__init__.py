@@ -1,76 +1,129 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
-from flask_cors import CORS
-from flasgger import Swagger
-from dotenv import load_dotenv
-import os
-
-# 加载环境变量
-load_dotenv()
-
-# 初始化扩展
-db = SQLAlchemy()
-jwt = JWTManager()
-swagger = Swagger()
-
-def create_app():
-    app = Flask(__name__)
-    
-    # 配置
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string-change-in-production')
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False  # Token不过期，实际生产环境建议设置过期时间    # 数据库配置 - 临时使用 SQLite
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///course_selection.db'
-    # MySQL 配置（备用）
-    # app.config['SQLALCHEMY_DATABASE_URI'] = (
-    #     f"mysql+pymysql://{os.getenv('DB_USER', 'root')}:"
-    #     f"{os.getenv('DB_PASSWORD', 'password')}@"
-    #     f"{os.getenv('DB_HOST', 'localhost')}:"
-    #     f"{os.getenv('DB_PORT', '3306')}/"
-    #     f"{os.getenv('DB_NAME', 'course_selection_system')}"
-    #     f"?charset=utf8mb4&auth_plugin=mysql_native_password&connect_timeout=10"
-    # )
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-      # 初始化扩展
-    db.init_app(app)
-    jwt.init_app(app)
-    CORS(app)
-      # 配置Swagger
-    swagger_template = {
-        "swagger": "2.0",
-        "info": {
-            "title": "选课系统 API",
-            "description": "基于Flask的选课管理系统API文档",
-            "version": "1.0.0"
-        },
-        "securityDefinitions": {
-            "Bearer": {
-                "type": "apiKey",
-                "name": "Authorization",
-                "in": "header",
-                "description": "JWT Token格式: Bearer <token>"
-            }
-        },
-        "security": [
-            {
-                "Bearer": []
-            }
-        ]
-    }
-    swagger = Swagger(app, template=swagger_template)
-    
-    # 注册蓝图
-    from .routes.auth import auth_bp
-    from .routes.admin import admin_bp
-    from .routes.teacher import teacher_bp
-    from .routes.student import student_bp
-    from .routes.common import common_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(admin_bp, url_prefix='/api/admin')
-    app.register_blueprint(teacher_bp, url_prefix='/api/teacher')
-    app.register_blueprint(student_bp, url_prefix='/api/student')
-    app.register_blueprint(common_bp, url_prefix='/api/common')
-    
-    return app
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager
+from flask_cors import CORS
+from flasgger import Swagger
+from dotenv import load_dotenv
+import os
+from datetime import timedelta
+
+# 加载环境变量
+load_dotenv()
+
+# 初始化扩展
+db = SQLAlchemy()
+jwt = JWTManager()
+swagger = Swagger()
+
+def create_app(config=None):
+    app = Flask(__name__)
+    
+    # 配置
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string-change-in-production')
+    # 访问令牌短期有效，过期后用刷新令牌换取；修改密码、删除用户时吊销已签发的令牌
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', '30')))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '7')))
+    # 清理过期令牌吊销记录的周期（秒），0 表示不清理
+    app.config['REVOCATION_COMPACT_INTERVAL'] = int(os.getenv('REVOCATION_COMPACT_INTERVAL', '3600'))
+    # 数据库配置 - 临时使用 SQLite
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///course_selection.db'
+    # MySQL 配置（备用）
+    # app.config['SQLALCHEMY_DATABASE_URI'] = (
+    #     f"mysql+pymysql://{os.getenv('DB_USER', 'root')}:"
+    #     f"{os.getenv('DB_PASSWORD', 'password')}@"
+    #     f"{os.getenv('DB_HOST', 'localhost')}:"
+    #     f"{os.getenv('DB_PORT', '3306')}/"
+    #     f"{os.getenv('DB_NAME', 'course_selection_system')}"
+    #     f"?charset=utf8mb4&auth_plugin=mysql_native_password&connect_timeout=10"
+    # )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 进程间共享状态（目录版本号等）：memory:// 或 sqlite:///文件路径
+    app.config['SHARED_STORE'] = os.getenv('SHARED_STORE', 'memory://')
+    # 开课人数（及其缓存）与选课记录的对账周期（秒），0 表示不启动后台对账
+    app.config['SEAT_RECONCILE_INTERVAL'] = int(os.getenv('SEAT_RECONCILE_INTERVAL', '60'))
+    # 成绩排名计算方式：auto 按数据库是否支持窗口函数自动选择，sql 或 columnar 强制指定
+    app.config['RANKING_ENGINE'] = os.getenv('RANKING_ENGINE', 'auto')
+    # 自动排课求解的并行进程数，0 表示使用全部 CPU 核
+    app.config['SCHEDULER_WORKERS'] = int(os.getenv('SCHEDULER_WORKERS', '0'))
+    # 志愿抽签选课每个学生每学期最多填报的志愿数
+    app.config['WISHLIST_MAX_LENGTH'] = int(os.getenv('WISHLIST_MAX_LENGTH', '10'))
+    # 选课人数实时推送：每秒最多推送的批次数，以及从共享存储补齐其他 worker 变化的周期（秒，0 表示不补齐）
+    app.config['SEAT_STREAM_RATE'] = float(os.getenv('SEAT_STREAM_RATE', '2'))
+    app.config['SEAT_STREAM_RESYNC'] = float(os.getenv('SEAT_STREAM_RESYNC', '5'))
+    # 实时推送连接凭证（代替 URL 中的访问令牌，一次性使用）的有效期（秒）
+    app.config['SEAT_STREAM_TICKET_TTL'] = int(os.getenv('SEAT_STREAM_TICKET_TTL', '30'))
+    # 选课/退课准入控制：每个用户每秒补充的令牌数（0 表示不限流）与令牌桶容量
+    app.config['RATE_LIMIT_RATE'] = float(os.getenv('RATE_LIMIT_RATE', '2'))
+    app.config['RATE_LIMIT_BURST'] = float(os.getenv('RATE_LIMIT_BURST', '5'))
+    # 每个 worker 同时执行的写请求数（0 表示不限制）、排队上限与排队等待时间（秒）
+    app.config['WRITE_CONCURRENCY'] = int(os.getenv('WRITE_CONCURRENCY', '4'))
+    app.config['WRITE_QUEUE_SIZE'] = int(os.getenv('WRITE_QUEUE_SIZE', '64'))
+    app.config['WRITE_QUEUE_TIMEOUT'] = float(os.getenv('WRITE_QUEUE_TIMEOUT', '2'))
+    # 写接口幂等键（Idempotency-Key）记录的保留时间，以及重复请求等待首个请求完成的最长时间（秒）
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv('IDEMPOTENCY_TTL', '3600'))
+    app.config['IDEMPOTENCY_WAIT'] = float(os.getenv('IDEMPOTENCY_WAIT', '10'))
+    # bcrypt 成本因子：所有密码（包括批量开通的初始密码）都按此计算，
+    # 调整后用户下次登录时按新成本透明地重新计算
+    app.config['BCRYPT_ROUNDS'] = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    # 登录密码校验：bcrypt 进程池大小（0 表示 CPU 核数，-1 表示在请求线程内计算）、
+    # 排队上限与等待超时（秒），以及校验成功缓存的有效期（秒）与条数上限
+    app.config['PASSWORD_WORKERS'] = int(os.getenv('PASSWORD_WORKERS', '0'))
+    app.config['PASSWORD_QUEUE_LIMIT'] = int(os.getenv('PASSWORD_QUEUE_LIMIT', '64'))
+    app.config['PASSWORD_TIMEOUT'] = float(os.getenv('PASSWORD_TIMEOUT', '10'))
+    app.config['PASSWORD_CACHE_TTL'] = int(os.getenv('PASSWORD_CACHE_TTL', '300'))
+    app.config['PASSWORD_CACHE_SIZE'] = int(os.getenv('PASSWORD_CACHE_SIZE', '10000'))
+    # 登录用户资料缓存（访问令牌只携带用户ID、类型与版本号）：有效期（秒）与条数上限，0 表示不缓存
+    app.config['PRINCIPAL_CACHE_TTL'] = int(os.getenv('PRINCIPAL_CACHE_TTL', '300'))
+    app.config['PRINCIPAL_CACHE_SIZE'] = int(os.getenv('PRINCIPAL_CACHE_SIZE', '10000'))
+    # 允许调用方（脚本、压测）覆盖默认配置
+    if config:
+        app.config.update(config)
+      # 初始化扩展
+    db.init_app(app)
+    from .services.shared_store import init_shared_store
+    init_shared_store(app)
+    from .routes.admission import init_admission
+    init_admission(app)
+    jwt.init_app(app)
+    from .services.revocation_service import TokenRevocation
+    jwt.token_in_blocklist_loader(TokenRevocation.is_revoked)
+    CORS(app)
+      # 配置Swagger
+    swagger_template = {
+        "swagger": "2.0",
+        "info": {
+            "title": "选课系统 API",
+            "description": "基于Flask的选课管理系统API文档",
+            "version": "1.0.0"
+        },
+        "securityDefinitions": {
+            "Bearer": {
+                "type": "apiKey",
+                "name": "Authorization",
+                "in": "header",
+                "description": "JWT Token格式: Bearer <token>"
+            }
+        },
+        "security": [
+            {
+                "Bearer": []
+            }
+        ]
+    }
+    swagger = Swagger(app, template=swagger_template)
+    
+    # 注册蓝图
+    from .routes.auth import auth_bp
+    from .routes.admin import admin_bp
+    from .routes.teacher import teacher_bp
+    from .routes.student import student_bp
+    from .routes.common import common_bp
+    
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(teacher_bp, url_prefix='/api/teacher')
+    app.register_blueprint(student_bp, url_prefix='/api/student')
+    app.register_blueprint(common_bp, url_prefix='/api/common')
+    
+    return app
@@ -1,142 +1,236 @@
-from app import db
-from datetime import datetime, time
-import bcrypt
-
-# 定义课程先修关系的关联表
-course_prerequisites = db.Table('course_prerequisites',
-    db.Column('course_id', db.String(5), db.ForeignKey('courses.course_id'), primary_key=True),
-    db.Column('prerequisite_id', db.String(5), db.ForeignKey('courses.course_id'), primary_key=True)
-)
-
-class Admin(db.Model):
-    __tablename__ = 'admins'
-    
-    admin_id = db.Column(db.String(10), primary_key=True)
-    username = db.Column(db.String(20), unique=True, nullable=False)
-    password = db.Column(db.String(255), nullable=False)
-    name = db.Column(db.String(20), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    def set_password(self, password):
-        """设置密码哈希"""
-        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    def check_password(self, password):
-        """检查密码"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
-
-class Class(db.Model):
-    __tablename__ = 'classes'
-    
-    class_id = db.Column(db.String(4), primary_key=True)
-    class_name = db.Column(db.String(20), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # 关系
-    students = db.relationship('Student', backref='class_info', lazy=True)
-
-class Student(db.Model):
-    __tablename__ = 'students'
-    
-    student_id = db.Column(db.String(12), primary_key=True)
-    name = db.Column(db.String(5), nullable=False)
-    gender = db.Column(db.String(1), nullable=False)
-    age = db.Column(db.Integer, nullable=False)
-    hometown = db.Column(db.String(20), nullable=False)
-    total_credits = db.Column(db.Float, default=0)
-    password = db.Column(db.String(255), nullable=False)
-    class_id = db.Column(db.String(4), db.ForeignKey('classes.class_id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # 关系
-    enrollments = db.relationship('Enrollment', backref='student', lazy=True, cascade='all, delete-orphan')
-    
-    def set_password(self, password):
-        """设置密码哈希"""
-        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    def check_password(self, password):
-        """检查密码"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
-
-class Course(db.Model):
-    __tablename__ = 'courses'
-    
-    course_id = db.Column(db.String(5), primary_key=True)
-    course_name = db.Column(db.String(20), nullable=False)
-    hours = db.Column(db.Integer, nullable=False)
-    exam_type = db.Column(db.Boolean, nullable=False)  # True: 考试, False: 考查
-    credits = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # 关系
-    offerings = db.relationship('CourseOffering', backref='course', lazy=True, cascade='all, delete-orphan')
-    
-    # 先修课程关系：此课程需要的先修课程
-    prerequisites = db.relationship(
-        'Course',
-        secondary=course_prerequisites,
-        primaryjoin=course_id == course_prerequisites.c.course_id,
-        secondaryjoin=course_id == course_prerequisites.c.prerequisite_id,
-        backref=db.backref('required_for', lazy='dynamic'),  # 反向关系：此课程是哪些课程的先修课
-        lazy='dynamic'
-    )
-
-class Teacher(db.Model):
-    __tablename__ = 'teachers'
-    
-    teacher_id = db.Column(db.String(5), primary_key=True)
-    name = db.Column(db.String(20), nullable=False)
-    gender = db.Column(db.String(1), nullable=False)
-    age = db.Column(db.Integer, nullable=False)
-    title = db.Column(db.String(10), nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
-    password = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # 关系
-    offerings = db.relationship('CourseOffering', backref='teacher', lazy=True, cascade='all, delete-orphan')
-    
-    def set_password(self, password):
-        """设置密码哈希"""
-        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    def check_password(self, password):
-        """检查密码"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
-
-class CourseOffering(db.Model):
-    __tablename__ = 'course_offerings'
-    
-    offering_id = db.Column(db.String(15), primary_key=True)
-    course_id = db.Column(db.String(5), db.ForeignKey('courses.course_id'), nullable=False)
-    teacher_id = db.Column(db.String(5), db.ForeignKey('teachers.teacher_id'), nullable=False)
-    academic_year = db.Column(db.String(4), nullable=False)
-    semester = db.Column(db.Boolean, nullable=False)  # True: 第一学期, False: 第二学期
-    max_students = db.Column(db.Integer, default=50)
-    current_students = db.Column(db.Integer, default=0)
-    # 新增字段：课程时间和地点
-    day_of_week = db.Column(db.Integer, nullable=True)  # 1-7 代表周一到周日
-    start_time = db.Column(db.Time, nullable=True)  # 开始时间
-    end_time = db.Column(db.Time, nullable=True)  # 结束时间
-    location = db.Column(db.String(50), nullable=True)  # 上课地点
-    status = db.Column(db.String(20), default='开放选课', nullable=False)  # 课程状态
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # 关系
-    enrollments = db.relationship('Enrollment', backref='offering', lazy=True, cascade='all, delete-orphan')
-
-class Enrollment(db.Model):
-    __tablename__ = 'enrollments'
-    
-    offering_id = db.Column(db.String(15), db.ForeignKey('course_offerings.offering_id'), primary_key=True)
-    student_id = db.Column(db.String(12), db.ForeignKey('students.student_id'), primary_key=True)
-    score = db.Column(db.Integer, nullable=True)
-    enrollment_date = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+from app import db
+from datetime import datetime, time
+from flask import current_app, has_app_context
+import bcrypt
+
+# bcrypt 默认成本因子（与 bcrypt.gensalt() 的默认值一致）
+DEFAULT_BCRYPT_ROUNDS = 12
+
+def bcrypt_rounds():
+    """当前环境配置的 bcrypt 成本因子（BCRYPT_ROUNDS），应用上下文外使用默认值"""
+    if has_app_context():
+        return current_app.config.get('BCRYPT_ROUNDS', DEFAULT_BCRYPT_ROUNDS)
+    return DEFAULT_BCRYPT_ROUNDS
+
+# 定义课程先修关系的关联表
+course_prerequisites = db.Table('course_prerequisites',
+    db.Column('course_id', db.String(5), db.ForeignKey('courses.course_id'), primary_key=True),
+    db.Column('prerequisite_id', db.String(5), db.ForeignKey('courses.course_id'), primary_key=True)
+)
+
+class Admin(db.Model):
+    __tablename__ = 'admins'
+    
+    admin_id = db.Column(db.String(10), primary_key=True)
+    username = db.Column(db.String(20), unique=True, nullable=False)
+    password = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def set_password(self, password):
+        """设置密码哈希"""
+        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds())).decode('utf-8')
+    
+    def check_password(self, password):
+        """检查密码"""
+        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+
+class Class(db.Model):
+    __tablename__ = 'classes'
+    
+    class_id = db.Column(db.String(4), primary_key=True)
+    class_name = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    students = db.relationship('Student', backref='class_info', lazy=True)
+
+class Student(db.Model):
+    __tablename__ = 'students'
+    
+    student_id = db.Column(db.String(12), primary_key=True)
+    name = db.Column(db.String(5), nullable=False)
+    gender = db.Column(db.String(1), nullable=False)
+    age = db.Column(db.Integer, nullable=False)
+    hometown = db.Column(db.String(20), nullable=False)
+    total_credits = db.Column(db.Float, default=0)
+    password = db.Column(db.String(255), nullable=False)
+    class_id = db.Column(db.String(4), db.ForeignKey('classes.class_id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    enrollments = db.relationship('Enrollment', backref='student', lazy=True, cascade='all, delete-orphan')
+    credit_ledger = db.relationship('StudentCreditLedger', backref='student', lazy=True, cascade='all, delete-orphan')
+    wishes = db.relationship('EnrollmentWish', backref='student', lazy=True, cascade='all, delete-orphan')
+    waitlist_entries = db.relationship('WaitlistEntry', backref='student', lazy=True, cascade='all, delete-orphan')
+    
+    def set_password(self, password):
+        """设置密码哈希"""
+        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds())).decode('utf-8')
+    
+    def check_password(self, password):
+        """检查密码"""
+        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+
+class Course(db.Model):
+    __tablename__ = 'courses'
+    
+    course_id = db.Column(db.String(5), primary_key=True)
+    course_name = db.Column(db.String(20), nullable=False)
+    hours = db.Column(db.Integer, nullable=False)
+    exam_type = db.Column(db.Boolean, nullable=False)  # True: 考试, False: 考查
+    credits = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    offerings = db.relationship('CourseOffering', backref='course', lazy=True, cascade='all, delete-orphan')
+    
+    # 先修课程关系：此课程需要的先修课程
+    prerequisites = db.relationship(
+        'Course',
+        secondary=course_prerequisites,
+        primaryjoin=course_id == course_prerequisites.c.course_id,
+        secondaryjoin=course_id == course_prerequisites.c.prerequisite_id,
+        backref=db.backref('required_for', lazy='dynamic'),  # 反向关系：此课程是哪些课程的先修课
+        lazy='dynamic'
+    )
+
+class Teacher(db.Model):
+    __tablename__ = 'teachers'
+    
+    teacher_id = db.Column(db.String(5), primary_key=True)
+    name = db.Column(db.String(20), nullable=False)
+    gender = db.Column(db.String(1), nullable=False)
+    age = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(10), nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    offerings = db.relationship('CourseOffering', backref='teacher', lazy=True, cascade='all, delete-orphan')
+    
+    def set_password(self, password):
+        """设置密码哈希"""
+        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds())).decode('utf-8')
+    
+    def check_password(self, password):
+        """检查密码"""
+        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+
+class CourseOffering(db.Model):
+    __tablename__ = 'course_offerings'
+    
+    offering_id = db.Column(db.String(15), primary_key=True)
+    course_id = db.Column(db.String(5), db.ForeignKey('courses.course_id'), nullable=False)
+    teacher_id = db.Column(db.String(5), db.ForeignKey('teachers.teacher_id'), nullable=False)
+    academic_year = db.Column(db.String(4), nullable=False)
+    semester = db.Column(db.Boolean, nullable=False)  # True: 第一学期, False: 第二学期
+    max_students = db.Column(db.Integer, default=50)
+    current_students = db.Column(db.Integer, default=0)
+    # 新增字段：课程时间和地点
+    day_of_week = db.Column(db.Integer, nullable=True)  # 1-7 代表周一到周日
+    start_time = db.Column(db.Time, nullable=True)  # 开始时间
+    end_time = db.Column(db.Time, nullable=True)  # 结束时间
+    location = db.Column(db.String(50), nullable=True)  # 上课地点
+    status = db.Column(db.String(20), default='开放选课', nullable=False)  # 课程状态
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    enrollments = db.relationship('Enrollment', backref='offering', lazy=True, cascade='all, delete-orphan')
+    wishes = db.relationship('EnrollmentWish', backref='offering', lazy=True, cascade='all, delete-orphan')
+    waitlist_entries = db.relationship('WaitlistEntry', backref='offering', lazy=True, cascade='all, delete-orphan')
+
+class Enrollment(db.Model):
+    __tablename__ = 'enrollments'
+    
+    offering_id = db.Column(db.String(15), db.ForeignKey('course_offerings.offering_id'), primary_key=True)
+    student_id = db.Column(db.String(12), db.ForeignKey('students.student_id'), primary_key=True, index=True)
+    score = db.Column(db.Integer, nullable=True)
+    enrollment_date = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StudentCreditLedger(db.Model):
+    """学生学分/成绩台账：按学生、学年、学期预先汇总的选课与成绩数据"""
+    __tablename__ = 'student_credit_ledger'
+    
+    student_id = db.Column(db.String(12), db.ForeignKey('students.student_id'), primary_key=True)
+    academic_year = db.Column(db.String(4), primary_key=True)
+    semester = db.Column(db.Boolean, primary_key=True)
+    enrolled_courses = db.Column(db.Integer, nullable=False, default=0)  # 选课门数
+    enrolled_credits = db.Column(db.Float, nullable=False, default=0)  # 选课学分
+    scored_courses = db.Column(db.Integer, nullable=False, default=0)  # 已出成绩门数
+    scored_credits = db.Column(db.Float, nullable=False, default=0)  # 已出成绩学分
+    score_credit_sum = db.Column(db.Float, nullable=False, default=0)  # Σ 成绩×学分（已出成绩）
+    passed_courses = db.Column(db.Integer, nullable=False, default=0)  # 及格门数
+    earned_credits = db.Column(db.Float, nullable=False, default=0)  # 已获学分（及格课程）
+    passed_score_credit_sum = db.Column(db.Float, nullable=False, default=0)  # Σ 成绩×学分（及格课程）
+    # 成绩等级分布
+    grade_excellent = db.Column(db.Integer, nullable=False, default=0)  # 90-100
+    grade_good = db.Column(db.Integer, nullable=False, default=0)  # 80-89
+    grade_fair = db.Column(db.Integer, nullable=False, default=0)  # 70-79
+    grade_pass = db.Column(db.Integer, nullable=False, default=0)  # 60-69
+    grade_fail = db.Column(db.Integer, nullable=False, default=0)  # <60
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PreferenceRound(db.Model):
+    """志愿选课轮次：学期内先收集志愿，截止后统一抽签分配名额"""
+    __tablename__ = 'preference_rounds'
+    
+    academic_year = db.Column(db.String(4), primary_key=True)
+    semester = db.Column(db.Boolean, primary_key=True)
+    opens_at = db.Column(db.DateTime, nullable=False)  # 志愿提交开始时间
+    closes_at = db.Column(db.DateTime, nullable=False)  # 志愿提交截止时间
+    policy = db.Column(db.String(10), nullable=False, default='random')  # 分配顺序：random 随机 / priority 高年级、高学分优先
+    seed = db.Column(db.Integer, nullable=False, default=0)  # 抽签随机种子，便于复现
+    status = db.Column(db.String(20), nullable=False, default='收集志愿')  # 收集志愿 / 已分配
+    allocated_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class EnrollmentWish(db.Model):
+    """学生选课志愿（按志愿顺序排列，提交时不占用名额）"""
+    __tablename__ = 'enrollment_wishes'
+    
+    student_id = db.Column(db.String(12), db.ForeignKey('students.student_id'), primary_key=True)
+    offering_id = db.Column(db.String(15), db.ForeignKey('course_offerings.offering_id'), primary_key=True)
+    academic_year = db.Column(db.String(4), nullable=False)
+    semester = db.Column(db.Boolean, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 志愿顺序，1 为第一志愿
+    result = db.Column(db.String(20), nullable=True)  # 分配结果，分配前为空
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_enrollment_wishes_term', 'academic_year', 'semester'),
+    )
+
+class WaitlistEntry(db.Model):
+    """候补名单：课程满员时按加入顺序排队，有人退课时自动递补"""
+    __tablename__ = 'waitlist_entries'
+    
+    entry_id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # 自增序号即排队顺序
+    offering_id = db.Column(db.String(15), db.ForeignKey('course_offerings.offering_id'), nullable=False)
+    student_id = db.Column(db.String(12), db.ForeignKey('students.student_id'), nullable=False, index=True)
+    status = db.Column(db.String(10), nullable=False, default='等待中')  # 等待中 / 已递补 / 已失效
+    note = db.Column(db.String(50), nullable=True)  # 失效原因
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('offering_id', 'student_id', name='uq_waitlist_offering_student'),
+        db.Index('idx_waitlist_queue', 'offering_id', 'status', 'entry_id'),
+    )
+
+class RevokedToken(db.Model):
+    """令牌吊销记录：key 为单个令牌的 jti，或 '用户类型:用户ID'（吊销该用户此前签发的全部令牌）"""
+    __tablename__ = 'revoked_tokens'
+    
+    key = db.Column(db.String(64), primary_key=True)
+    revoked_at = db.Column(db.BigInteger, nullable=False, index=True)  # 吊销时间（Unix 毫秒），早于它签发的令牌失效
+    expires_at = db.Column(db.Integer, nullable=False, index=True)  # 受影响的令牌全部过期后即可清理
@@ -0,0 +1,195 @@
+"""
+写接口准入控制
+1. 按 JWT 身份的令牌桶限流：每个用户每秒补充 RATE_LIMIT_RATE 个令牌、最多积攒
+   RATE_LIMIT_BURST 个，桶保存在共享存储中（多 worker 部署时使用 SQLite 共享存储即全局生效）
+2. 写接口并发上限：每个 worker 同时最多 WRITE_CONCURRENCY 个写请求访问数据库，
+   其余最多 WRITE_QUEUE_SIZE 个排队等待 WRITE_QUEUE_TIMEOUT 秒，队列已满或等待超时
+   立即返回 429 与 Retry-After，避免重试风暴把唯一的数据库写连接压垮
+"""
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity
+
+from app.services.shared_store import get_store
+
+RATE_LIMIT_PREFIX = 'ratelimit:'
+
+# 估算排队等待时间用的平均处理耗时的平滑系数
+SERVICE_TIME_ALPHA = 0.1
+
+
+class _BucketStats:
+    """单个准入桶（一组接口）的计数"""
+
+    __slots__ = ('admitted', 'rate_limited', 'queue_full', 'queue_timeout',
+                 'queued', 'in_flight', 'max_queued', 'wait_ms')
+
+    def __init__(self):
+        self.admitted = 0
+        self.rate_limited = 0
+        self.queue_full = 0
+        self.queue_timeout = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queued = 0
+        self.wait_ms = 0.0
+
+    def as_dict(self):
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result['wait_ms'] = round(self.wait_ms, 1)
+        return result
+
+
+class AdmissionControl:
+    """一个 worker 的写接口准入控制（挂在 app.extensions['admission']）"""
+
+    def __init__(self, config):
+        self.rate = float(config.get('RATE_LIMIT_RATE', 0))
+        self.burst = max(float(config.get('RATE_LIMIT_BURST', 1)), 1)
+        self.concurrency = int(config.get('WRITE_CONCURRENCY', 0))
+        self.queue_size = int(config.get('WRITE_QUEUE_SIZE', 0))
+        self.queue_timeout = float(config.get('WRITE_QUEUE_TIMEOUT', 0))
+        self._slots = threading.BoundedSemaphore(self.concurrency) if self.concurrency > 0 else None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._service_time = 0.05
+        self._stats = {}
+
+    def _bucket(self, name):
+        stats = self._stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(name, _BucketStats())
+        return stats
+
+    def take_token(self, name, identity):
+        """
+        从用户的令牌桶取一个令牌
+
+        Returns:
+            float: 0 表示放行；否则为建议的重试等待秒数
+        """
+        if self.rate <= 0 or identity is None:
+            return 0.0
+        wait = get_store().take_token(f'{RATE_LIMIT_PREFIX}{name}:{identity}', self.rate, self.burst)
+        if wait:
+            with self._lock:
+                self._bucket(name).rate_limited += 1
+        return wait
+
+    def acquire(self, name):
+        """
+        占用一个写并发名额，必要时在有界队列中等待
+
+        Returns:
+            float: 0 表示已占用名额；否则为建议的重试等待秒数
+        """
+        stats = self._bucket(name)
+        if self._slots is None:
+            with self._lock:
+                stats.admitted += 1
+                stats.in_flight += 1
+            return 0.0
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                stats.admitted += 1
+                stats.in_flight += 1
+            return 0.0
+
+        with self._lock:
+            if self._queued >= self.queue_size:
+                stats.queue_full += 1
+                return self._estimated_wait()
+            self._queued += 1
+            stats.queued += 1
+            stats.max_queued = max(stats.max_queued, self._queued)
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        waited = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._queued -= 1
+            stats.wait_ms += waited
+            if not acquired:
+                stats.queue_timeout += 1
+                return self._estimated_wait()
+            stats.admitted += 1
+            stats.in_flight += 1
+        return 0.0
+
+    def release(self, name, elapsed):
+        """归还写并发名额，并更新平均处理耗时"""
+        with self._lock:
+            self._bucket(name).in_flight -= 1
+            self._service_time += SERVICE_TIME_ALPHA * (elapsed - self._service_time)
+        if self._slots is not None:
+            self._slots.release()
+
+    def _estimated_wait(self):
+        # 排在队列前面的请求按平均处理耗时估算清空所需时间（调用方已持有锁）
+        slots = max(self.concurrency, 1)
+        return (self._queued + slots) * self._service_time / slots
+
+    def stats(self):
+        """各准入桶的计数与当前队列状态"""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'config': {
+                    'rate': self.rate,
+                    'burst': self.burst,
+                    'concurrency': self.concurrency,
+                    'queue_size': self.queue_size,
+                    'queue_timeout': self.queue_timeout
+                },
+                'queued': self._queued,
+                'avg_service_ms': round(self._service_time * 1000, 2),
+                'buckets': {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+            }
+
+
+def init_admission(app):
+    """为应用创建准入控制实例"""
+    app.extensions['admission'] = AdmissionControl(app.config)
+
+
+def get_admission():
+    """获取当前应用的准入控制"""
+    return current_app.extensions['admission']
+
+
+def _too_many(message, wait):
+    response = jsonify({'message': message, 'retry_after': round(wait, 2)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(math.ceil(wait), 1))
+    return response
+
+
+def admission_control(name):
+    """
+    写接口准入控制装饰器（放在角色装饰器之后）
+
+    Args:
+        name: 准入桶名称，同名接口共用用户令牌桶与计数
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            admission = get_admission()
+            wait = admission.take_token(name, get_jwt_identity())
+            if wait:
+                return _too_many('操作过于频繁，请稍后再试', wait)
+            wait = admission.acquire(name)
+            if wait:
+                return _too_many('选课人数过多，系统繁忙，请稍后再试', wait)
+            started = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                admission.release(name, time.perf_counter() - started)
+        return decorated_function
+    return decorator
@@ -1,263 +1,268 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required, get_jwt
-from functools import wraps
-from app import db
-from app.models import Admin, Student, Teacher
-
-auth_bp = Blueprint('auth', __name__)
-
-def admin_required(f):
-    """管理员权限装饰器"""
-    @wraps(f)
-    @jwt_required()
-    def decorated_function(*args, **kwargs):
-        try:
-            claims = get_jwt()
-            if claims.get('type') != 'admin':
-                return jsonify({'message': '需要管理员权限'}), 403
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': '身份验证失败'}), 401
-    return decorated_function
-
-def teacher_required(f):
-    """教师权限装饰器"""
-    @wraps(f)
-    @jwt_required()
-    def decorated_function(*args, **kwargs):
-        try:
-            claims = get_jwt()
-            if claims.get('type') != 'teacher':
-                return jsonify({'message': '需要教师权限'}), 403
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': '身份验证失败'}), 401
-    return decorated_function
-
-def student_required(f):
-    """学生权限装饰器"""
-    @wraps(f)
-    @jwt_required()
-    def decorated_function(*args, **kwargs):
-        try:
-            claims = get_jwt()
-            if claims.get('type') != 'student':
-                return jsonify({'message': '需要学生权限'}), 403
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': '身份验证失败'}), 401
-    return decorated_function
-
-@auth_bp.route('/login', methods=['POST'])
-def login():
-    """
-    用户登录接口
-    ---
-    tags:
-      - 用户认证
-    summary: 用户登录
-    description: 支持管理员、教师、学生三种用户类型的统一登录接口
-    parameters:
-      - name: body
-        in: body
-        required: true
-        schema:
-          type: object
-          required:
-            - username
-            - password
-            - user_type
-          properties:
-            username:
-              type: string
-              description: 用户名（管理员用户名/教师工号/学号）
-              example: "admin"
-            password:
-              type: string
-              description: 登录密码
-              example: "123456"
-            user_type:
-              type: string
-              enum: [admin, teacher, student]
-              description: 用户类型
-              example: "admin"
-    responses:
-      200:
-        description: 登录成功
-        schema:
-          type: object
-          properties:
-            message:
-              type: string
-              example: "登录成功"
-            access_token:
-              type: string
-              description: JWT访问令牌
-              example: "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
-            user:
-              type: object
-              description: 用户信息
-              properties:
-                id:
-                  type: string
-                  description: 用户ID
-                name:
-                  type: string
-                  description: 用户姓名
-                type:
-                  type: string
-                  description: 用户类型
-      400:
-        description: 请求参数错误
-        schema:
-          type: object
-          properties:
-            message:
-              type: string
-              example: "用户名、密码和用户类型不能为空"
-      401:
-        description: 用户名或密码错误
-        schema:
-          type: object
-          properties:
-            message:
-              type: string
-              example: "用户名或密码错误"
-      500:
-        description: 服务器内部错误
-        schema:
-          type: object
-          properties:
-            message:
-              type: string
-              example: "登录失败: 详细错误信息"
-    """
-    data = request.get_json()
-    
-    if not data or not data.get('username') or not data.get('password') or not data.get('user_type'):
-        return jsonify({'message': '用户名、密码和用户类型不能为空'}), 400
-    
-    username = data['username']
-    password = data['password']
-    user_type = data['user_type']  # 'admin', 'teacher', 'student'
-    
-    user = None
-    user_info = {}
-    
-    try:
-        if user_type == 'admin':
-            user = Admin.query.filter_by(username=username).first()
-            if user and user.check_password(password):
-                user_info = {
-                    'id': user.admin_id,
-                    'name': user.name,
-                    'username': user.username,
-                    'type': 'admin'
-                }
-        
-        elif user_type == 'teacher':
-            user = Teacher.query.filter_by(teacher_id=username).first()
-            if user and user.check_password(password):
-                user_info = {
-                    'id': user.teacher_id,
-                    'name': user.name,
-                    'gender': user.gender,
-                    'age': user.age,
-                    'title': user.title,
-                    'phone': user.phone,
-                    'type': 'teacher'
-                }
-        elif user_type == 'student':
-            user = Student.query.filter_by(student_id=username).first()
-            if user and user.check_password(password):
-                user_info = {
-                    'id': user.student_id,
-                    'name': user.name,
-                    'gender': user.gender,
-                    'age': user.age,
-                    'hometown': user.hometown,
-                    'total_credits': user.total_credits,
-                    'class_id': user.class_id,
-                    'type': 'student'
-                }
-                # 安全地获取班级名称
-                try:
-                    if user.class_info:
-                        user_info['class_name'] = user.class_info.class_name
-                    else:
-                        user_info['class_name'] = ''
-                except:
-                    user_info['class_name'] = ''
-        
-        if user and user_info:
-            # 创建访问令牌，使用用户ID作为identity
-            access_token = create_access_token(
-                identity=user_info['id'],
-                additional_claims={'type': user_type, 'user_data': user_info}
-            )
-            
-            return jsonify({
-                'message': '登录成功',
-                'access_token': access_token,
-                'user': user_info
-            }), 200
-        else:
-            return jsonify({'message': '用户名或密码错误'}), 401
-    
-    except Exception as e:
-        return jsonify({'message': f'登录失败: {str(e)}'}), 500
-
-@auth_bp.route('/change-password', methods=['POST'])
-@jwt_required()
-def change_password():
-    """修改密码"""
-    current_user_id = get_jwt_identity()
-    claims = get_jwt()
-    user_type = claims.get('type')
-    
-    data = request.get_json()
-    
-    if not data or not data.get('old_password') or not data.get('new_password'):
-        return jsonify({'message': '旧密码和新密码不能为空'}), 400
-    
-    old_password = data['old_password']
-    new_password = data['new_password']
-    
-    try:
-        user = None
-        
-        if user_type == 'admin':
-            user = Admin.query.filter_by(admin_id=current_user_id).first()
-        elif user_type == 'teacher':
-            user = Teacher.query.filter_by(teacher_id=current_user_id).first()
-        elif user_type == 'student':
-            user = Student.query.filter_by(student_id=current_user_id).first()
-        
-        if not user:
-            return jsonify({'message': '用户不存在'}), 404
-        
-        if not user.check_password(old_password):
-            return jsonify({'message': '旧密码错误'}), 400
-        
-        # 设置新密码
-        user.set_password(new_password)
-        db.session.commit()
-        
-        return jsonify({'message': '密码修改成功'}), 200
-    
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': f'密码修改失败: {str(e)}'}), 500
-
-@auth_bp.route('/verify-token', methods=['POST'])
-@jwt_required()
-def verify_token():
-    """验证token有效性"""
-    current_user_id = get_jwt_identity()
-    claims = get_jwt()
-    return jsonify({
-        'message': 'Token有效',
-        'user_id': current_user_id,
-        'user_type': claims.get('type'),
-        'user_data': claims.get('user_data')
-    }), 200
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+from app import db
+from app.models import Admin, Student, Teacher
+from app.services.password_service import PasswordService
+from app.services.principal_service import PrincipalCache, principal_info
+from app.services.revocation_service import TokenRevocation, issued_at_ms
+from app.services.exceptions import ServiceError
+from app.routes.authz import roles_required, current_principal
+
+# 所有登录用户均可访问的接口
+ALL_ROLES = ('admin', 'teacher', 'student')
+
+auth_bp = Blueprint('auth', __name__)
+
+def issue_tokens(user_type, user_id, refresh=True):
+    """
+    签发访问令牌与刷新令牌
+
+    令牌只携带用户ID、类型、版本号与签发时间（毫秒，用于吊销判断），用户资料由 PrincipalCache 按需解析。
+    刷新令牌的 type 声明由 flask_jwt_extended 固定为 refresh，用户类型改放在 user_type 中。
+    """
+    version = PrincipalCache.version(user_type, user_id)
+    tokens = {'access_token': create_access_token(identity=user_id, additional_claims={
+        'type': user_type, 'ver': version, 'iat_ms': issued_at_ms()
+    })}
+    if refresh:
+        tokens['refresh_token'] = create_refresh_token(identity=user_id, additional_claims={
+            'user_type': user_type, 'ver': version, 'iat_ms': issued_at_ms()
+        })
+    return tokens
+
+@auth_bp.route('/login', methods=['POST'])
+def login():
+    """
+    用户登录接口
+    ---
+    tags:
+      - 用户认证
+    summary: 用户登录
+    description: 支持管理员、教师、学生三种用户类型的统一登录接口
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - username
+            - password
+            - user_type
+          properties:
+            username:
+              type: string
+              description: 用户名（管理员用户名/教师工号/学号）
+              example: "admin"
+            password:
+              type: string
+              description: 登录密码
+              example: "123456"
+            user_type:
+              type: string
+              enum: [admin, teacher, student]
+              description: 用户类型
+              example: "admin"
+    responses:
+      200:
+        description: 登录成功
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "登录成功"
+            access_token:
+              type: string
+              description: JWT访问令牌（短期有效）
+              example: "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+            refresh_token:
+              type: string
+              description: 刷新令牌，访问令牌过期后用于换取新的访问令牌
+              example: "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+            user:
+              type: object
+              description: 用户信息
+              properties:
+                id:
+                  type: string
+                  description: 用户ID
+                name:
+                  type: string
+                  description: 用户姓名
+                type:
+                  type: string
+                  description: 用户类型
+      400:
+        description: 请求参数错误
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "用户名、密码和用户类型不能为空"
+      401:
+        description: 用户名或密码错误
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "用户名或密码错误"
+      500:
+        description: 服务器内部错误
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: "登录失败: 详细错误信息"
+    """
+    data = request.get_json()
+    
+    if not data or not data.get('username') or not data.get('password') or not data.get('user_type'):
+        return jsonify({'message': '用户名、密码和用户类型不能为空'}), 400
+    
+    username = data['username']
+    password = data['password']
+    user_type = data['user_type']  # 'admin', 'teacher', 'student'
+    
+    user = None
+    user_info = {}
+    
+    try:
+        if user_type == 'admin':
+            user = Admin.query.filter_by(username=username).first()
+            if user and PasswordService.verify(f'admin:{user.admin_id}', password, user.password):
+                user_info = principal_info('admin', user)
+        elif user_type == 'teacher':
+            user = Teacher.query.filter_by(teacher_id=username).first()
+            if user and PasswordService.verify(f'teacher:{user.teacher_id}', password, user.password):
+                user_info = principal_info('teacher', user)
+        elif user_type == 'student':
+            user = Student.query.filter_by(student_id=username).first()
+            if user and PasswordService.verify(f'student:{user.student_id}', password, user.password):
+                user_info = principal_info('student', user)
+        
+        if user and user_info:
+            # 保存的哈希成本与当前配置不一致时，用本次密码透明地重新计算
+            if PasswordService.rehash_if_needed(f"{user_type}:{user_info['id']}", password, user):
+                db.session.commit()
+            
+            return jsonify({
+                'message': '登录成功',
+                **issue_tokens(user_type, user_info['id']),
+                'user': user_info
+            }), 200
+        else:
+            return jsonify({'message': '用户名或密码错误'}), 401
+    
+    except ServiceError as e:
+        # 密码校验排队过多：快速拒绝，提示客户端稍后重试
+        return jsonify({'message': e.message}), e.code, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'message': f'登录失败: {str(e)}'}), 500
+
+@auth_bp.route('/change-password', methods=['POST'])
+@roles_required(*ALL_ROLES)
+def change_password():
+    """修改密码"""
+    principal = current_principal()
+    current_user_id = principal.id
+    user_type = principal.type
+    
+    data = request.get_json()
+    
+    if not data or not data.get('old_password') or not data.get('new_password'):
+        return jsonify({'message': '旧密码和新密码不能为空'}), 400
+    
+    old_password = data['old_password']
+    new_password = data['new_password']
+    
+    try:
+        user = None
+        
+        if user_type == 'admin':
+            user = Admin.query.filter_by(admin_id=current_user_id).first()
+        elif user_type == 'teacher':
+            user = Teacher.query.filter_by(teacher_id=current_user_id).first()
+        elif user_type == 'student':
+            user = Student.query.filter_by(student_id=current_user_id).first()
+        
+        if not user:
+            return jsonify({'message': '用户不存在'}), 404
+        
+        if not PasswordService.verify(f'{user_type}:{current_user_id}', old_password, user.password):
+            return jsonify({'message': '旧密码错误'}), 400
+        
+        # 设置新密码，并吊销此前签发的全部令牌（其他设备需重新登录）
+        user.set_password(new_password)
+        TokenRevocation.revoke_principal(user_type, current_user_id)
+        db.session.commit()
+        
+        # 当前会话换用新令牌继续使用
+        return jsonify({'message': '密码修改成功', **issue_tokens(user_type, current_user_id)}), 200
+    
+    except ServiceError as e:
+        return jsonify({'message': e.message}), e.code, {'Retry-After': '1'}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'密码修改失败: {str(e)}'}), 500
+
+@auth_bp.route('/verify-token', methods=['POST'])
+@roles_required(*ALL_ROLES)
+def verify_token():
+    """验证token有效性，返回最新的用户资料"""
+    principal = current_principal()
+    current_user_id = principal.id
+    user_type = principal.type
+    try:
+        user_data = principal.profile
+        if user_data is None:
+            return jsonify({'message': '用户不存在'}), 401
+        return jsonify({
+            'message': 'Token有效',
+            'user_id': current_user_id,
+            'user_type': user_type,
+            'user_data': user_data,
+            # 签发令牌后用户资料或密码已被修改
+            'stale': principal.claims.get('ver') != PrincipalCache.version(user_type, current_user_id)
+        }), 200
+    except Exception as e:
+        return jsonify({'message': f'验证失败: {str(e)}'}), 500
+
+@auth_bp.route('/refresh', methods=['POST'])
+@roles_required(*ALL_ROLES, refresh=True)
+def refresh():
+    """用刷新令牌换取新的访问令牌"""
+    principal = current_principal()
+    try:
+        if principal.profile is None:
+            return jsonify({'message': '用户不存在'}), 401
+        return jsonify({'message': '刷新成功', **issue_tokens(principal.type, principal.id, refresh=False)}), 200
+    except Exception as e:
+        return jsonify({'message': f'刷新令牌失败: {str(e)}'}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@roles_required(*ALL_ROLES)
+def logout():
+    """退出登录，吊销当前访问令牌与请求体中的刷新令牌"""
+    principal = current_principal()
+    data = request.get_json(silent=True) or {}
+    try:
+        TokenRevocation.revoke_token(principal.claims)
+        if data.get('refresh_token'):
+            try:
+                payload = decode_token(data['refresh_token'])
+            except Exception:
+                # 已过期或无效的刷新令牌无需吊销
+                payload = None
+            # 只吊销属于当前用户的刷新令牌：不同类型的用户ID可能相同，需同时比较用户类型
+            if payload and payload.get('sub') == principal.id \
+                    and payload.get('user_type') == principal.type:
+                TokenRevocation.revoke_token(payload)
+        db.session.commit()
+        return jsonify({'message': '已退出登录'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'退出登录失败: {str(e)}'}), 500
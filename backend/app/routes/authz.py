@@ -0,0 +1,223 @@
+"""
+统一鉴权
+所有蓝图共用的角色装饰器：每个请求只校验、解析一次访问令牌，结果保存为请求级的 Principal（flask.g），
+后续装饰器与视图通过 current_principal() 读取，不再重复调用 get_jwt()。
+装饰器放在最外层，令牌缺失、无效、过期、已吊销（401/422）或角色不符（403）的请求
+在打开数据库会话之前就被拒绝；令牌相关的错误交给 flask_jwt_extended 的错误处理返回，
+视图内部的异常照常抛出，不再被统一改写为 401。
+每个接口的鉴权耗时与放行/拒绝次数按 worker 统计（GET /api/admin/authz）。
+SSE 等无法设置请求头的长连接不在 URL 中携带访问令牌，而是先用访问令牌换取一次性的短期凭证
+（issue_stream_ticket），连接时以 ticket_required 兑换
+"""
+import os
+import secrets
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+from app.services.principal_service import PrincipalCache
+from app.services.revocation_service import TokenRevocation
+from app.services.shared_store import get_store
+
+ROLE_NAMES = {'admin': '管理员', 'teacher': '教师', 'student': '学生'}
+
+STREAM_TICKET_PREFIX = 'stream-ticket:'
+
+# 随凭证保存的访问令牌声明：兑换后据此校验角色，并在连接期间复核令牌是否过期或被吊销
+_TICKET_CLAIMS = ('sub', 'type', 'jti', 'exp', 'iat', 'iat_ms', 'ver')
+
+
+class Principal:
+    """当前请求的登录用户"""
+
+    __slots__ = ('id', 'type', 'claims')
+
+    def __init__(self, claims):
+        self.id = claims['sub']
+        # 刷新令牌的 type 声明固定为 refresh，用户类型在 user_type 中
+        self.type = claims.get('user_type') or claims.get('type')
+        self.claims = claims
+
+    @property
+    def profile(self):
+        """用户资料（由 PrincipalCache 解析，会访问缓存或数据库）"""
+        return PrincipalCache.get(self.type, self.id)
+
+
+def current_principal():
+    """
+    当前请求的登录用户（需已通过 roles_required 或 jwt_required 校验令牌）
+
+    Returns:
+        Principal: 登录用户；请求中没有已校验的令牌时返回 None
+    """
+    principal = g.get('_principal')
+    if principal is None:
+        claims = get_jwt()
+        if not claims:
+            return None
+        principal = g._principal = Principal(claims)
+    return principal
+
+
+class _RouteStats:
+    """单个接口的鉴权计数"""
+
+    __slots__ = ('allowed', 'unauthorized', 'forbidden', 'total_us', 'max_us')
+
+    def __init__(self):
+        self.allowed = 0
+        self.unauthorized = 0
+        self.forbidden = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def as_dict(self):
+        count = self.allowed + self.unauthorized + self.forbidden
+        return {
+            'allowed': self.allowed,
+            'unauthorized': self.unauthorized,
+            'forbidden': self.forbidden,
+            'avg_us': round(self.total_us / count, 1) if count else 0.0,
+            'max_us': round(self.max_us, 1)
+        }
+
+
+class AuthzStats:
+    """按接口统计的鉴权耗时（当前 worker）"""
+
+    _lock = threading.Lock()
+    _routes = {}
+
+    @staticmethod
+    def record(endpoint, outcome, elapsed_us):
+        with AuthzStats._lock:
+            stats = AuthzStats._routes.get(endpoint)
+            if stats is None:
+                stats = AuthzStats._routes[endpoint] = _RouteStats()
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+            stats.total_us += elapsed_us
+            stats.max_us = max(stats.max_us, elapsed_us)
+
+    @staticmethod
+    def snapshot():
+        """各接口的放行、401、403 次数与平均/最大鉴权耗时（微秒）"""
+        with AuthzStats._lock:
+            return {
+                'pid': os.getpid(),
+                'routes': {endpoint: stats.as_dict() for endpoint, stats in sorted(AuthzStats._routes.items())}
+            }
+
+    @staticmethod
+    def reset():
+        with AuthzStats._lock:
+            AuthzStats._routes.clear()
+
+
+def _forbidden_message(roles):
+    return f"需要{'或'.join(ROLE_NAMES.get(role, role) for role in roles)}权限"
+
+
+def roles_required(*roles, locations=None, refresh=False):
+    """
+    角色鉴权装饰器（放在路由装饰器之后、其他装饰器之前）
+
+    Args:
+        roles: 允许访问的用户类型，可指定多个；不指定时只要求已登录
+        locations: 令牌位置，默认使用 JWT_TOKEN_LOCATION（如 ['headers', 'query_string']）
+        refresh: 是否要求刷新令牌
+    """
+    allowed = frozenset(roles)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                verify_jwt_in_request(locations=locations, refresh=refresh)
+            except (JWTExtendedException, PyJWTError):
+                AuthzStats.record(request.endpoint, 'unauthorized', (time.perf_counter() - started) * 1e6)
+                raise
+            principal = g._principal = Principal(get_jwt())
+            if allowed and principal.type not in allowed:
+                AuthzStats.record(request.endpoint, 'forbidden', (time.perf_counter() - started) * 1e6)
+                return jsonify({'message': _forbidden_message(roles)}), 403
+            AuthzStats.record(request.endpoint, 'allowed', (time.perf_counter() - started) * 1e6)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def token_alive(claims):
+    """
+    令牌声明是否仍然有效（未过期且未被吊销），需在应用上下文中调用
+
+    Args:
+        claims: 访问令牌声明
+
+    Returns:
+        bool: 是否有效
+    """
+    if claims.get('exp') and claims['exp'] <= time.time():
+        return False
+    return not TokenRevocation.is_revoked({}, claims)
+
+
+def issue_stream_ticket(ttl):
+    """
+    为当前登录用户签发一次性连接凭证
+
+    凭证是随机字符串，保存在共享存储中 ttl 秒，只能兑换一次。
+
+    Args:
+        ttl: 有效期（秒）
+
+    Returns:
+        str: 凭证
+    """
+    claims = current_principal().claims
+    ticket = secrets.token_urlsafe(24)
+    get_store().set(STREAM_TICKET_PREFIX + ticket,
+                    {name: claims[name] for name in _TICKET_CLAIMS if name in claims}, ttl=ttl)
+    return ticket
+
+
+def ticket_required(*roles):
+    """
+    以一次性凭证（ticket 查询参数）鉴权的装饰器，用于 EventSource 等无法设置请求头的连接
+
+    凭证缺失、过期、已使用，或签发凭证的访问令牌已过期/被吊销时返回 401，角色不符返回 403。
+    视图中 current_principal() 返回签发凭证时的登录用户。
+
+    Args:
+        roles: 允许访问的用户类型
+    """
+    allowed = frozenset(roles)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            started = time.perf_counter()
+            ticket = request.args.get('ticket')
+            claims = get_store().pop(STREAM_TICKET_PREFIX + ticket) if ticket else None
+            if claims is None or not token_alive(claims):
+                AuthzStats.record(request.endpoint, 'unauthorized', (time.perf_counter() - started) * 1e6)
+                return jsonify({'message': '连接凭证无效或已过期'}), 401
+            principal = g._principal = Principal(claims)
+            if allowed and principal.type not in allowed:
+                AuthzStats.record(request.endpoint, 'forbidden', (time.perf_counter() - started) * 1e6)
+                return jsonify({'message': _forbidden_message(roles)}), 403
+            AuthzStats.record(request.endpoint, 'allowed', (time.perf_counter() - started) * 1e6)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+admin_required = roles_required('admin')
+teacher_required = roles_required('teacher')
+student_required = roles_required('student')
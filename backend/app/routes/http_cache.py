@@ -0,0 +1,44 @@
+"""
+HTTP 条件请求（ETag / 304）辅助函数
+"""
+from flask import request, jsonify, current_app
+
+
+def _revalidate(response):
+    # 允许浏览器缓存，但每次使用前都需向服务器验证
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def versioned_json(etag, build):
+    """
+    按版本号生成 ETag：客户端缓存仍有效时直接返回 304，不构建响应体
+
+    Args:
+        etag: 由数据版本号组成的 ETag
+        build: 构建响应数据的函数
+
+    Returns:
+        Response: 200 或 304 响应
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag, weak=True)
+    return _revalidate(response)
+
+
+def hashed_json(data):
+    """
+    按响应内容生成 ETag，内容未变时返回 304（节省传输与客户端渲染）
+
+    Args:
+        data: 响应数据
+
+    Returns:
+        Response: 200 或 304 响应
+    """
+    response = jsonify(data)
+    response.add_etag(weak=True)
+    return _revalidate(response.make_conditional(request))
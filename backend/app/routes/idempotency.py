@@ -0,0 +1,134 @@
+"""
+写接口幂等键（Idempotency-Key 请求头）
+客户端超时后带同一个幂等键重试时，直接返回第一次执行的响应，不再走校验链、不访问业务表。
+记录保存在共享存储中，键为 用户 + 幂等键，值为请求指纹（方法、路径、请求体的哈希）与响应：
+1. 首个请求用 add 原子地占位（状态 pending），执行后写入响应并保留 IDEMPOTENCY_TTL 秒
+2. 并发到达的重复请求等待占位请求完成后返回同一响应（同进程用事件唤醒，跨进程轮询），
+   多个重复请求只执行一次
+3. 同一幂等键携带不同请求时返回 422；执行出错（5xx）或被限流（429）时删除占位，允许重试
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+from app.services.shared_store import get_store
+
+IDEMPOTENCY_PREFIX = 'idempotency:'
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+MAX_KEY_LENGTH = 255
+
+# 占位记录的过期时间（秒）：执行中的 worker 崩溃后，占位过期即可重新执行
+PENDING_TTL = 30
+
+# 跨进程等待占位请求完成时的轮询间隔（秒）
+POLL_INTERVAL = 0.02
+
+STATE_PENDING = 'pending'
+STATE_DONE = 'done'
+
+# 本进程正在执行的幂等请求：存储键 -> 完成事件
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode('utf-8'))
+    # 缓存请求体，视图函数仍可再次读取
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _replay(record):
+    response = current_app.response_class(
+        record['body'], status=record['status'], mimetype=record['mimetype']
+    )
+    response.headers[REPLAY_HEADER] = 'true'
+    return response
+
+
+def _wait(store, key, timeout):
+    """等待占位请求完成，返回最新记录（占位被删除时返回 None）"""
+    with _inflight_lock:
+        event = _inflight.get(key)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if event is not None:
+            event.wait(max(remaining, 0))
+        else:
+            time.sleep(max(min(POLL_INTERVAL, remaining), 0))
+        record = store.get(key)
+        if record is None or record['state'] == STATE_DONE or time.monotonic() >= deadline:
+            return record
+
+
+def idempotent(scope):
+    """
+    幂等键装饰器（放在角色装饰器之后、准入控制之前，重放不消耗限流令牌）
+
+    没有 Idempotency-Key 请求头的请求照常执行。
+
+    Args:
+        scope: 幂等键的作用域，不同接口的同名幂等键互不影响
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return f(*args, **kwargs)
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return jsonify({'message': f'{IDEMPOTENCY_HEADER} 长度不能超过 {MAX_KEY_LENGTH}'}), 400
+
+            store = get_store()
+            key = f'{IDEMPOTENCY_PREFIX}{scope}:{get_jwt_identity()}:{idempotency_key}'
+            fingerprint = _fingerprint()
+            deadline = time.monotonic() + current_app.config.get('IDEMPOTENCY_WAIT', 10)
+            while not store.add(key, {'state': STATE_PENDING, 'fingerprint': fingerprint}, ttl=PENDING_TTL):
+                record = store.get(key)
+                if record is None:
+                    continue
+                if record['fingerprint'] != fingerprint:
+                    return jsonify({'message': f'{IDEMPOTENCY_HEADER} 已用于其他请求'}), 422
+                if record['state'] == STATE_DONE:
+                    return _replay(record)
+                record = _wait(store, key, deadline - time.monotonic())
+                if record is not None and record['state'] == STATE_DONE:
+                    return _replay(record)
+                if record is not None and time.monotonic() >= deadline:
+                    response = jsonify({'message': '相同请求正在处理中，请稍后重试'})
+                    response.status_code = 409
+                    response.headers['Retry-After'] = '1'
+                    return response
+                # 占位请求执行失败已删除占位，由本请求重新执行
+
+            event = threading.Event()
+            with _inflight_lock:
+                _inflight[key] = event
+            stored = False
+            try:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code < 500 and response.status_code != 429:
+                    store.set(key, {
+                        'state': STATE_DONE,
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'mimetype': response.mimetype,
+                        'body': response.get_data(as_text=True)
+                    }, ttl=current_app.config.get('IDEMPOTENCY_TTL', 3600))
+                    stored = True
+                return response
+            finally:
+                if not stored:
+                    store.delete(key)
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+                event.set()
+        return decorated_function
+    return decorator
@@ -1,321 +1,387 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from app import db
-from app.models import Student, Course, CourseOffering, Enrollment, Teacher
-from app.services.student_service import StudentService
-from app.services.exceptions import ServiceError
-from app.services.statistics_service import CourseStatisticsService
-from sqlalchemy import and_, func, desc
-
-student_bp = Blueprint('student', __name__)
-
-def student_required(f):
-    """学生权限装饰器"""
-    def decorated_function(*args, **kwargs):
-        try:
-            claims = get_jwt()
-            if claims.get('type') != 'student':
-                return jsonify({'message': '需要学生权限'}), 403
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': '身份验证失败'}), 401
-    decorated_function.__name__ = f.__name__
-    return decorated_function
-
-@student_bp.route('/profile', methods=['GET'])
-@jwt_required()
-@student_required
-def get_profile():
-    """查看个人信息"""
-    student_id = get_jwt_identity()
-    
-    try:
-        student = Student.query.filter_by(student_id=student_id).first()
-        if not student:
-            return jsonify({'message': '学生不存在'}), 404
-        
-        return jsonify({
-            'student_id': student.student_id,
-            'name': student.name,
-            'gender': student.gender,
-            'age': student.age,
-            'hometown': student.hometown,
-            'total_credits': student.total_credits,
-            'class_id': student.class_id,
-            'class_name': student.class_info.class_name if student.class_info else ''
-        }), 200
-    except Exception as e:
-        return jsonify({'message': f'获取个人信息失败: {str(e)}'}), 500
-
-@student_bp.route('/courses', methods=['GET'])
-@jwt_required()
-@student_required
-def get_my_courses():
-    """查看本人课程"""
-    student_id = get_jwt_identity()
-    
-    try:
-        academic_year = request.args.get('academic_year', '')
-        semester = request.args.get('semester', '', type=int)
-        
-        query = db.session.query(
-            Enrollment, CourseOffering, Course, Teacher
-        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
-         .join(Course, CourseOffering.course_id == Course.course_id)\
-         .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
-         .filter(Enrollment.student_id == student_id)
-        
-        if academic_year:
-            query = query.filter(CourseOffering.academic_year == academic_year)
-        if semester in [0, 1]:
-            query = query.filter(CourseOffering.semester == bool(semester))
-        
-        enrollments = query.all()
-        
-        result = []
-        for enrollment, offering, course, teacher in enrollments:
-            result.append({
-                'offering_id': offering.offering_id,
-                'course_id': course.course_id,
-                'course_name': course.course_name,
-                'teacher_id': teacher.teacher_id,
-                'teacher_name': teacher.name,
-                'teacher_title': teacher.title,
-                'hours': course.hours,
-                'credits': course.credits,
-                'exam_type': course.exam_type,
-                'academic_year': offering.academic_year,
-                'semester': offering.semester,
-                'score': enrollment.score,
-                'enrollment_date': enrollment.enrollment_date.isoformat() if enrollment.enrollment_date else None
-            })
-        
-        return jsonify(result), 200
-    except Exception as e:
-        return jsonify({'message': f'获取课程信息失败: {str(e)}'}), 500
-
-@student_bp.route('/courses/available', methods=['GET'])
-@jwt_required()
-@student_required
-def get_available_courses():
-    """获取可选课程列表"""
-    student_id = get_jwt_identity()
-    
-    try:
-        academic_year = request.args.get('academic_year', '2024')
-        semester = request.args.get('semester', 1, type=int)
-        
-        # 查询所有开课
-        all_offerings = db.session.query(
-            CourseOffering, Course, Teacher
-        ).join(Course).join(Teacher).filter(
-            CourseOffering.academic_year == academic_year,
-            CourseOffering.semester == bool(semester)
-        ).all()
-        
-        # 查询学生已选课程
-        enrolled_offerings = db.session.query(
-            Enrollment.offering_id
-        ).filter_by(student_id=student_id).all()
-        enrolled_ids = [e[0] for e in enrolled_offerings]
-        
-        # 查询学生已选的课程ID（防止选择同一门课的不同教师）
-        enrolled_courses = db.session.query(
-            CourseOffering.course_id
-        ).join(Enrollment).filter(
-            Enrollment.student_id == student_id
-        ).all()
-        enrolled_course_ids = [c[0] for c in enrolled_courses]
-        
-        result = []
-        for offering, course, teacher in all_offerings:
-            # 跳过已选的开课
-            if offering.offering_id in enrolled_ids:
-                continue
-            
-            # 跳过已选过的同一门课程
-            if course.course_id in enrolled_course_ids:
-                continue
-            
-            # 检查是否还有名额
-            available = offering.current_students < offering.max_students
-            
-            result.append({
-                'offering_id': offering.offering_id,
-                'course_id': course.course_id,
-                'course_name': course.course_name,
-                'teacher_id': teacher.teacher_id,
-                'teacher_name': teacher.name,
-                'teacher_title': teacher.title,
-                'hours': course.hours,
-                'credits': course.credits,
-                'exam_type': course.exam_type,
-                'max_students': offering.max_students,
-                'current_students': offering.current_students,
-                'available': available
-            })
-        
-        return jsonify(result), 200
-    except Exception as e:
-        return jsonify({'message': f'获取可选课程失败: {str(e)}'}), 500
-
-@student_bp.route('/courses/<offering_id>/enroll', methods=['POST'])
-@jwt_required()
-@student_required
-def enroll_course(offering_id):
-    """选课"""
-    student_id = get_jwt_identity()
-    
-    try:
-        result = StudentService.enroll_in_course(student_id, offering_id)
-        return jsonify(result), 201
-    except ServiceError as e:
-        return jsonify({'message': e.message}), e.code
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': f'选课失败: {str(e)}'}), 500
-
-@student_bp.route('/courses/<offering_id>/drop', methods=['DELETE'])
-@jwt_required()
-@student_required
-def drop_course(offering_id):
-    """退选"""
-    student_id = get_jwt_identity()
-    
-    try:
-        result = StudentService.drop_course(student_id, offering_id)
-        return jsonify(result), 200
-    except ServiceError as e:
-        return jsonify({'message': e.message}), e.code
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': f'退选失败: {str(e)}'}), 500
-
-@student_bp.route('/scores', methods=['GET'])
-@jwt_required()
-@student_required
-def get_scores():
-    """按学年查询考试成绩"""
-    student_id = get_jwt_identity()
-    
-    try:
-        academic_year = request.args.get('academic_year', '')
-        semester = request.args.get('semester', '', type=int)
-
-        query = db.session.query(
-            Enrollment.score,
-            Course.course_name,
-            Course.credits,
-            Course.exam_type,
-            Teacher.name.label('teacher_name'),
-            CourseOffering.academic_year,
-            CourseOffering.semester
-        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
-         .join(Course, CourseOffering.course_id == Course.course_id)\
-         .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
-         .filter(
-            Enrollment.student_id == student_id,
-            Enrollment.score.isnot(None)
-        )
-
-        if academic_year:
-            query = query.filter(CourseOffering.academic_year == academic_year)
-        if semester in [0, 1]:
-            query = query.filter(CourseOffering.semester == bool(semester))
-        
-        enrollments = query.order_by(
-            CourseOffering.academic_year.desc(),
-            CourseOffering.semester.desc()
-        ).all()
-        
-        result = []
-        total_credits = 0
-        total_score_credits = 0
-        
-        for enrollment in enrollments:
-            score_data = {
-                'offering_id': enrollment.offering_id,
-                'course_id': enrollment.course_id,
-                'course_name': enrollment.course_name,
-                'teacher_name': enrollment.teacher_name,
-                'academic_year': enrollment.academic_year,
-                'semester': enrollment.semester,
-                'credits': enrollment.credits,
-                'score': enrollment.score,
-                'exam_type': enrollment.exam_type,
-                'passed': enrollment.score >= 60
-            }
-            result.append(score_data)
-            
-            # 计算GPA相关数据
-            if enrollment.score >= 60:
-                total_credits += enrollment.credits
-                total_score_credits += enrollment.score * enrollment.credits
-        
-        # 计算加权平均分
-        gpa = total_score_credits / total_credits if total_credits > 0 else 0
-        
-        # 按学年学期分组
-        grouped_scores = {}
-        for score in result:
-            key = f"{score['academic_year']}-{score['semester']}"
-            if key not in grouped_scores:
-                grouped_scores[key] = {
-                    'academic_year': score['academic_year'],
-                    'semester': score['semester'],
-                    'courses': [],
-                    'semester_credits': 0,
-                    'semester_gpa': 0
-                }
-            grouped_scores[key]['courses'].append(score)
-        
-        # 计算每学期GPA
-        for semester_data in grouped_scores.values():
-            semester_credits = 0
-            semester_score_credits = 0
-            for course in semester_data['courses']:
-                if course['passed']:
-                    semester_credits += course['credits']
-                    semester_score_credits += course['score'] * course['credits']
-            
-            semester_data['semester_credits'] = semester_credits
-            semester_data['semester_gpa'] = round(
-                semester_score_credits / semester_credits if semester_credits > 0 else 0, 2
-            )
-        
-        return jsonify({
-            'total_credits': total_credits,
-            'overall_gpa': round(gpa, 2),
-            'semesters': list(grouped_scores.values()),
-            'all_scores': result
-        }), 200
-    except Exception as e:
-        return jsonify({'message': f'获取成绩信息失败: {str(e)}'}), 500
-
-@student_bp.route('/statistics', methods=['GET'])
-@jwt_required()
-@student_required
-def get_student_statistics():
-    """获取学生统计信息"""
-    student_id = get_jwt_identity()
-    
-    try:
-        stats = CourseStatisticsService.get_student_course_statistics(student_id)
-        return jsonify(stats), 200
-    except Exception as e:
-        return jsonify({'message': f'获取学生统计信息失败: {str(e)}'}), 500
-
-@student_bp.route('/schedule', methods=['GET'])
-@jwt_required()
-@student_required
-def get_schedule():
-    """获取学生课表"""
-    student_id = get_jwt_identity()
-    
-    try:
-        schedule = StudentService.get_student_schedule(student_id)
-        return jsonify(schedule), 200
-    except ServiceError as e:
-        return jsonify({'message': e.message}), e.code
-    except Exception as e:
-        return jsonify({'message': f'获取课表失败: {str(e)}'}), 500
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity
+from app import db
+from app.models import Student, Course, CourseOffering, Enrollment, Teacher
+from app.services.student_service import StudentService
+from app.services.exceptions import ServiceError, CourseFullError
+from app.services.transcript_service import TranscriptService
+from app.services.lottery_service import LotteryService
+from app.services.catalog_service import CatalogService, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.waitlist_service import WaitlistService
+from app.services.seat_feed import SeatFeed
+from app.routes.http_cache import hashed_json, versioned_json
+from app.routes.admission import admission_control
+from app.routes.authz import (
+    current_principal, issue_stream_ticket, ticket_required, token_alive, student_required
+)
+from app.routes.idempotency import idempotent
+from sqlalchemy import and_, func, desc
+
+student_bp = Blueprint('student', __name__)
+
+# 批量选课单次最多提交的课程数
+MAX_CART_SIZE = 20
+
+@student_bp.route('/profile', methods=['GET'])
+@student_required
+def get_profile():
+    """查看个人信息"""
+    student_id = get_jwt_identity()
+    
+    try:
+        student = Student.query.filter_by(student_id=student_id).first()
+        if not student:
+            return jsonify({'message': '学生不存在'}), 404
+        
+        return jsonify({
+            'student_id': student.student_id,
+            'name': student.name,
+            'gender': student.gender,
+            'age': student.age,
+            'hometown': student.hometown,
+            'total_credits': student.total_credits,
+            'class_id': student.class_id,
+            'class_name': student.class_info.class_name if student.class_info else ''
+        }), 200
+    except Exception as e:
+        return jsonify({'message': f'获取个人信息失败: {str(e)}'}), 500
+
+@student_bp.route('/courses', methods=['GET'])
+@student_required
+def get_my_courses():
+    """查看本人课程"""
+    student_id = get_jwt_identity()
+    
+    try:
+        academic_year = request.args.get('academic_year', '')
+        semester = request.args.get('semester', '', type=int)
+        
+        query = db.session.query(
+            Enrollment, CourseOffering, Course, Teacher
+        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+         .join(Course, CourseOffering.course_id == Course.course_id)\
+         .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
+         .filter(Enrollment.student_id == student_id)
+        
+        if academic_year:
+            query = query.filter(CourseOffering.academic_year == academic_year)
+        if semester in [0, 1]:
+            query = query.filter(CourseOffering.semester == bool(semester))
+        
+        enrollments = query.all()
+        
+        result = []
+        for enrollment, offering, course, teacher in enrollments:
+            result.append({
+                'offering_id': offering.offering_id,
+                'course_id': course.course_id,
+                'course_name': course.course_name,
+                'teacher_id': teacher.teacher_id,
+                'teacher_name': teacher.name,
+                'teacher_title': teacher.title,
+                'hours': course.hours,
+                'credits': course.credits,
+                'exam_type': course.exam_type,
+                'academic_year': offering.academic_year,
+                'semester': offering.semester,
+                'score': enrollment.score,
+                'enrollment_date': enrollment.enrollment_date.isoformat() if enrollment.enrollment_date else None
+            })
+        
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'message': f'获取课程信息失败: {str(e)}'}), 500
+
+@student_bp.route('/courses/available', methods=['GET'])
+@student_required
+def get_available_courses():
+    """
+    获取可选课程列表
+    
+    不带 limit/cursor 参数时返回完整列表；带 limit 时返回
+    {items, next_cursor, has_more} 分页结构，下一页以 cursor 参数继续。
+    可选参数: sort (offering_id/remaining_seats/credits/time), order (asc/desc),
+    day_of_week, teacher_id, has_seats, no_conflict
+    """
+    student_id = get_jwt_identity()
+    
+    try:
+        academic_year = request.args.get('academic_year', '2024')
+        semester = request.args.get('semester', 1, type=int)
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        paginated = limit is not None or cursor is not None
+        if paginated:
+            limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        
+        items, next_cursor = CatalogService.get_available_offerings(
+            student_id, academic_year, semester,
+            sort=request.args.get('sort', 'offering_id'),
+            descending=request.args.get('order', 'asc') == 'desc',
+            limit=limit,
+            cursor=cursor,
+            day_of_week=request.args.get('day_of_week', type=int),
+            teacher_id=request.args.get('teacher_id'),
+            has_seats=_flag('has_seats'),
+            no_conflict=_flag('no_conflict')
+        )
+        
+        if not paginated:
+            return hashed_json(items)
+        return hashed_json({
+            'items': items,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+    except ServiceError as e:
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        return jsonify({'message': f'获取可选课程失败: {str(e)}'}), 500
+
+def _flag(name):
+    """解析布尔型查询参数"""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+@student_bp.route('/courses/<offering_id>/enroll', methods=['POST'])
+@student_required
+@idempotent('enroll')
+@admission_control('enroll')
+def enroll_course(offering_id):
+    """选课"""
+    student_id = get_jwt_identity()
+    
+    try:
+        result = StudentService.enroll_in_course(student_id, offering_id)
+        return jsonify(result), 201
+    except CourseFullError as e:
+        # 提示客户端改为加入候补队列，而不是反复重试选课
+        return jsonify({'message': e.message, 'waitlist_available': True}), e.code
+    except ServiceError as e:
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'选课失败: {str(e)}'}), 500
+
+@student_bp.route('/enrollments:batch', methods=['POST'])
+@student_required
+@idempotent('enroll_batch')
+@admission_control('enroll')
+def enroll_courses_batch():
+    """批量选课（一次提交整个购物车）"""
+    student_id = get_jwt_identity()
+    
+    data = request.get_json(silent=True)
+    offering_ids = data.get('offering_ids') if data else None
+    if not offering_ids or not isinstance(offering_ids, list):
+        return jsonify({'message': '选课列表不能为空'}), 400
+    if len(offering_ids) > MAX_CART_SIZE:
+        return jsonify({'message': f'一次最多提交 {MAX_CART_SIZE} 门课程'}), 400
+    
+    try:
+        result = StudentService.enroll_many(student_id, [str(o) for o in offering_ids])
+        return jsonify(result), 200
+    except ServiceError as e:
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'批量选课失败: {str(e)}'}), 500
+
+def _term_args(source):
+    """解析学年、学期参数，缺失或非法时返回 None"""
+    academic_year = str(source.get('academic_year') or '').strip()
+    try:
+        semester = int(source.get('semester'))
+    except (TypeError, ValueError):
+        return None
+    if not academic_year or semester not in (0, 1):
+        return None
+    return academic_year, semester
+
+@student_bp.route('/wishlist', methods=['GET'])
+@student_required
+def get_wishlist():
+    """查看学期选课志愿及分配结果"""
+    student_id = get_jwt_identity()
+    
+    term = _term_args(request.args)
+    if not term:
+        return jsonify({'message': '请指定学年与学期'}), 400
+    try:
+        return jsonify(LotteryService.get_wishlist(student_id, *term)), 200
+    except Exception as e:
+        return jsonify({'message': f'获取志愿失败: {str(e)}'}), 500
+
+@student_bp.route('/wishlist', methods=['PUT'])
+@student_required
+def submit_wishlist():
+    """提交学期选课志愿（按志愿顺序，整体替换）"""
+    student_id = get_jwt_identity()
+    
+    data = request.get_json(silent=True) or {}
+    term = _term_args(data)
+    offering_ids = data.get('offering_ids')
+    if not term:
+        return jsonify({'message': '请指定学年与学期'}), 400
+    if not isinstance(offering_ids, list):
+        return jsonify({'message': '志愿列表格式错误'}), 400
+    
+    try:
+        result = LotteryService.submit_wishlist(
+            student_id, *term, offering_ids, current_app.config['WISHLIST_MAX_LENGTH']
+        )
+        return jsonify(result), 200
+    except ServiceError as e:
+        db.session.rollback()
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'提交志愿失败: {str(e)}'}), 500
+
+@student_bp.route('/courses/<offering_id>/waitlist', methods=['POST'])
+@student_required
+def join_waitlist(offering_id):
+    """加入满员课程的候补队列"""
+    student_id = get_jwt_identity()
+    
+    try:
+        return jsonify(WaitlistService.join(student_id, offering_id)), 201
+    except ServiceError as e:
+        db.session.rollback()
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'加入候补失败: {str(e)}'}), 500
+
+@student_bp.route('/courses/<offering_id>/waitlist', methods=['DELETE'])
+@student_required
+def leave_waitlist(offering_id):
+    """退出候补队列"""
+    student_id = get_jwt_identity()
+    
+    try:
+        return jsonify(WaitlistService.leave(student_id, offering_id)), 200
+    except ServiceError as e:
+        db.session.rollback()
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'退出候补失败: {str(e)}'}), 500
+
+@student_bp.route('/seats/stream-ticket', methods=['POST'])
+@student_required
+def issue_seat_stream_ticket():
+    """
+    换取实时人数推送的一次性连接凭证
+    
+    浏览器 EventSource 不能设置请求头，用凭证代替 URL 中的访问令牌；
+    凭证在 SEAT_STREAM_TICKET_TTL 秒内有效，只能建立一次连接。
+    """
+    ttl = current_app.config.get('SEAT_STREAM_TICKET_TTL', 30)
+    return jsonify({'ticket': issue_stream_ticket(ttl), 'expires_in': ttl}), 200
+
+@student_bp.route('/seats/stream', methods=['GET'])
+@ticket_required('student')
+def stream_seats():
+    """
+    实时选课人数推送（Server-Sent Events）
+    
+    选课/退课改变人数后推送 seats 事件，data 为 [{offering_id, current_students, status}]，
+    每秒最多 SEAT_STREAM_RATE 条；收到 resync 事件时应重新拉取课程列表。
+    连接期间按心跳间隔复核访问令牌，令牌过期或被吊销时发送 expired 事件并关闭连接。
+    参数: ticket（/seats/stream-ticket 换取的凭证）
+    可选参数: offering_ids（逗号分隔，只推送这些开课），
+              last_event_id（重新换取凭证后续接，作用同 Last-Event-ID 请求头）
+    """
+    offering_ids = request.args.get('offering_ids')
+    offering_ids = {item for item in offering_ids.split(',') if item} if offering_ids else None
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('last_event_id', type=int)
+    
+    app = current_app._get_current_object()
+    claims = current_principal().claims
+    
+    def alive():
+        with app.app_context():
+            return token_alive(claims)
+    
+    SeatFeed.start(app)
+    return Response(
+        SeatFeed.subscribe(last_event_id, offering_ids, alive=alive),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@student_bp.route('/waitlist', methods=['GET'])
+@student_required
+def get_waitlist_status():
+    """候补状态（排位、递补结果），队列未变化时返回 304，适合轮询"""
+    student_id = get_jwt_identity()
+    
+    try:
+        etag = WaitlistService.stamp(student_id)
+        if etag is None:
+            return jsonify(WaitlistService.status(student_id)), 200
+        return versioned_json(etag, lambda: WaitlistService.status(student_id))
+    except Exception as e:
+        return jsonify({'message': f'获取候补状态失败: {str(e)}'}), 500
+
+@student_bp.route('/courses/<offering_id>/drop', methods=['DELETE'])
+@student_required
+@idempotent('drop')
+@admission_control('drop')
+def drop_course(offering_id):
+    """退选"""
+    student_id = get_jwt_identity()
+    
+    try:
+        result = StudentService.drop_course(student_id, offering_id)
+        return jsonify(result), 200
+    except ServiceError as e:
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'退选失败: {str(e)}'}), 500
+
+@student_bp.route('/scores', methods=['GET'])
+@student_required
+def get_scores():
+    """按学年查询考试成绩"""
+    student_id = get_jwt_identity()
+    
+    try:
+        academic_year = request.args.get('academic_year', '')
+        semester = request.args.get('semester', '', type=int)
+
+        result = TranscriptService.get_scores(
+            student_id, academic_year or None, semester if semester in [0, 1] else None
+        )
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'message': f'获取成绩信息失败: {str(e)}'}), 500
+
+@student_bp.route('/statistics', methods=['GET'])
+@student_required
+def get_student_statistics():
+    """获取学生统计信息"""
+    student_id = get_jwt_identity()
+    
+    try:
+        stats = TranscriptService.get_statistics(student_id)
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'message': f'获取学生统计信息失败: {str(e)}'}), 500
+
+@student_bp.route('/schedule', methods=['GET'])
+@student_required
+def get_schedule():
+    """获取学生课表"""
+    student_id = get_jwt_identity()
+    
+    try:
+        schedule = StudentService.get_student_schedule(student_id)
+        return jsonify(schedule), 200
+    except ServiceError as e:
+        return jsonify({'message': e.message}), e.code
+    except Exception as e:
+        return jsonify({'message': f'获取课表失败: {str(e)}'}), 500
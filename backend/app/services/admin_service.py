@@ -1,8 +1,16 @@
 from app import db
 from app.models import Admin, Student, Teacher, Course, Class
+from sqlalchemy import insert
 from .exceptions import ServiceError, StudentNotFoundError, CourseNotFoundError
+from .password_service import PasswordService
 from datetime import datetime
 
+# 批量开通账号时每条 INSERT / IN 查询处理的行数
+PROVISION_CHUNK = 5000
+
+# 批量开通的必填字段（密码可省略，使用统一的初始密码）
+PROVISION_FIELDS = ('student_id', 'name', 'gender', 'age', 'hometown', 'class_id')
+
 class AdminService:
     """管理员业务逻辑服务"""
     
@@ -30,3 +38,80 @@ class AdminService:
         """
         # 基础逻辑将在后续实现
         pass
+    
+    @staticmethod
+    def provision_students(rows, default_password):
+        """
+        批量开通学生账号
+        
+        逐行校验必填字段、学号重复与班级是否存在，有效行的密码哈希在进程池中并行计算
+        （成本因子 BCRYPT_ROUNDS，与单个创建的账号一致），然后分批插入。
+        
+        Args:
+            rows: 学生数据列表，字段同创建学生接口，password 可省略
+            default_password: 未提供密码时使用的初始密码
+            
+        Returns:
+            dict: 开通数量与逐行错误
+            
+        Raises:
+            ServiceError: 初始密码为空
+        """
+        if not default_password:
+            raise ServiceError('初始密码不能为空')
+        
+        errors = []
+        valid = []
+        seen = set()
+        for index, row in enumerate(rows, 1):
+            if not isinstance(row, dict):
+                errors.append({'row': index, 'message': '数据格式错误'})
+                continue
+            missing = [field for field in PROVISION_FIELDS if not row.get(field)]
+            if missing:
+                errors.append({'row': index, 'message': f'{missing[0]} 不能为空'})
+                continue
+            student_id = str(row['student_id'])
+            if student_id in seen:
+                errors.append({'row': index, 'message': f'学号 {student_id} 重复'})
+                continue
+            seen.add(student_id)
+            valid.append((index, student_id, row))
+        
+        ids = [student_id for _, student_id, _ in valid]
+        existing = set()
+        for i in range(0, len(ids), PROVISION_CHUNK):
+            existing.update(row[0] for row in db.session.query(Student.student_id)
+                            .filter(Student.student_id.in_(ids[i:i + PROVISION_CHUNK])).all())
+        class_ids = {row[0] for row in db.session.query(Class.class_id).all()}
+        
+        accepted = []
+        for index, student_id, row in valid:
+            if student_id in existing:
+                errors.append({'row': index, 'message': f'学号 {student_id} 已存在'})
+            elif row['class_id'] not in class_ids:
+                errors.append({'row': index, 'message': f"班级 {row['class_id']} 不存在"})
+            else:
+                accepted.append((student_id, row))
+        
+        hashes = PasswordService.hash_many([str(row.get('password') or default_password) for _, row in accepted])
+        records = [{
+            'student_id': student_id,
+            'name': row['name'],
+            'gender': row['gender'],
+            'age': row['age'],
+            'hometown': row['hometown'],
+            'class_id': row['class_id'],
+            'total_credits': 0,
+            'password': password_hash
+        } for (student_id, row), password_hash in zip(accepted, hashes)]
+        for i in range(0, len(records), PROVISION_CHUNK):
+            db.session.execute(insert(Student), records[i:i + PROVISION_CHUNK])
+        db.session.commit()
+        
+        return {
+            'message': f'批量开通完成：成功 {len(records)} 个，失败 {len(errors)} 个',
+            'created_count': len(records),
+            'error_count': len(errors),
+            'errors': errors
+        }
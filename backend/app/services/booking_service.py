@@ -0,0 +1,278 @@
+"""
+教室与教师排课占用检查服务
+每个学期在进程内维护按 (星期, 教室) 与 (星期, 教师) 分桶的区间索引，
+桶内区间按开始时间有序，用二分查找在 O(log n) 时间内找出与新时间段重叠的开课。
+开课的新建与改期在学期级的共享存储锁内完成"检查 - 写入 - 提交"，
+多个 worker 并发建课时不会把同一教室或同一教师排进重叠的时间段
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+
+from flask import has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import CourseOffering
+from .exceptions import ServiceError
+from .shared_store import get_store
+
+BOOKING_VERSION_PREFIX = 'booking:version:'
+BOOKING_GENERATION_KEY = 'booking:generation'
+BOOKING_LOCK_PREFIX = 'booking:lock:'
+
+# 学期排课锁的过期时间与最长等待时间（秒）
+BOOKING_LOCK_TTL = 10
+BOOKING_LOCK_WAIT = 5
+
+# 影响占用情况的开课字段
+_BOOKING_FIELDS = ('teacher_id', 'day_of_week', 'start_time', 'end_time', 'location')
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _term_key(academic_year, semester):
+    return f'{academic_year}-{int(bool(semester))}'
+
+
+def _normalize_location(location):
+    location = (location or '').strip()
+    return location or None
+
+
+class IntervalBucket:
+    """
+    一个桶内的上课时间段（半开区间 [start, end)，单位：分钟）
+
+    通过本服务写入的区间互不重叠，此时只需检查开始时间早于新区间结束时间的最后一个区间；
+    历史数据中已有重叠时退化为向前逐个检查。
+    """
+
+    def __init__(self):
+        self.items = []  # (start, end, offering_id)，按开始时间有序
+        self.disjoint = True
+
+    def add(self, start, end, offering_id):
+        index = bisect_left(self.items, (start,))
+        if (index > 0 and self.items[index - 1][1] > start) or \
+                (index < len(self.items) and self.items[index][0] < end):
+            self.disjoint = False
+        insort(self.items, (start, end, offering_id))
+
+    def remove(self, offering_id):
+        self.items = [item for item in self.items if item[2] != offering_id]
+
+    def find(self, start, end, exclude=None):
+        """返回与 [start, end) 重叠的一个开课ID，没有时返回 None"""
+        index = bisect_left(self.items, (end,))
+        while index > 0:
+            index -= 1
+            item_start, item_end, offering_id = self.items[index]
+            if item_end > start and offering_id != exclude:
+                return offering_id
+            if self.disjoint and offering_id != exclude:
+                return None
+        return None
+
+
+class TermBookings:
+    """一个学期的教室、教师占用索引"""
+
+    def __init__(self, version, generation=0):
+        self.version = version
+        self.generation = generation
+        self.buckets = {}  # (类型, 星期, 教室/教师) -> IntervalBucket
+        self.placed = {}   # offering_id -> [(桶键, 开始, 结束)]
+
+    @classmethod
+    def load(cls, academic_year, semester, version, generation=0):
+        """一次查询加载学期内全部已排课开课"""
+        bookings = cls(version, generation)
+        rows = db.session.query(
+            CourseOffering.offering_id, CourseOffering.teacher_id, CourseOffering.day_of_week,
+            CourseOffering.start_time, CourseOffering.end_time, CourseOffering.location
+        ).filter(
+            CourseOffering.academic_year == academic_year,
+            CourseOffering.semester == bool(semester),
+            CourseOffering.day_of_week.isnot(None),
+            CourseOffering.start_time.isnot(None),
+            CourseOffering.end_time.isnot(None)
+        ).all()
+        for row in rows:
+            bookings.add(row.offering_id, row.teacher_id, row.day_of_week,
+                         row.start_time, row.end_time, row.location)
+        return bookings
+
+    def reload(self, academic_year, semester):
+        """从数据库重新加载索引（保留版本号），用于发现索引中的开课已不存在时"""
+        fresh = TermBookings.load(academic_year, semester, self.version, self.generation)
+        self.buckets = fresh.buckets
+        self.placed = fresh.placed
+
+    @staticmethod
+    def _keys(teacher_id, day_of_week, location):
+        keys = [('teacher', day_of_week, teacher_id)]
+        location = _normalize_location(location)
+        if location:
+            keys.insert(0, ('room', day_of_week, location))
+        return keys
+
+    def add(self, offering_id, teacher_id, day_of_week, start_time, end_time, location):
+        """登记开课占用（时间不完整的开课不占用）"""
+        self.remove(offering_id)
+        if day_of_week is None or start_time is None or end_time is None:
+            return
+        start, end = _minutes(start_time), _minutes(end_time)
+        if start >= end:
+            return
+        placed = []
+        for key in self._keys(teacher_id, day_of_week, location):
+            self.buckets.setdefault(key, IntervalBucket()).add(start, end, offering_id)
+            placed.append(key)
+        self.placed[offering_id] = placed
+
+    def remove(self, offering_id):
+        """撤销开课占用"""
+        for key in self.placed.pop(offering_id, ()):
+            self.buckets[key].remove(offering_id)
+
+    def find_conflict(self, teacher_id, day_of_week, start_time, end_time, location, exclude=None):
+        """
+        查找与给定时间段冲突的开课
+
+        Args:
+            teacher_id: 教师ID
+            day_of_week: 星期几
+            start_time: 开始时间
+            end_time: 结束时间
+            location: 上课地点
+            exclude: 忽略的开课ID（改期时为开课自身）
+
+        Returns:
+            tuple: (冲突类型 'room'/'teacher', 冲突的开课ID)；没有冲突时返回 None
+        """
+        start, end = _minutes(start_time), _minutes(end_time)
+        for key in self._keys(teacher_id, day_of_week, location):
+            bucket = self.buckets.get(key)
+            offering_id = bucket.find(start, end, exclude) if bucket else None
+            if offering_id:
+                return key[0], offering_id
+        return None
+
+
+class BookingGuard:
+    """排课占用检查"""
+
+    _terms = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(academic_year, semester):
+        """
+        获取学期占用索引，共享存储中的版本号或代数变化（其他进程修改了开课、数据库重建）时整体重建
+
+        Args:
+            academic_year: 学年
+            semester: 学期
+
+        Returns:
+            TermBookings: 占用索引
+        """
+        term = _term_key(academic_year, semester)
+        values = get_store().get_many([BOOKING_VERSION_PREFIX + term, BOOKING_GENERATION_KEY])
+        version = values.get(BOOKING_VERSION_PREFIX + term, 0)
+        generation = values.get(BOOKING_GENERATION_KEY, 0)
+        with BookingGuard._lock:
+            bookings = BookingGuard._terms.get(term)
+        if bookings is None or bookings.version != version or bookings.generation != generation:
+            bookings = TermBookings.load(academic_year, semester, version, generation)
+            with BookingGuard._lock:
+                BookingGuard._terms[term] = bookings
+        return bookings
+
+    @staticmethod
+    @contextmanager
+    def reserve(academic_year, semester):
+        """
+        在学期排课锁内检查并写入开课
+
+        with 块内先用 find_conflict 检查，再写入并提交开课，最后调用 add 登记占用；
+        同一学期的其他建课/改期请求在锁外等待。
+
+        Args:
+            academic_year: 学年
+            semester: 学期
+
+        Yields:
+            TermBookings: 最新的占用索引
+
+        Raises:
+            ServiceError: 等待排课锁超时
+        """
+        store = get_store()
+        term = _term_key(academic_year, semester)
+        lock_key = BOOKING_LOCK_PREFIX + term
+        deadline = time.monotonic() + BOOKING_LOCK_WAIT
+        while not store.add(lock_key, 1, ttl=BOOKING_LOCK_TTL):
+            if time.monotonic() >= deadline:
+                raise ServiceError("排课繁忙，请稍后重试", 503)
+            time.sleep(0.01)
+        try:
+            bookings = BookingGuard.get(academic_year, semester)
+            version = bookings.version
+            yield bookings
+            # 提交时开课变更钩子已把版本号加一；期间若有锁外的修改则丢弃索引，下次重建
+            current = store.get(BOOKING_VERSION_PREFIX + term, 0)
+            if current == version + 1:
+                bookings.version = current
+            elif current != version:
+                with BookingGuard._lock:
+                    BookingGuard._terms.pop(term, None)
+        finally:
+            store.delete(lock_key)
+
+    @staticmethod
+    def invalidate(terms):
+        """递增学期占用版本号，使所有进程的索引失效"""
+        store = get_store()
+        for term in set(terms):
+            store.incr(BOOKING_VERSION_PREFIX + term)
+
+    @staticmethod
+    def reset():
+        """使所有进程、所有学期的索引失效（数据库重建后调用）"""
+        get_store().incr(BOOKING_GENERATION_KEY)
+        with BookingGuard._lock:
+            BookingGuard._terms.clear()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_booking_changes(session, flush_context):
+    # 新建、删除或修改了时间/地点/教师的开课，提交后使所在学期的索引失效
+    terms = session.info.setdefault('booking_terms', set())
+    for obj in session.new:
+        if isinstance(obj, CourseOffering):
+            terms.add(_term_key(obj.academic_year, obj.semester))
+    for obj in session.deleted:
+        if isinstance(obj, CourseOffering):
+            terms.add(_term_key(obj.academic_year, obj.semester))
+    for obj in session.dirty:
+        if isinstance(obj, CourseOffering):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in _BOOKING_FIELDS):
+                terms.add(_term_key(obj.academic_year, obj.semester))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_booking_changes(session):
+    terms = session.info.pop('booking_terms', None)
+    if terms and has_app_context():
+        BookingGuard.invalidate(terms)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_booking_changes(session):
+    session.info.pop('booking_terms', None)
@@ -0,0 +1,415 @@
+"""
+选课目录服务
+按学期缓存开课目录快照（课程/教师/开课连接结果），以单调递增的目录版本号失效；
+选课人数从人数计数器叠加到快照上，不会因人数变化重建整个快照。
+学生可选课程在快照上做排除、筛选、排序与键集（keyset）分页
+"""
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+from flask import has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Course, CourseOffering, Enrollment, Teacher
+from .exceptions import ServiceError
+from .shared_store import get_store, store_nonce
+from .seat_counter_service import SeatCounter, seat_status
+from .timetable_service import TimetableCache
+
+# 分页参数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# 进程内最多缓存的学期快照数
+MAX_TERM_SNAPSHOTS = 8
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# 未排课时间的开课在按时间排序时排在最后
+_UNSCHEDULED_DAY = 8
+_UNSCHEDULED_MINUTE = 24 * 60
+
+# 只影响人数的字段变化不需要使目录快照失效（实时人数来自计数器）
+_NON_CATALOG_FIELDS = {'current_students', 'updated_at', 'password', 'created_at'}
+
+_SORT_KEYS = {
+    'offering_id': lambda o: (o.offering_id,),
+    'remaining_seats': lambda o: (o.max_students - o.current_students, o.offering_id),
+    'credits': lambda o: (o.payload['credits'], o.offering_id),
+    'time': lambda o: (
+        o.day_of_week or _UNSCHEDULED_DAY,
+        o.start_time.hour * 60 + o.start_time.minute if o.start_time else _UNSCHEDULED_MINUTE,
+        o.offering_id
+    ),
+}
+
+# 只依赖快照静态字段的排序，每个快照版本只排序一次；按剩余名额排序依赖实时人数，每次请求排序
+_STATIC_SORTS = {'offering_id', 'credits', 'time'}
+
+
+def encode_cursor(values):
+    """将最后一行的排序键编码为不透明的分页游标"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """解码分页游标"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ServiceError("无效的分页游标")
+
+
+class _OfferingEntry:
+    """快照中的一条开课：payload 为不含名额的静态字段"""
+
+    __slots__ = ('offering_id', 'course_id', 'teacher_id', 'day_of_week', 'start_time',
+                 'end_time', 'payload', 'max_students', 'current_students', 'status')
+
+    def __init__(self, payload, day_of_week, start_time, end_time, max_students, current_students, status):
+        self.payload = payload
+        self.offering_id = payload['offering_id']
+        self.course_id = payload['course_id']
+        self.teacher_id = payload['teacher_id']
+        self.day_of_week = day_of_week
+        self.start_time = start_time
+        self.end_time = end_time
+        self.max_students = max_students
+        self.current_students = current_students
+        self.status = status
+
+    def with_seats(self, seats):
+        """叠加实时名额，返回新条目"""
+        current_students, max_students, status = seats.get(
+            self.offering_id, (self.current_students, self.max_students, self.status)
+        )
+        return _OfferingEntry(
+            self.payload, self.day_of_week, self.start_time, self.end_time,
+            max_students, current_students, status
+        )
+
+    def to_dict(self):
+        item = dict(self.payload)
+        item['max_students'] = self.max_students
+        item['current_students'] = self.current_students
+        item['available'] = self.current_students < self.max_students
+        item['status'] = self.status
+        return item
+
+
+class CatalogCache:
+    """进程内目录快照缓存，以共享存储中的目录版本号判断是否过期"""
+
+    _terms = {}       # (academic_year, semester) -> (version, [_OfferingEntry])
+    _orders = {}      # (academic_year, semester) -> (version, {sort: (升序条目, 升序排序键)})
+    _courses = None   # (version, list)
+    _teachers = None  # (version, list)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def version():
+        """当前目录版本号"""
+        return get_store().get(CATALOG_VERSION_KEY, 0)
+
+    @staticmethod
+    def etag(name, version):
+        """
+        目录版本对应的 ETag，包含共享存储实例标识
+
+        Args:
+            name: 资源名（courses、teachers）
+            version: get_courses/get_teachers 返回的版本号
+
+        Returns:
+            str: ETag
+        """
+        return f'{name}-{store_nonce()}-v{version}'
+
+    @staticmethod
+    def bump():
+        """目录发生变化，版本号加一"""
+        return get_store().incr(CATALOG_VERSION_KEY)
+
+    @staticmethod
+    def get_term(academic_year, semester):
+        """
+        获取学期开课快照
+
+        Returns:
+            tuple: (版本号, 开课条目列表)
+        """
+        key = (academic_year, bool(semester))
+        version = CatalogCache.version()
+        cached = CatalogCache._terms.get(key)
+        if cached and cached[0] == version:
+            return cached
+
+        # 先读版本号再加载数据，保证并发写入后一定会再次重建
+        snapshot = (version, CatalogCache._load_term(academic_year, semester))
+        with CatalogCache._lock:
+            CatalogCache._terms.pop(key, None)
+            CatalogCache._terms[key] = snapshot
+            while len(CatalogCache._terms) > MAX_TERM_SNAPSHOTS:
+                evicted = next(iter(CatalogCache._terms))
+                CatalogCache._terms.pop(evicted)
+                CatalogCache._orders.pop(evicted, None)
+        return snapshot
+
+    @staticmethod
+    def get_order(academic_year, semester, sort):
+        """
+        获取学期快照按静态字段升序排列的结果，每个快照版本只构建一次
+
+        Args:
+            academic_year: 学年
+            semester: 学期
+            sort: 排序字段（须在 _STATIC_SORTS 中）
+
+        Returns:
+            tuple: (升序条目列表, 对应的排序键列表)
+        """
+        version, offerings = CatalogCache.get_term(academic_year, semester)
+        key = (academic_year, bool(semester))
+        with CatalogCache._lock:
+            cached = CatalogCache._orders.get(key)
+            if not cached or cached[0] != version:
+                cached = (version, {})
+                CatalogCache._orders[key] = cached
+        order = cached[1].get(sort)
+        if order is None:
+            sort_key = _SORT_KEYS[sort]
+            ordered = sorted(offerings, key=sort_key)
+            order = (ordered, [sort_key(entry) for entry in ordered])
+            cached[1][sort] = order
+        return order
+
+    @staticmethod
+    def get_courses():
+        """获取全部课程列表快照，返回 (版本号, 列表)"""
+        version = CatalogCache.version()
+        cached = CatalogCache._courses
+        if cached and cached[0] == version:
+            return cached
+        cached = (version, [{
+            'course_id': c.course_id,
+            'course_name': c.course_name,
+            'hours': c.hours,
+            'credits': c.credits,
+            'exam_type': c.exam_type
+        } for c in Course.query.all()])
+        CatalogCache._courses = cached
+        return cached
+
+    @staticmethod
+    def get_teachers():
+        """获取全部教师列表快照，返回 (版本号, 列表)"""
+        version = CatalogCache.version()
+        cached = CatalogCache._teachers
+        if cached and cached[0] == version:
+            return cached
+        cached = (version, [{
+            'teacher_id': t.teacher_id,
+            'name': t.name,
+            'title': t.title
+        } for t in Teacher.query.all()])
+        CatalogCache._teachers = cached
+        return cached
+
+    @staticmethod
+    def clear():
+        """清空进程内快照"""
+        with CatalogCache._lock:
+            CatalogCache._terms.clear()
+            CatalogCache._orders.clear()
+            CatalogCache._courses = None
+            CatalogCache._teachers = None
+
+    @staticmethod
+    def _load_term(academic_year, semester):
+        rows = db.session.query(
+            CourseOffering.offering_id, CourseOffering.max_students, CourseOffering.current_students,
+            CourseOffering.day_of_week, CourseOffering.start_time, CourseOffering.end_time,
+            CourseOffering.location, CourseOffering.status,
+            Course.course_id, Course.course_name, Course.hours, Course.credits, Course.exam_type,
+            Teacher.teacher_id, Teacher.name.label('teacher_name'), Teacher.title.label('teacher_title')
+        ).join(Course, CourseOffering.course_id == Course.course_id)\
+         .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
+         .filter(
+            CourseOffering.academic_year == academic_year,
+            CourseOffering.semester == bool(semester)
+        ).order_by(CourseOffering.offering_id).all()
+
+        return [_OfferingEntry(
+            {
+                'offering_id': row.offering_id,
+                'course_id': row.course_id,
+                'course_name': row.course_name,
+                'teacher_id': row.teacher_id,
+                'teacher_name': row.teacher_name,
+                'teacher_title': row.teacher_title,
+                'hours': row.hours,
+                'credits': row.credits,
+                'exam_type': row.exam_type,
+                'day_of_week': row.day_of_week,
+                'start_time': row.start_time.strftime('%H:%M') if row.start_time else None,
+                'end_time': row.end_time.strftime('%H:%M') if row.end_time else None,
+                'location': row.location
+            },
+            row.day_of_week, row.start_time, row.end_time,
+            row.max_students, row.current_students, row.status
+        ) for row in rows]
+
+
+class CatalogService:
+    """选课目录服务类"""
+
+    @staticmethod
+    def get_seat_counts(academic_year, semester):
+        """
+        查询学期内各开课的实时名额
+
+        已选人数取自人数计数器，最大人数取自快照（修改最大人数会使快照失效），
+        整个过程不读取开课记录。
+
+        Returns:
+            dict: offering_id -> (current_students, max_students, status)
+        """
+        _, offerings = CatalogCache.get_term(academic_year, semester)
+        return CatalogService._seat_counts(offerings)
+
+    @staticmethod
+    def _seat_counts(offerings):
+        counts = SeatCounter.get_many(entry.offering_id for entry in offerings)
+        return {
+            entry.offering_id: (
+                counts[entry.offering_id], entry.max_students,
+                seat_status(entry.status, counts[entry.offering_id], entry.max_students)
+            )
+            for entry in offerings
+        }
+
+    @staticmethod
+    def get_available_offerings(student_id, academic_year, semester, sort='offering_id',
+                                descending=False, limit=None, cursor=None, day_of_week=None,
+                                teacher_id=None, has_seats=False, no_conflict=False):
+        """
+        查询学生可选的开课（基于学期快照）
+
+        Args:
+            student_id: 学生ID
+            academic_year: 学年
+            semester: 学期
+            sort: 排序字段（offering_id / remaining_seats / credits / time）
+            descending: 是否降序
+            limit: 每页条数，None 表示不分页
+            cursor: 上一页返回的游标
+            day_of_week: 只看星期几的开课
+            teacher_id: 只看某位教师的开课
+            has_seats: 只看仍有名额的开课
+            no_conflict: 排除与本人课表时间冲突的开课
+
+        Returns:
+            tuple: (开课列表, 下一页游标或 None)
+
+        Raises:
+            ServiceError: 排序字段或游标无效
+        """
+        if sort not in _SORT_KEYS:
+            raise ServiceError(f"不支持的排序字段: {sort}")
+        sort_key = _SORT_KEYS[sort]
+
+        after = None
+        if cursor:
+            after = decode_cursor(cursor)
+            if not isinstance(after, list):
+                raise ServiceError("无效的分页游标")
+            after = tuple(after)
+
+        _, offerings = CatalogCache.get_term(academic_year, semester)
+        seats = CatalogService._seat_counts(offerings)
+
+        if sort in _STATIC_SORTS:
+            ordered, keys = CatalogCache.get_order(academic_year, semester, sort)
+        else:
+            ordered = sorted((entry.with_seats(seats) for entry in offerings), key=sort_key)
+            keys = [sort_key(entry) for entry in ordered]
+
+        # 用二分查找定位游标，只遍历游标之后的条目
+        start, end = 0, len(ordered)
+        if after is not None:
+            try:
+                if descending:
+                    end = bisect_left(keys, after)
+                else:
+                    start = bisect_right(keys, after)
+            except TypeError:
+                raise ServiceError("无效的分页游标")
+        candidates = reversed(ordered[start:end]) if descending else ordered[start:end]
+
+        # 已选过的课程（任意班级）一律排除
+        taken_course_ids = {row[0] for row in db.session.query(CourseOffering.course_id).join(
+            Enrollment, Enrollment.offering_id == CourseOffering.offering_id
+        ).filter(Enrollment.student_id == student_id).all()}
+        timetable = TimetableCache.get(student_id) if no_conflict else None
+
+        entries = []
+        for entry in candidates:
+            if entry.course_id in taken_course_ids:
+                continue
+            if day_of_week and entry.day_of_week != day_of_week:
+                continue
+            if teacher_id and entry.teacher_id != teacher_id:
+                continue
+            entry = entry.with_seats(seats)
+            if has_seats and entry.current_students >= entry.max_students:
+                continue
+            if timetable and timetable.find_conflict(entry.day_of_week, entry.start_time, entry.end_time):
+                continue
+            entries.append(entry)
+            # 多取一条用于判断是否还有下一页
+            if limit and len(entries) > limit:
+                break
+
+        next_cursor = None
+        if limit and len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(sort_key(entries[-1]))
+
+        return [entry.to_dict() for entry in entries], next_cursor
+
+
+def _touches_catalog(session):
+    """判断本次 flush 是否修改了目录内容（课程、教师、开课）"""
+    catalog_models = (Course, Teacher, CourseOffering)
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, catalog_models):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, catalog_models):
+            changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+            if changed - _NON_CATALOG_FIELDS:
+                return True
+    return False
+
+
+@event.listens_for(Session, 'before_flush')
+def _mark_catalog_changes(session, flush_context, instances):
+    if _touches_catalog(session):
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_catalog_version(session):
+    # 提交后再递增版本号，保证重建快照时能读到新数据
+    if session.info.pop('catalog_changed', False) and has_app_context():
+        CatalogCache.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop('catalog_changed', None)
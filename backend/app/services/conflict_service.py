@@ -0,0 +1,177 @@
+"""
+排课时间冲突分析服务
+对每个星期几的上课时间段做区间扫描线：按开始时间排序后依次扫描，
+在 O(n log n) 时间内找出所有真正重叠（含部分重叠）的开课，
+并按"同一时间段""同一教室""同一教师"三个维度报告冲突
+"""
+from app import db
+from app.models import Course, CourseOffering, Teacher
+
+# 每类冲突最多返回的冲突组数量（计数不受限制）
+MAX_REPORTED_CONFLICTS = 200
+
+
+def sweep_overlaps(intervals):
+    """
+    扫描线查找重叠区间组
+
+    区间为半开区间 [start, end)，首尾相接不算重叠。每个返回的组是一个极大重叠集合：
+    组内区间两两重叠，且在 [window_start, window_end) 内同时进行。
+
+    Args:
+        intervals: 可迭代的 (start, end, item)
+
+    Returns:
+        tuple: (重叠组列表 [(window_start, window_end, [item, ...])], 重叠的区间对数)
+    """
+    events = []
+    for index, (start, end, item) in enumerate(intervals):
+        if start < end:
+            # 同一时刻先处理结束事件（0）再处理开始事件（1）
+            events.append((start, 1, index, item))
+            events.append((end, 0, index, item))
+    events.sort(key=lambda event: event[:3])
+
+    groups = []
+    pairs = 0
+    active = {}
+    grew = False
+    window_start = None
+    for moment, is_start, index, item in events:
+        if is_start:
+            pairs += len(active)
+            active[index] = item
+            grew = True
+            window_start = moment
+        else:
+            if grew and len(active) > 1:
+                groups.append((window_start, moment, list(active.values())))
+            grew = False
+            del active[index]
+    return groups, pairs
+
+
+def _grouped_overlaps(rows, key):
+    """按 (星期, key) 分组后分别扫描"""
+    buckets = {}
+    for row in rows:
+        group = key(row)
+        if group is not None:
+            buckets.setdefault((row.day_of_week, group), []).append(row)
+
+    groups = []
+    pairs = 0
+    for (day_of_week, group), members in sorted(buckets.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        if len(members) < 2:
+            continue
+        found, found_pairs = sweep_overlaps((row.start_time, row.end_time, row) for row in members)
+        pairs += found_pairs
+        groups.extend((day_of_week, group, start, end, items) for start, end, items in found)
+    return groups, pairs
+
+
+def _course_info(row):
+    return {
+        'offering_id': row.offering_id,
+        'course_name': row.course_name,
+        'teacher_name': row.teacher_name,
+        'location': row.location,
+        'start_time': str(row.start_time),
+        'end_time': str(row.end_time)
+    }
+
+
+def _report(groups, pairs, field=None):
+    conflicts = []
+    for day_of_week, group, start, end, items in groups[:MAX_REPORTED_CONFLICTS]:
+        conflict = {
+            'day_of_week': day_of_week,
+            'start_time': str(start),
+            'end_time': str(end),
+            'courses': [_course_info(row) for row in items]
+        }
+        if field:
+            conflict[field] = group
+        conflicts.append(conflict)
+    return {
+        'conflict_count': len(groups),
+        'overlapping_pairs': pairs,
+        'truncated': len(groups) > MAX_REPORTED_CONFLICTS,
+        'conflicts': conflicts
+    }
+
+
+class ConflictAnalysisService:
+    """排课冲突分析服务类"""
+
+    @staticmethod
+    def load_scheduled(academic_year=None, semester=None):
+        """
+        一次连接查询取出已排课开课的时间、地点与课程/教师名称
+
+        Args:
+            academic_year: 学年（可选）
+            semester: 学期（可选）
+
+        Returns:
+            list: 行对象列表
+        """
+        query = db.session.query(
+            CourseOffering.offering_id,
+            CourseOffering.teacher_id,
+            CourseOffering.day_of_week,
+            CourseOffering.start_time,
+            CourseOffering.end_time,
+            CourseOffering.location,
+            Course.course_name,
+            Teacher.name.label('teacher_name')
+        ).join(Course, CourseOffering.course_id == Course.course_id)\
+         .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
+         .filter(
+            CourseOffering.day_of_week.isnot(None),
+            CourseOffering.start_time.isnot(None),
+            CourseOffering.end_time.isnot(None)
+        )
+        if academic_year:
+            query = query.filter(CourseOffering.academic_year == academic_year)
+        if semester is not None:
+            query = query.filter(CourseOffering.semester == bool(semester))
+        return query.all()
+
+    @staticmethod
+    def analyze(academic_year=None, semester=None):
+        """
+        分析课程时间冲突情况
+
+        Args:
+            academic_year: 学年（可选）
+            semester: 学期（可选）
+
+        Returns:
+            dict: 时间重叠、教室重复占用与教师重复排课三类冲突
+        """
+        rows = ConflictAnalysisService.load_scheduled(academic_year, semester)
+
+        time_groups, time_pairs = _grouped_overlaps(rows, lambda row: '')
+        room_groups, room_pairs = _grouped_overlaps(
+            rows, lambda row: row.location.strip() if row.location and row.location.strip() else None
+        )
+        teacher_groups, teacher_pairs = _grouped_overlaps(rows, lambda row: row.teacher_id)
+
+        time_report = _report(time_groups, time_pairs)
+        room_report = _report(room_groups, room_pairs, 'location')
+        teacher_report = _report(teacher_groups, teacher_pairs, 'teacher_id')
+        names = {row.teacher_id: row.teacher_name for row in rows}
+        for conflict in teacher_report['conflicts']:
+            conflict['teacher_name'] = names[conflict['teacher_id']]
+
+        return {
+            'total_scheduled_courses': len(rows),
+            'unique_time_slots': len({(row.day_of_week, row.start_time, row.end_time) for row in rows}),
+            'conflict_count': time_report['conflict_count'],
+            'overlapping_pairs': time_pairs,
+            'truncated': time_report['truncated'],
+            'conflicts': time_report['conflicts'],
+            'room_conflicts': room_report,
+            'teacher_conflicts': teacher_report
+        }
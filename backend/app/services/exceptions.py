@@ -40,3 +40,14 @@ class InsufficientPermissionError(ServiceError):
     """权限不足异常"""
     def __init__(self, message="权限不足"):
         super().__init__(message, 403)
+
+class ScheduleConflictError(ServiceError):
+    """教室或教师排课冲突异常"""
+    def __init__(self, message="排课时间冲突", conflict=None):
+        super().__init__(message, 409)
+        self.conflict = conflict
+
+class LoginBusyError(ServiceError):
+    """登录校验排队过多异常"""
+    def __init__(self, message="登录人数过多，请稍后再试"):
+        super().__init__(message, 503)
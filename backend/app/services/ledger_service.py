@@ -0,0 +1,257 @@
+"""
+学生学分台账服务
+student_credit_ledger 按 (学生, 学年, 学期) 保存预先汇总的选课、成绩与学分数据。
+成绩写入（登分、导入成绩、课程学分变化）时在同一事务内用一条 INSERT ... SELECT 聚合重算
+受影响的台账行，并同步 students.total_credits；全量重建同样只需一条聚合查询。
+选课、退课不重算台账，选课门数与选课学分（enrolled_*）只是最近一次重算时的快照，
+实时值由 enrolled_totals 在读取时聚合。
+每个学生的台账版本号在提交后递增，供成绩单等派生缓存判断是否过期
+"""
+from datetime import datetime
+
+from flask import has_app_context
+from sqlalchemy import and_, case, delete, event, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Course, CourseOffering, Enrollment, Student, StudentCreditLedger
+from .shared_store import get_store
+
+PASSING_SCORE = 60
+
+LEDGER_VERSION_PREFIX = 'ledger:version:'
+LEDGER_GENERATION_KEY = 'ledger:generation'
+
+_LEDGER_COLUMNS = [
+    'student_id', 'academic_year', 'semester',
+    'enrolled_courses', 'enrolled_credits',
+    'scored_courses', 'scored_credits', 'score_credit_sum',
+    'passed_courses', 'earned_credits', 'passed_score_credit_sum',
+    'grade_excellent', 'grade_good', 'grade_fair', 'grade_pass', 'grade_fail',
+    'updated_at',
+]
+
+# 台账提交后的回调，参数为 (学生ID集合, 是否全量重建)
+_commit_callbacks = []
+
+
+def on_ledger_commit(callback):
+    """注册台账提交后的回调（如使依赖成绩的缓存失效）"""
+    _commit_callbacks.append(callback)
+    return callback
+
+
+def _sum_if(condition, value):
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _aggregate_select(student_ids=None, academic_year=None, semester=None):
+    """按 (学生, 学年, 学期) 聚合选课记录的查询"""
+    score = Enrollment.score
+    credits = Course.credits
+    scored = score.isnot(None)
+    passed = score >= PASSING_SCORE
+
+    stmt = select(
+        Enrollment.student_id,
+        CourseOffering.academic_year,
+        CourseOffering.semester,
+        func.count(),
+        func.coalesce(func.sum(credits), 0),
+        func.count(score),
+        _sum_if(scored, credits),
+        _sum_if(scored, score * credits),
+        _sum_if(passed, 1),
+        _sum_if(passed, credits),
+        _sum_if(passed, score * credits),
+        _sum_if(score >= 90, 1),
+        _sum_if(and_(score >= 80, score < 90), 1),
+        _sum_if(and_(score >= 70, score < 80), 1),
+        _sum_if(and_(score >= 60, score < 70), 1),
+        _sum_if(score < 60, 1),
+        literal(datetime.utcnow(), db.DateTime),
+    ).select_from(Enrollment)\
+     .join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+     .join(Course, CourseOffering.course_id == Course.course_id)
+
+    if student_ids is not None:
+        stmt = stmt.where(Enrollment.student_id.in_(student_ids))
+    if academic_year is not None:
+        stmt = stmt.where(CourseOffering.academic_year == academic_year)
+    if semester is not None:
+        stmt = stmt.where(CourseOffering.semester == bool(semester))
+
+    return stmt.group_by(Enrollment.student_id, CourseOffering.academic_year, CourseOffering.semester)
+
+
+def _sync_total_credits(student_ids=None):
+    """用台账中的已获学分回写 students.total_credits"""
+    earned = select(func.coalesce(func.sum(StudentCreditLedger.earned_credits), 0))\
+        .where(StudentCreditLedger.student_id == Student.student_id)\
+        .scalar_subquery()
+    stmt = update(Student).values(total_credits=earned).execution_options(synchronize_session=False)
+    if student_ids is not None:
+        stmt = stmt.where(Student.student_id.in_(student_ids))
+    db.session.execute(stmt)
+
+
+class CreditLedgerService:
+    """学分台账服务类"""
+
+    @staticmethod
+    def refresh(student_ids, academic_year=None, semester=None):
+        """
+        在当前事务中重算学生的台账行（不提交）
+
+        调用前需保证本事务内的选课/成绩修改已 flush。
+
+        Args:
+            student_ids: 学生ID集合
+            academic_year: 只重算该学年（可选）
+            semester: 只重算该学期（可选，需同时指定学年）
+        """
+        student_ids = list(set(student_ids))
+        if not student_ids:
+            return
+
+        stmt = delete(StudentCreditLedger).where(StudentCreditLedger.student_id.in_(student_ids))
+        if academic_year is not None:
+            stmt = stmt.where(StudentCreditLedger.academic_year == academic_year)
+        if semester is not None:
+            stmt = stmt.where(StudentCreditLedger.semester == bool(semester))
+        db.session.execute(stmt.execution_options(synchronize_session=False))
+
+        db.session.execute(insert(StudentCreditLedger).from_select(
+            _LEDGER_COLUMNS, _aggregate_select(student_ids, academic_year, semester)
+        ))
+        _sync_total_credits(student_ids)
+        db.session.info.setdefault('ledger_students', set()).update(student_ids)
+
+    @staticmethod
+    def refresh_offering(offering, student_ids):
+        """重算一门开课所在学期内指定学生的台账行（不提交）"""
+        CreditLedgerService.refresh(student_ids, offering.academic_year, offering.semester)
+
+    @staticmethod
+    def refresh_course(course_id):
+        """
+        重算选过某门课程的全部学生的台账（不提交），用于课程学分变化
+
+        Args:
+            course_id: 课程ID
+        """
+        student_ids = [row[0] for row in db.session.query(Enrollment.student_id).join(
+            CourseOffering, Enrollment.offering_id == CourseOffering.offering_id
+        ).filter(CourseOffering.course_id == course_id).distinct().all()]
+        CreditLedgerService.refresh(student_ids)
+
+    @staticmethod
+    def rebuild():
+        """
+        全量重建台账：清空后用一条聚合查询重新生成，并回写所有学生的总学分（提交事务）
+
+        Returns:
+            int: 生成的台账行数
+        """
+        db.session.execute(delete(StudentCreditLedger))
+        db.session.execute(insert(StudentCreditLedger).from_select(_LEDGER_COLUMNS, _aggregate_select()))
+        _sync_total_credits()
+        db.session.info['ledger_rebuilt'] = True
+        db.session.commit()
+        return db.session.query(func.count()).select_from(StudentCreditLedger).scalar()
+
+    @staticmethod
+    def enrolled_totals(student_id):
+        """
+        学生当前的选课门数与选课学分（读取时按选课记录聚合，不经过台账）
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            tuple: (选课门数, 选课学分)
+        """
+        count, credits = db.session.query(
+            func.count(Enrollment.offering_id), func.coalesce(func.sum(Course.credits), 0)
+        ).select_from(Enrollment)\
+         .join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+         .join(Course, CourseOffering.course_id == Course.course_id)\
+         .filter(Enrollment.student_id == student_id).one()
+        return count, credits
+
+    @staticmethod
+    def version(student_id):
+        """
+        学生台账的版本戳，台账变化（成绩写入、重建）后改变
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            tuple: (全量重建代数, 学生版本号)
+        """
+        key = LEDGER_VERSION_PREFIX + student_id
+        values = get_store().get_many([LEDGER_GENERATION_KEY, key])
+        return values.get(LEDGER_GENERATION_KEY, 0), values.get(key, 0)
+
+    @staticmethod
+    def get_terms(student_id, academic_year=None, semester=None):
+        """
+        查询学生各学期的台账行（按学年、学期倒序）
+
+        Args:
+            student_id: 学生ID
+            academic_year: 学年（可选）
+            semester: 学期（可选）
+
+        Returns:
+            list: StudentCreditLedger 列表
+        """
+        query = StudentCreditLedger.query.filter_by(student_id=student_id)
+        if academic_year:
+            query = query.filter(StudentCreditLedger.academic_year == academic_year)
+        if semester is not None:
+            query = query.filter(StudentCreditLedger.semester == bool(semester))
+        return query.order_by(
+            StudentCreditLedger.academic_year.desc(),
+            StudentCreditLedger.semester.desc()
+        ).all()
+
+    @staticmethod
+    def summarize(rows):
+        """
+        汇总多个学期的台账行
+
+        Args:
+            rows: StudentCreditLedger 列表
+
+        Returns:
+            dict: 汇总后的选课、成绩与学分数据
+        """
+        total = {column: 0 for column in _LEDGER_COLUMNS[3:-1]}
+        for row in rows:
+            for column in total:
+                total[column] += getattr(row, column)
+        return total
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_ledger_versions(session):
+    # 提交后再递增版本号，保证缓存重建时能读到新台账
+    student_ids = session.info.pop('ledger_students', None)
+    rebuilt = session.info.pop('ledger_rebuilt', False)
+    if not has_app_context():
+        return
+    store = get_store()
+    if rebuilt:
+        store.incr(LEDGER_GENERATION_KEY)
+    for student_id in student_ids or ():
+        store.incr(LEDGER_VERSION_PREFIX + student_id)
+    if student_ids or rebuilt:
+        for callback in _commit_callbacks:
+            callback(student_ids or set(), rebuilt)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_ledger_versions(session):
+    session.info.pop('ledger_students', None)
+    session.info.pop('ledger_rebuilt', None)
@@ -0,0 +1,475 @@
+"""
+志愿抽签选课服务
+学期开启志愿轮次后，学生在提交窗口内提交按顺序排列的选课志愿（只写志愿表，不检查名额）；
+截止后由离线分配器一次性分配名额：按随机顺序（随机序列独裁）或高年级、高学分优先排定学生顺序，
+逐轮为每个学生录取其下一个可行志愿，录取时检查名额、时间冲突、重复课程与先修要求，
+最后用批量插入写入全部选课记录。志愿轮次进行中，该学期的先到先得选课暂停
+"""
+import random
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from app import db
+from app.models import CourseOffering, Enrollment, EnrollmentWish, PreferenceRound, Student
+from .exceptions import ServiceError
+from .ledger_service import PASSING_SCORE
+from .prerequisite_service import PrerequisiteCache
+from .ranking_service import COHORT_PREFIX_LENGTH
+from .seat_counter_service import SeatCounter
+from .seat_service import SeatReservationService
+from .shared_store import get_store
+from .timetable_service import TimetableCache, interval_mask
+
+LOTTERY_VERSION_KEY = 'lottery:version'
+
+# 进行中轮次缓存的最长存活时间（秒），兜底直接修改数据库的情况
+LOTTERY_CACHE_TTL = 30
+
+# 批量写入时每批的行数
+BULK_CHUNK_SIZE = 5000
+
+STATUS_COLLECTING = '收集志愿'
+STATUS_ALLOCATED = '已分配'
+
+POLICY_RANDOM = 'random'
+POLICY_PRIORITY = 'priority'
+POLICIES = (POLICY_RANDOM, POLICY_PRIORITY)
+
+# 志愿分配结果
+RESULT_ADMITTED = '已录取'
+RESULT_FULL = '名额已满'
+RESULT_CONFLICT = '时间冲突'
+RESULT_DUPLICATE = '重复课程'
+RESULT_PREREQUISITE = '先修未满足'
+
+
+def _term_key(academic_year, semester):
+    return f'{academic_year}-{int(bool(semester))}'
+
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def allocate(order, wishes, offerings, capacity, taken, busy, blocked):
+    """
+    逐轮序列独裁分配
+
+    每一轮按 order 依次为每个学生录取其下一个可行志愿，不可行的志愿记录原因后跳过；
+    名额只减不增、课表与已选课程只增不减，所以被跳过的志愿之后也不会变为可行。
+
+    Args:
+        order: 学生ID列表（分配顺序）
+        wishes: {学生ID: [开课ID, ...]}，按志愿顺序排列
+        offerings: {开课ID: (课程ID, 星期, 时间位掩码)}
+        capacity: {开课ID: 剩余名额}，会被原地修改
+        taken: {学生ID: 已选课程ID集合}，会被原地修改
+        busy: {学生ID: {星期: 占用位图}}，会被原地修改
+        blocked: 先修要求未满足的 (学生ID, 课程ID) 集合
+
+    Returns:
+        tuple: (录取列表 [(学生ID, 开课ID)], 结果 {(学生ID, 开课ID): 结果})
+    """
+    admitted = []
+    results = {}
+    position = {}
+    active = [student_id for student_id in order if wishes.get(student_id)]
+    while active:
+        remaining = []
+        for student_id in active:
+            items = wishes[student_id]
+            i = position.get(student_id, 0)
+            courses = taken.setdefault(student_id, set())
+            days = busy.setdefault(student_id, {})
+            while i < len(items):
+                offering_id = items[i]
+                i += 1
+                course_id, day_of_week, mask = offerings[offering_id]
+                if course_id in courses:
+                    results[(student_id, offering_id)] = RESULT_DUPLICATE
+                elif (student_id, course_id) in blocked:
+                    results[(student_id, offering_id)] = RESULT_PREREQUISITE
+                elif mask and days.get(day_of_week, 0) & mask:
+                    results[(student_id, offering_id)] = RESULT_CONFLICT
+                elif capacity[offering_id] <= 0:
+                    results[(student_id, offering_id)] = RESULT_FULL
+                else:
+                    capacity[offering_id] -= 1
+                    courses.add(course_id)
+                    if mask:
+                        days[day_of_week] = days.get(day_of_week, 0) | mask
+                    admitted.append((student_id, offering_id))
+                    results[(student_id, offering_id)] = RESULT_ADMITTED
+                    break
+            position[student_id] = i
+            if i < len(items):
+                remaining.append(student_id)
+        active = remaining
+    return admitted, results
+
+
+class LotteryService:
+    """志愿抽签选课服务类"""
+
+    _open_terms = None
+    _stamp = None
+    _loaded_at = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def open_terms():
+        """
+        正在收集志愿（尚未分配）的学期集合
+
+        结果缓存在进程内，共享存储中的版本号变化或超过 TTL 时重新查询，
+        选课热路径上只需一次共享存储读取。
+
+        Returns:
+            frozenset: 学期键集合
+        """
+        stamp = get_store().get(LOTTERY_VERSION_KEY, 0)
+        with LotteryService._lock:
+            terms = LotteryService._open_terms
+            if terms is not None and LotteryService._stamp == stamp \
+                    and time.monotonic() - LotteryService._loaded_at < LOTTERY_CACHE_TTL:
+                return terms
+        rows = db.session.query(PreferenceRound.academic_year, PreferenceRound.semester)\
+            .filter(PreferenceRound.status == STATUS_COLLECTING).all()
+        terms = frozenset(_term_key(row.academic_year, row.semester) for row in rows)
+        with LotteryService._lock:
+            LotteryService._open_terms = terms
+            LotteryService._stamp = stamp
+            LotteryService._loaded_at = time.monotonic()
+        return terms
+
+    @staticmethod
+    def check_enrollment_open(offering, open_terms=None):
+        """
+        检查开课所在学期是否允许先到先得选课
+
+        Args:
+            offering: 开课对象
+            open_terms: 预先取得的 open_terms()（批量检查时复用）
+
+        Raises:
+            ServiceError: 学期正在收集志愿
+        """
+        terms = LotteryService.open_terms() if open_terms is None else open_terms
+        if terms and _term_key(offering.academic_year, offering.semester) in terms:
+            raise ServiceError("本学期采用志愿抽签选课，请在志愿提交时间内提交志愿")
+
+    @staticmethod
+    def invalidate():
+        """递增轮次版本号，使所有进程的轮次缓存失效"""
+        get_store().incr(LOTTERY_VERSION_KEY)
+
+    @staticmethod
+    def _round_dict(preference_round):
+        return {
+            'academic_year': preference_round.academic_year,
+            'semester': 1 if preference_round.semester else 0,
+            'opens_at': preference_round.opens_at.isoformat(),
+            'closes_at': preference_round.closes_at.isoformat(),
+            'policy': preference_round.policy,
+            'seed': preference_round.seed,
+            'status': preference_round.status,
+            'allocated_at': preference_round.allocated_at.isoformat() if preference_round.allocated_at else None
+        }
+
+    @staticmethod
+    def list_rounds():
+        """全部志愿轮次（按学期倒序）"""
+        rounds = PreferenceRound.query.order_by(
+            PreferenceRound.academic_year.desc(), PreferenceRound.semester.desc()
+        ).all()
+        return [LotteryService._round_dict(item) for item in rounds]
+
+    @staticmethod
+    def save_round(data):
+        """
+        创建或修改学期志愿轮次
+
+        Args:
+            data: academic_year、semester、opens_at、closes_at（ISO 格式）、policy、seed
+
+        Returns:
+            dict: 轮次信息
+
+        Raises:
+            ServiceError: 参数错误或轮次已分配
+        """
+        academic_year = str(data.get('academic_year') or '').strip()
+        semester = data.get('semester')
+        if not academic_year or semester not in (0, 1, True, False):
+            raise ServiceError("请指定学年与学期")
+        try:
+            opens_at = datetime.fromisoformat(data['opens_at'])
+            closes_at = datetime.fromisoformat(data['closes_at'])
+            seed = int(data.get('seed', random.randrange(1 << 31)))
+        except (KeyError, TypeError, ValueError):
+            raise ServiceError("opens_at、closes_at 需为 ISO 格式时间，seed 需为整数")
+        if opens_at >= closes_at:
+            raise ServiceError("志愿提交开始时间必须早于截止时间")
+        policy = data.get('policy', POLICY_RANDOM)
+        if policy not in POLICIES:
+            raise ServiceError(f"分配顺序只能是 {'、'.join(POLICIES)}")
+
+        preference_round = db.session.get(PreferenceRound, (academic_year, bool(semester)))
+        if preference_round is None:
+            preference_round = PreferenceRound(academic_year=academic_year, semester=bool(semester))
+            db.session.add(preference_round)
+        elif preference_round.status == STATUS_ALLOCATED:
+            raise ServiceError("该学期志愿已分配，不能修改")
+        preference_round.opens_at = opens_at
+        preference_round.closes_at = closes_at
+        preference_round.policy = policy
+        preference_round.seed = seed
+        preference_round.status = STATUS_COLLECTING
+        db.session.commit()
+        LotteryService.invalidate()
+        return LotteryService._round_dict(preference_round)
+
+    @staticmethod
+    def submit_wishlist(student_id, academic_year, semester, offering_ids, max_length):
+        """
+        提交（整体替换）学生的学期志愿
+
+        只校验开课属于该学期，不检查名额、时间冲突与先修要求，这些在分配时统一处理。
+
+        Args:
+            student_id: 学生ID
+            academic_year: 学年
+            semester: 学期
+            offering_ids: 按志愿顺序排列的开课ID列表
+            max_length: 志愿数上限
+
+        Returns:
+            dict: 提交结果
+
+        Raises:
+            ServiceError: 不在提交时间内、志愿过多或开课不属于该学期
+        """
+        preference_round = db.session.get(PreferenceRound, (academic_year, bool(semester)))
+        now = datetime.now()
+        if preference_round is None or preference_round.status != STATUS_COLLECTING \
+                or not preference_round.opens_at <= now <= preference_round.closes_at:
+            raise ServiceError("当前不在志愿提交时间内")
+
+        offering_ids = list(dict.fromkeys(str(offering_id) for offering_id in offering_ids))
+        if len(offering_ids) > max_length:
+            raise ServiceError(f"最多填报 {max_length} 个志愿")
+        if offering_ids:
+            found = {row[0] for row in db.session.query(CourseOffering.offering_id).filter(
+                CourseOffering.offering_id.in_(offering_ids),
+                CourseOffering.academic_year == academic_year,
+                CourseOffering.semester == bool(semester)
+            ).all()}
+            missing = [offering_id for offering_id in offering_ids if offering_id not in found]
+            if missing:
+                raise ServiceError(f"开课 {missing[0]} 不存在或不属于本学期")
+
+        db.session.query(EnrollmentWish).filter(
+            EnrollmentWish.student_id == student_id,
+            EnrollmentWish.academic_year == academic_year,
+            EnrollmentWish.semester == bool(semester)
+        ).delete(synchronize_session=False)
+        if offering_ids:
+            db.session.execute(insert(EnrollmentWish), [{
+                'student_id': student_id, 'offering_id': offering_id,
+                'academic_year': academic_year, 'semester': bool(semester),
+                'rank': rank, 'submitted_at': now
+            } for rank, offering_id in enumerate(offering_ids, 1)])
+        db.session.commit()
+        return {
+            'message': f'已提交 {len(offering_ids)} 个志愿',
+            'count': len(offering_ids),
+            'closes_at': preference_round.closes_at.isoformat()
+        }
+
+    @staticmethod
+    def get_wishlist(student_id, academic_year, semester):
+        """
+        查看学生的学期志愿及分配结果
+
+        Returns:
+            dict: 轮次状态与按顺序排列的志愿
+        """
+        preference_round = db.session.get(PreferenceRound, (academic_year, bool(semester)))
+        rows = db.session.query(EnrollmentWish.offering_id, EnrollmentWish.rank, EnrollmentWish.result)\
+            .filter(
+                EnrollmentWish.student_id == student_id,
+                EnrollmentWish.academic_year == academic_year,
+                EnrollmentWish.semester == bool(semester)
+            ).order_by(EnrollmentWish.rank).all()
+        return {
+            'round': LotteryService._round_dict(preference_round) if preference_round else None,
+            'wishes': [{'offering_id': row.offering_id, 'rank': row.rank, 'result': row.result} for row in rows]
+        }
+
+    @staticmethod
+    def allocate_round(academic_year, semester, force=False, dry_run=False):
+        """
+        分配学期志愿并批量写入选课记录
+
+        Args:
+            academic_year: 学年
+            semester: 学期
+            force: 未到截止时间也立即分配
+            dry_run: 只计算分配结果，不写数据库
+
+        Returns:
+            dict: 分配统计与各阶段耗时
+
+        Raises:
+            ServiceError: 轮次不存在、已分配、未截止，或分配期间名额发生变化
+        """
+        timings = {}
+        started = time.perf_counter()
+        preference_round = db.session.get(PreferenceRound, (academic_year, bool(semester)))
+        if preference_round is None:
+            raise ServiceError("该学期没有志愿轮次", 404)
+        if preference_round.status != STATUS_COLLECTING:
+            raise ServiceError("该学期志愿已分配")
+        if not force and datetime.now() < preference_round.closes_at:
+            raise ServiceError("志愿提交尚未截止")
+
+        term = (EnrollmentWish.academic_year == academic_year, EnrollmentWish.semester == bool(semester))
+        wishers = select(EnrollmentWish.student_id).where(*term).distinct()
+
+        # 1. 学期开课与剩余名额
+        rows = db.session.query(
+            CourseOffering.offering_id, CourseOffering.course_id, CourseOffering.max_students,
+            CourseOffering.day_of_week, CourseOffering.start_time, CourseOffering.end_time
+        ).filter(
+            CourseOffering.academic_year == academic_year,
+            CourseOffering.semester == bool(semester)
+        ).all()
+        offerings = {}
+        max_students = {}
+        for row in rows:
+            mask = interval_mask(row.start_time, row.end_time) \
+                if row.day_of_week and row.start_time and row.end_time else 0
+            offerings[row.offering_id] = (row.course_id, row.day_of_week, mask)
+            max_students[row.offering_id] = row.max_students
+        seats = SeatCounter.get_many(offerings) if offerings else {}
+        capacity = {offering_id: max(max_students[offering_id] - seats[offering_id], 0)
+                    for offering_id in offerings}
+
+        # 2. 志愿（按学生、志愿顺序）
+        wishes = {}
+        for student_id, offering_id in db.session.query(EnrollmentWish.student_id, EnrollmentWish.offering_id)\
+                .filter(*term).order_by(EnrollmentWish.student_id, EnrollmentWish.rank).all():
+            if offering_id in offerings:
+                wishes.setdefault(student_id, []).append(offering_id)
+
+        # 3. 参与学生已有的选课：已选课程与课表占用（与先到先得选课的检查口径一致）
+        taken = {}
+        busy = {}
+        for row in db.session.query(
+            Enrollment.student_id, CourseOffering.course_id, CourseOffering.day_of_week,
+            CourseOffering.start_time, CourseOffering.end_time
+        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+         .filter(Enrollment.student_id.in_(wishers)).all():
+            taken.setdefault(row.student_id, set()).add(row.course_id)
+            if row.day_of_week and row.start_time and row.end_time:
+                days = busy.setdefault(row.student_id, {})
+                days[row.day_of_week] = days.get(row.day_of_week, 0) | interval_mask(row.start_time, row.end_time)
+
+        # 4. 先修要求：只为填报了有先修要求课程的学生查询已通过课程
+        graph = PrerequisiteCache.get()
+        blocked = set()
+        gated = {course_id for course_id, _, _ in offerings.values() if graph.direct(course_id)}
+        if gated:
+            required = set().union(*(graph.direct(course_id) for course_id in gated))
+            passed = {}
+            for student_id, course_id in db.session.query(Enrollment.student_id, CourseOffering.course_id)\
+                    .join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+                    .filter(
+                        Enrollment.student_id.in_(wishers),
+                        Enrollment.score >= PASSING_SCORE,
+                        CourseOffering.course_id.in_(required)
+                    ).all():
+                passed.setdefault(student_id, set()).add(course_id)
+            for student_id, items in wishes.items():
+                for offering_id in items:
+                    course_id = offerings[offering_id][0]
+                    if course_id in gated and graph.missing(course_id, passed.get(student_id, set())):
+                        blocked.add((student_id, course_id))
+
+        # 5. 分配顺序
+        rng = random.Random(preference_round.seed)
+        order = sorted(wishes)
+        rng.shuffle(order)
+        if preference_round.policy == POLICY_PRIORITY:
+            credits = dict(db.session.query(Student.student_id, Student.total_credits)
+                           .filter(Student.student_id.in_(wishers)).all())
+            # 入学年份早（学号前缀小）优先，其次已获学分高，同等条件保持随机顺序
+            order.sort(key=lambda student_id: (student_id[:COHORT_PREFIX_LENGTH], -(credits.get(student_id) or 0)))
+        timings['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        admitted, results = allocate(order, wishes, offerings, capacity, taken, busy, blocked)
+        timings['allocate_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        summary = {}
+        for result in results.values():
+            summary[result] = summary.get(result, 0) + 1
+        wish_count = sum(len(items) for items in wishes.values())
+        first_choice = sum(1 for student_id, items in wishes.items()
+                           if results.get((student_id, items[0])) == RESULT_ADMITTED)
+        report = {
+            'academic_year': academic_year,
+            'semester': 1 if semester else 0,
+            'policy': preference_round.policy,
+            'seed': preference_round.seed,
+            'student_count': len(wishes),
+            'wish_count': wish_count,
+            'admitted_count': len(admitted),
+            'first_choice_rate': round(first_choice / len(wishes), 4) if wishes else 0,
+            'results': summary,
+            'dry_run': dry_run,
+            'timings': timings
+        }
+        if dry_run:
+            return report
+
+        started = time.perf_counter()
+        LotteryService._write(preference_round, admitted, results)
+        timings['write_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return report
+
+    @staticmethod
+    def _write(preference_round, admitted, results):
+        """在同一事务中按开课一次性占用名额，再批量写入选课记录与志愿结果"""
+        per_offering = {}
+        for _, offering_id in admitted:
+            per_offering[offering_id] = per_offering.get(offering_id, 0) + 1
+        try:
+            for offering_id, count in per_offering.items():
+                if SeatReservationService.reserve_seat(offering_id, count) is None:
+                    raise ServiceError("分配期间开课人数发生变化，请重新分配")
+
+            enrollment_date = datetime.utcnow()
+            for chunk in _chunks(admitted):
+                db.session.execute(insert(Enrollment), [{
+                    'offering_id': offering_id, 'student_id': student_id,
+                    'enrollment_date': enrollment_date, 'updated_at': enrollment_date
+                } for student_id, offering_id in chunk])
+            # 按主键批量更新志愿结果
+            updates = [{'student_id': student_id, 'offering_id': offering_id, 'result': result}
+                       for (student_id, offering_id), result in results.items()]
+            for chunk in _chunks(updates):
+                db.session.execute(update(EnrollmentWish), chunk)
+
+            preference_round.status = STATUS_ALLOCATED
+            preference_round.allocated_at = datetime.now()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        TimetableCache.invalidate()
+        LotteryService.invalidate()
@@ -0,0 +1,229 @@
+"""
+密码校验服务
+bcrypt 校验放到独立的进程池中执行（进程数默认等于 CPU 核数），请求线程只等待结果；
+排队中的校验数达到 PASSWORD_QUEUE_LIMIT 时立即拒绝（503），选课开放时的登录高峰
+不会占满所有 worker 的 CPU、拖慢其他接口。
+校验成功的 (用户, 密码哈希, 密码) 以带密钥的 HMAC 摘要缓存 PASSWORD_CACHE_TTL 秒
+（进程内 LRU，最多 PASSWORD_CACHE_SIZE 条），同一用户短时间内重复登录不再计算 bcrypt。
+缓存只保存摘要、不保存明文，密钥在进程启动时随机生成；修改密码后哈希变化，旧摘要自然失效。
+成本因子按环境配置（BCRYPT_ROUNDS），批量开通账号同样按该成本计算，靠进程池并行提高吞吐；
+登录时发现保存的哈希成本与目标不一致（如调整了 BCRYPT_ROUNDS），就用本次的明文按目标成本重新计算（对用户透明）
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+import bcrypt
+from flask import current_app
+
+from app.models import bcrypt_rounds
+from .exceptions import LoginBusyError
+
+# 批量计算哈希时每个子进程一次领取的任务数约为 总数 / (进程数 * CHUNKS_PER_WORKER)
+CHUNKS_PER_WORKER = 4
+
+
+def _checkpw(password, password_hash):
+    """在进程池中执行的 bcrypt 校验（只依赖 bcrypt）"""
+    try:
+        return bcrypt.checkpw(password, password_hash)
+    except ValueError:
+        # 哈希格式无效（如导入数据中的占位密码）视为校验失败
+        return False
+
+
+def _hashpw(password, rounds):
+    """在进程池中执行的 bcrypt 哈希计算"""
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def hash_cost(password_hash):
+    """
+    解析 bcrypt 哈希（$2b$12$...）中的成本因子
+
+    Returns:
+        int: 成本因子；不是 bcrypt 哈希时返回 None
+    """
+    parts = password_hash.split('$')
+    if len(parts) == 4 and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+
+class PasswordService:
+    """密码校验服务类"""
+
+    _secret = os.urandom(32)
+    _lock = threading.Lock()
+    _pool = None
+    _pool_pid = None
+    _pending = 0
+
+    _cache = OrderedDict()  # 摘要 -> 过期时间
+    _stats = {'cache_hits': 0, 'computed': 0, 'rejected': 0}
+
+    @staticmethod
+    def verify(principal, password, password_hash):
+        """
+        校验密码
+
+        Args:
+            principal: 用户标识（如 'student:2021001'），参与缓存摘要
+            password: 明文密码
+            password_hash: 数据库中保存的 bcrypt 哈希
+
+        Returns:
+            bool: 密码是否正确
+
+        Raises:
+            LoginBusyError: 等待校验的请求过多或校验超时
+        """
+        config = current_app.config
+        digest = PasswordService._digest(principal, password, password_hash)
+        now = time.monotonic()
+        with PasswordService._lock:
+            expires_at = PasswordService._cache.get(digest)
+            if expires_at is not None:
+                if expires_at > now:
+                    PasswordService._cache.move_to_end(digest)
+                    PasswordService._stats['cache_hits'] += 1
+                    return True
+                del PasswordService._cache[digest]
+
+        ok = PasswordService._run(_checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+        if ok:
+            PasswordService._remember(digest, config)
+        return ok
+
+    @staticmethod
+    def rehash_if_needed(principal, password, user):
+        """
+        登录成功后，保存的哈希成本与 BCRYPT_ROUNDS 不一致时按目标成本重新计算（不提交）
+
+        Args:
+            principal: 用户标识
+            password: 本次登录校验通过的明文密码
+            user: 用户模型对象
+
+        Returns:
+            bool: 是否更新了密码哈希
+        """
+        rounds = bcrypt_rounds()
+        if hash_cost(user.password) == rounds:
+            return False
+        try:
+            user.password = PasswordService._run(_hashpw, password.encode('utf-8'), rounds)
+        except LoginBusyError:
+            # 登录高峰时不额外排队，下次登录再升级
+            return False
+        PasswordService._remember(PasswordService._digest(principal, password, user.password), current_app.config)
+        return True
+
+    @staticmethod
+    def hash_many(passwords, rounds=None, workers=None):
+        """
+        批量计算密码哈希（批量开通账号），分布到独立的进程池并行计算，不占用登录校验的进程池
+
+        Args:
+            passwords: 明文密码列表
+            rounds: 成本因子，默认 BCRYPT_ROUNDS
+            workers: 进程数，默认 CPU 核数
+
+        Returns:
+            list: 与输入顺序一致的哈希列表
+        """
+        rounds = rounds or bcrypt_rounds()
+        workers = workers or os.cpu_count() or 1
+        encoded = [password.encode('utf-8') for password in passwords]
+        if workers == 1 or len(encoded) < workers * CHUNKS_PER_WORKER:
+            return [_hashpw(password, rounds) for password in encoded]
+        chunksize = max(len(encoded) // (workers * CHUNKS_PER_WORKER), 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_hashpw, encoded, repeat(rounds), chunksize=chunksize))
+
+    @staticmethod
+    def _digest(principal, password, password_hash):
+        return hmac.new(
+            PasswordService._secret,
+            f'{principal}\0{password_hash}\0{password}'.encode('utf-8'),
+            hashlib.sha256
+        ).digest()
+
+    @staticmethod
+    def _remember(digest, config):
+        ttl = config.get('PASSWORD_CACHE_TTL', 300)
+        size = config.get('PASSWORD_CACHE_SIZE', 10000)
+        if ttl <= 0 or size <= 0:
+            return
+        with PasswordService._lock:
+            PasswordService._cache[digest] = time.monotonic() + ttl
+            PasswordService._cache.move_to_end(digest)
+            while len(PasswordService._cache) > size:
+                PasswordService._cache.popitem(last=False)
+
+    @staticmethod
+    def _run(fn, *args):
+        """在登录进程池中执行 bcrypt 计算，排队过多时快速拒绝"""
+        config = current_app.config
+        workers = config.get('PASSWORD_WORKERS', 0)
+        if workers < 0:
+            # 不使用进程池，在请求线程内计算
+            return fn(*args)
+
+        with PasswordService._lock:
+            if PasswordService._pending >= config.get('PASSWORD_QUEUE_LIMIT', 64):
+                PasswordService._stats['rejected'] += 1
+                raise LoginBusyError()
+            PasswordService._pending += 1
+            pool = PasswordService._get_pool(workers)
+        try:
+            future = pool.submit(fn, *args)
+            try:
+                result = future.result(timeout=config.get('PASSWORD_TIMEOUT', 10))
+            except FutureTimeoutError:
+                future.cancel()
+                with PasswordService._lock:
+                    PasswordService._stats['rejected'] += 1
+                raise LoginBusyError()
+            with PasswordService._lock:
+                PasswordService._stats['computed'] += 1
+            return result
+        except BrokenProcessPool:
+            # 子进程异常退出：丢弃进程池（下次重建），本次在请求线程内计算
+            with PasswordService._lock:
+                if PasswordService._pool is pool:
+                    PasswordService._pool = None
+            return fn(*args)
+        finally:
+            with PasswordService._lock:
+                PasswordService._pending -= 1
+
+    @staticmethod
+    def _get_pool(workers):
+        # 调用方已持有锁；fork 出的 worker 进程不能沿用父进程的进程池
+        if PasswordService._pool is None or PasswordService._pool_pid != os.getpid():
+            PasswordService._pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+            PasswordService._pool_pid = os.getpid()
+        return PasswordService._pool
+
+    @staticmethod
+    def stats():
+        """缓存命中、bcrypt 计算与拒绝次数，缓存条数与当前排队数"""
+        with PasswordService._lock:
+            return {
+                **PasswordService._stats,
+                'cached': len(PasswordService._cache),
+                'pending': PasswordService._pending
+            }
+
+    @staticmethod
+    def clear_cache():
+        """清空已校验缓存"""
+        with PasswordService._lock:
+            PasswordService._cache.clear()
@@ -0,0 +1,175 @@
+"""
+先修课程关系图缓存
+从 course_prerequisites 一次性构建先修关系图，预计算传递闭包并检测环，
+选课时只需"一次已通过课程查询 + 集合差"即可完成先修检查
+"""
+import threading
+import time
+
+from flask import has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models import Course, course_prerequisites
+from .shared_store import get_store
+
+# 缓存最长存活时间（秒），兜底 SQL 脚本直接修改先修关系的情况
+PREREQUISITE_CACHE_TTL = 300
+
+# 先修关系版本号，其他进程修改先修关系后据此重建
+PREREQUISITE_VERSION_KEY = 'prerequisite:version'
+
+
+class PrerequisiteGraph:
+    """先修关系图（构建后只读）"""
+
+    def __init__(self, edges, course_names):
+        """
+        Args:
+            edges: dict，course_id -> 直接先修课程ID集合
+            course_names: dict，course_id -> 课程名
+        """
+        self.edges = {course_id: frozenset(prereqs) for course_id, prereqs in edges.items()}
+        self.course_names = course_names
+        self.closure, self.cyclic_courses = self._compute_closure(self.edges)
+
+    @classmethod
+    def load(cls):
+        """从数据库构建先修关系图（两次查询）"""
+        edges = {}
+        for course_id, prerequisite_id in db.session.query(
+            course_prerequisites.c.course_id, course_prerequisites.c.prerequisite_id
+        ).all():
+            edges.setdefault(course_id, set()).add(prerequisite_id)
+        course_names = dict(db.session.query(Course.course_id, Course.course_name).all())
+        return cls(edges, course_names)
+
+    @staticmethod
+    def _compute_closure(edges):
+        """
+        计算每门课程的全部（传递）先修课程，并找出处于环上的课程
+
+        课程目录规模有限，逐个起点做一次迭代式 DFS 即可（O(V·E)）。
+
+        Returns:
+            tuple: (闭包 dict, 环上课程集合)
+        """
+        closure = {}
+        for root, prereqs in edges.items():
+            reach = set()
+            stack = list(prereqs)
+            while stack:
+                node = stack.pop()
+                if node in reach:
+                    continue
+                reach.add(node)
+                stack.extend(edges.get(node, ()))
+            closure[root] = frozenset(reach)
+        cyclic = {course_id for course_id, reach in closure.items() if course_id in reach}
+        return closure, cyclic
+
+    def direct(self, course_id):
+        """课程的直接先修课程ID集合"""
+        return self.edges.get(course_id, frozenset())
+
+    def all_prerequisites(self, course_id):
+        """课程的全部（传递）先修课程ID集合"""
+        return self.closure.get(course_id, frozenset())
+
+    def would_create_cycle(self, course_id, prerequisite_ids):
+        """
+        判断把 course_id 的直接先修设置为 prerequisite_ids 后是否会形成环
+
+        Args:
+            course_id: 课程ID
+            prerequisite_ids: 新的直接先修课程ID集合
+
+        Returns:
+            bool: 是否会形成环
+        """
+        return any(
+            prerequisite_id == course_id or course_id in self.all_prerequisites(prerequisite_id)
+            for prerequisite_id in prerequisite_ids
+        )
+
+    def missing(self, course_id, passed_course_ids):
+        """
+        返回尚未通过的直接先修课程ID（按课程ID排序）
+
+        Args:
+            course_id: 课程ID
+            passed_course_ids: 已通过的课程ID集合
+
+        Returns:
+            list: 未满足的先修课程ID列表
+        """
+        return sorted(self.direct(course_id) - passed_course_ids)
+
+
+class PrerequisiteCache:
+    """进程内先修关系图缓存，以共享存储中的先修关系版本号判断是否过期"""
+
+    _graph = None
+    _version = None
+    _loaded_at = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get():
+        """获取先修关系图，版本号变化、过期或失效时重建"""
+        version = get_store().get(PREREQUISITE_VERSION_KEY, 0)
+        graph = PrerequisiteCache._graph
+        if (graph is not None and PrerequisiteCache._version == version
+                and time.monotonic() - PrerequisiteCache._loaded_at < PREREQUISITE_CACHE_TTL):
+            return graph
+        with PrerequisiteCache._lock:
+            graph = PrerequisiteGraph.load()
+            PrerequisiteCache._graph = graph
+            PrerequisiteCache._version = version
+            PrerequisiteCache._loaded_at = time.monotonic()
+        return graph
+
+    @staticmethod
+    def invalidate():
+        """使所有进程的先修关系图失效，下次访问时重建（须在提交后调用）"""
+        get_store().incr(PREREQUISITE_VERSION_KEY)
+        PrerequisiteCache._graph = None
+
+    @staticmethod
+    def warm(app):
+        """应用启动时预先构建先修关系图"""
+        with app.app_context():
+            PrerequisiteCache.get()
+
+
+# 通过 ORM 修改先修关系、新增、删除或改名课程时，提交后使缓存失效
+@event.listens_for(Course.prerequisites, 'append')
+@event.listens_for(Course.prerequisites, 'remove')
+def _on_prerequisites_changed(target, value, initiator):
+    session = object_session(target)
+    if session is not None:
+        session.info['prerequisites_changed'] = True
+
+
+@event.listens_for(Session, 'before_flush')
+def _mark_prerequisite_changes(session, flush_context, instances):
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Course):
+            session.info['prerequisites_changed'] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Course) and inspect(obj).attrs.course_name.history.has_changes():
+            session.info['prerequisites_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_prerequisites(session):
+    # 提交后再递增版本号，保证重建时能读到新的先修关系
+    if session.info.pop('prerequisites_changed', False) and has_app_context():
+        PrerequisiteCache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_prerequisite_changes(session):
+    session.info.pop('prerequisites_changed', None)
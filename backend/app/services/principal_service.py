@@ -0,0 +1,230 @@
+"""
+登录用户资料缓存
+访问令牌只携带用户ID、用户类型与用户版本号，姓名、班级、已修学分等资料在需要时由这里解析：
+进程内 LRU（最多 PRINCIPAL_CACHE_SIZE 条，有效期 PRINCIPAL_CACHE_TTL 秒）缓存用户资料，
+命中时用共享存储中的版本号校验。管理员、教师、学生记录被修改或删除（含修改密码）、
+学分台账回写已修学分后，提交时递增该用户的版本号；班级改名递增全局代数，
+各 worker 下一次读取时发现版本变化即从数据库重新加载
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Admin, Class, Student, Teacher
+from .ledger_service import on_ledger_commit
+from .shared_store import get_store
+
+PRINCIPAL_VERSION_PREFIX = 'principal:version:'
+PRINCIPAL_GENERATION_KEY = 'principal:generation'
+
+_MODELS = {'admin': Admin, 'teacher': Teacher, 'student': Student}
+
+# 不影响用户资料与登录状态的字段
+_IGNORED_FIELDS = {'updated_at', 'created_at'}
+
+
+def _principal_of(obj):
+    """模型对象对应的 (用户类型, 用户ID)，不是用户模型时返回 None"""
+    if isinstance(obj, Admin):
+        return 'admin', obj.admin_id
+    if isinstance(obj, Teacher):
+        return 'teacher', obj.teacher_id
+    if isinstance(obj, Student):
+        return 'student', obj.student_id
+    return None
+
+
+def principal_info(user_type, user):
+    """
+    构造用户资料（登录响应与令牌校验接口返回的 user 数据）
+
+    Args:
+        user_type: 用户类型 admin/teacher/student
+        user: 用户模型对象
+
+    Returns:
+        dict: 用户资料
+    """
+    if user_type == 'admin':
+        return {
+            'id': user.admin_id,
+            'name': user.name,
+            'username': user.username,
+            'type': 'admin'
+        }
+    if user_type == 'teacher':
+        return {
+            'id': user.teacher_id,
+            'name': user.name,
+            'gender': user.gender,
+            'age': user.age,
+            'title': user.title,
+            'phone': user.phone,
+            'type': 'teacher'
+        }
+    return {
+        'id': user.student_id,
+        'name': user.name,
+        'gender': user.gender,
+        'age': user.age,
+        'hometown': user.hometown,
+        'total_credits': user.total_credits,
+        'class_id': user.class_id,
+        'class_name': user.class_info.class_name if user.class_info else '',
+        'type': 'student'
+    }
+
+
+class PrincipalCache:
+    """登录用户资料缓存类"""
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # (用户类型, 用户ID) -> (代数, 版本号, 过期时间, 资料)
+    _stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def version(user_type, user_id):
+        """
+        用户当前的版本号（写入访问令牌的 ver 声明）
+
+        Returns:
+            int: 版本号，从未修改过的用户为 0
+        """
+        return int(get_store().get(f'{PRINCIPAL_VERSION_PREFIX}{user_type}:{user_id}', 0))
+
+    @staticmethod
+    def get(user_type, user_id):
+        """
+        解析用户资料
+
+        Args:
+            user_type: 用户类型
+            user_id: 用户ID
+
+        Returns:
+            dict: 用户资料；用户不存在时返回 None
+        """
+        model = _MODELS.get(user_type)
+        if model is None:
+            return None
+        version_key = f'{PRINCIPAL_VERSION_PREFIX}{user_type}:{user_id}'
+        # 先读版本号再加载，加载期间提交的修改会使这次缓存的条目在下次读取时失效
+        versions = get_store().get_many([PRINCIPAL_GENERATION_KEY, version_key])
+        generation = int(versions.get(PRINCIPAL_GENERATION_KEY, 0))
+        version = int(versions.get(version_key, 0))
+        key = (user_type, user_id)
+        now = time.monotonic()
+        with PrincipalCache._lock:
+            entry = PrincipalCache._entries.get(key)
+            if entry is not None:
+                if entry[0] == generation and entry[1] == version and entry[2] > now:
+                    PrincipalCache._entries.move_to_end(key)
+                    PrincipalCache._stats['hits'] += 1
+                    return entry[3]
+                del PrincipalCache._entries[key]
+            PrincipalCache._stats['misses'] += 1
+
+        user = db.session.get(model, user_id)
+        if user is None:
+            return None
+        info = principal_info(user_type, user)
+
+        config = current_app.config
+        ttl = config.get('PRINCIPAL_CACHE_TTL', 300)
+        size = config.get('PRINCIPAL_CACHE_SIZE', 10000)
+        if ttl > 0 and size > 0:
+            with PrincipalCache._lock:
+                PrincipalCache._entries[key] = (generation, version, now + ttl, info)
+                PrincipalCache._entries.move_to_end(key)
+                while len(PrincipalCache._entries) > size:
+                    PrincipalCache._entries.popitem(last=False)
+        return info
+
+    @staticmethod
+    def invalidate(principals):
+        """
+        递增用户版本号并丢弃本进程的缓存条目（需在修改提交后调用）
+
+        Args:
+            principals: (用户类型, 用户ID) 的可迭代对象
+        """
+        principals = list(principals)
+        with PrincipalCache._lock:
+            for principal in principals:
+                PrincipalCache._entries.pop(principal, None)
+        store = get_store()
+        for user_type, user_id in principals:
+            store.incr(f'{PRINCIPAL_VERSION_PREFIX}{user_type}:{user_id}')
+
+    @staticmethod
+    def bump_generation():
+        """使所有用户的缓存资料失效（如班级改名）"""
+        get_store().incr(PRINCIPAL_GENERATION_KEY)
+        PrincipalCache.clear()
+
+    @staticmethod
+    def stats():
+        """命中、未命中次数与缓存条数"""
+        with PrincipalCache._lock:
+            return {**PrincipalCache._stats, 'cached': len(PrincipalCache._entries)}
+
+    @staticmethod
+    def clear():
+        """清空本进程的缓存"""
+        with PrincipalCache._lock:
+            PrincipalCache._entries.clear()
+
+
+@event.listens_for(Session, 'before_flush')
+def _mark_principal_changes(session, flush_context, instances):
+    changed = session.info.setdefault('principal_changes', set())
+    for obj in session.deleted:
+        principal = _principal_of(obj)
+        if principal:
+            changed.add(principal)
+    for obj in session.dirty:
+        principal = _principal_of(obj)
+        if principal is None and not isinstance(obj, Class):
+            continue
+        # 只看列字段，选课等关系集合的变化不影响用户资料
+        state = inspect(obj)
+        fields = {attr.key for attr in state.attrs
+                  if attr.key in state.mapper.column_attrs and attr.history.has_changes()}
+        if not fields - _IGNORED_FIELDS:
+            continue
+        if principal:
+            changed.add(principal)
+        elif 'class_name' in fields:
+            session.info['principal_generation'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_principal_versions(session):
+    # 提交后再递增版本号，保证重新加载时能读到新数据
+    changed = session.info.pop('principal_changes', None)
+    generation = session.info.pop('principal_generation', False)
+    if not has_app_context():
+        return
+    if changed:
+        PrincipalCache.invalidate(changed)
+    if generation:
+        PrincipalCache.bump_generation()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_principal_changes(session):
+    session.info.pop('principal_changes', None)
+    session.info.pop('principal_generation', None)
+
+
+@on_ledger_commit
+def _invalidate_credit_changes(student_ids, rebuilt):
+    # 台账回写 students.total_credits 使用批量 UPDATE，不经过 flush 检测
+    if rebuilt:
+        PrincipalCache.bump_generation()
+    else:
+        PrincipalCache.invalidate(('student', student_id) for student_id in student_ids)
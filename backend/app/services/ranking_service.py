@@ -0,0 +1,379 @@
+"""
+学生成绩排名服务
+按学生平均成绩计算班级、专业（同年级同专业）、年级三级排名，支持并列名次的
+竞争排名（1,1,3）与密集排名（1,1,2）以及百分位。
+数据库支持窗口函数时一条 SQL 完成聚合与排名；否则取出聚合列后在内存中按列计算
+（安装 NumPy 时向量化）。
+结果按班级缓存，班级所涉年级有成绩变化或学生增删时失效
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import Float, and_, event, func, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Class, Enrollment, Student
+from .exceptions import ServiceError
+from .ledger_service import on_ledger_commit
+from .shared_store import get_store
+
+try:
+    import numpy as np
+except ImportError:  # 向量化排名为可选功能，未安装时使用纯 Python 实现
+    np = None
+
+# 学号前 4 位为入学年份（年级），班级编号去掉末两位序号为专业代码
+COHORT_PREFIX_LENGTH = 4
+MAJOR_PREFIX_LENGTH = 2
+
+# 并列名次的处理方式
+TIE_COMPETITION = 'competition'
+TIE_DENSE = 'dense'
+
+# 排名层级
+LEVELS = ('class', 'major', 'cohort')
+
+# 进程内最多缓存的班级排名数量
+RANKING_CACHE_SIZE = 500
+
+# 缓存最长保留时间（秒），兜底离线脚本等未能递增版本号的修改
+RANKING_CACHE_TTL = 300
+
+RANKING_GENERATION_KEY = 'ranking:generation'
+RANKING_CLASS_PREFIX = 'ranking:class:'
+RANKING_COHORT_PREFIX = 'ranking:cohort:'
+
+
+def cohort_of(student_id):
+    """学号对应的年级"""
+    return student_id[:COHORT_PREFIX_LENGTH]
+
+
+def _supports_window_functions():
+    """当前数据库是否支持窗口函数（SQLite 3.25+、MySQL 8.0+、MariaDB 10.2+ 及其他主流数据库）"""
+    engine = current_app.config.get('RANKING_ENGINE', 'auto')
+    if engine != 'auto':
+        return engine == 'sql'
+    dialect = db.engine.dialect
+    if dialect.name == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    if dialect.name == 'mysql':
+        version = dialect.server_version_info or (0,)
+        return version >= ((10, 2) if getattr(dialect, 'is_mariadb', False) else (8, 0))
+    return True
+
+
+def _student_stats(class_id):
+    """
+    与班级学生同年级的全部学生的平均成绩（一条 GROUP BY）
+
+    排名范围限定在这些年级内：专业排名为同年级同专业，年级排名为同年级全部学生。
+    """
+    cohort = func.substr(Student.student_id, 1, COHORT_PREFIX_LENGTH)
+    class_cohorts = select(cohort).where(Student.class_id == class_id).distinct()
+    return select(
+        Student.student_id,
+        Student.name,
+        Student.gender,
+        Student.total_credits,
+        Student.class_id,
+        func.substr(Student.class_id, 1, MAJOR_PREFIX_LENGTH).label('major'),
+        cohort.label('cohort'),
+        func.round(func.coalesce(func.avg(Enrollment.score), 0), 2).label('avg_score'),
+        func.count(Enrollment.score).label('course_count'),
+    ).outerjoin(Enrollment, and_(
+        Enrollment.student_id == Student.student_id,
+        Enrollment.score.isnot(None)
+    )).where(cohort.in_(class_cohorts)).group_by(Student.student_id)
+
+
+def _partitions(stats):
+    return {
+        'class': (stats.c.class_id,),
+        'major': (stats.c.cohort, stats.c.major),
+        'cohort': (stats.c.cohort,),
+    }
+
+
+def _rank_with_sql(class_id):
+    """用窗口函数在数据库中完成排名"""
+    stats = _student_stats(class_id).subquery()
+    order = stats.c.avg_score.desc()
+    columns = [stats]
+    for level, partition in _partitions(stats).items():
+        columns += [
+            func.rank().over(partition_by=partition, order_by=order).label(f'{level}_rank'),
+            func.dense_rank().over(partition_by=partition, order_by=order).label(f'{level}_dense_rank'),
+            func.percent_rank(type_=Float).over(partition_by=partition, order_by=order).label(f'{level}_percent_rank'),
+            func.count().over(partition_by=partition).label(f'{level}_size'),
+        ]
+    ranked = select(*columns).subquery()
+    rows = db.session.execute(
+        select(ranked).where(ranked.c.class_id == class_id)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _rank_columns(groups, values):
+    """
+    分组降序排名
+
+    Args:
+        groups: 每行所属分组
+        values: 每行的排名依据
+
+    Returns:
+        tuple: (竞争排名, 密集排名, percent_rank, 组内人数) 四个与输入等长的列表
+    """
+    codes = {}
+    group_codes = [codes.setdefault(group, len(codes)) for group in groups]
+    n = len(group_codes)
+    if n == 0:
+        return [], [], [], []
+
+    if np is not None:
+        g = np.asarray(group_codes, dtype=np.int64)
+        v = np.asarray(values, dtype=np.float64)
+        order = np.lexsort((-v, g))
+        gs, vs = g[order], v[order]
+        index = np.arange(n)
+        group_start = np.ones(n, dtype=bool)
+        group_start[1:] = gs[1:] != gs[:-1]
+        value_start = group_start.copy()
+        value_start[1:] |= vs[1:] != vs[:-1]
+        first_of_group = np.maximum.accumulate(np.where(group_start, index, 0))
+        first_of_value = np.maximum.accumulate(np.where(value_start, index, 0))
+        distinct = np.cumsum(value_start)
+        sizes = np.bincount(g)[gs]
+
+        competition = np.empty(n, dtype=np.int64)
+        dense = np.empty(n, dtype=np.int64)
+        percent = np.empty(n, dtype=np.float64)
+        size = np.empty(n, dtype=np.int64)
+        competition[order] = first_of_value - first_of_group + 1
+        dense[order] = distinct - distinct[first_of_group] + 1
+        percent[order] = (first_of_value - first_of_group) / np.maximum(sizes - 1, 1)
+        size[order] = sizes
+        return competition.tolist(), dense.tolist(), percent.tolist(), size.tolist()
+
+    counts = [0] * len(codes)
+    for code in group_codes:
+        counts[code] += 1
+    competition = [0] * n
+    dense = [0] * n
+    percent = [0.0] * n
+    size = [0] * n
+    previous = None
+    for i in sorted(range(n), key=lambda i: (group_codes[i], -values[i])):
+        code = group_codes[i]
+        if previous is None or previous[0] != code:
+            position, rank, dense_rank = 0, 1, 1
+        elif previous[1] != values[i]:
+            rank, dense_rank = position + 1, dense_rank + 1
+        competition[i], dense[i] = rank, dense_rank
+        percent[i] = (rank - 1) / max(counts[code] - 1, 1)
+        size[i] = counts[code]
+        previous = (code, values[i])
+        position += 1
+    return competition, dense, percent, size
+
+
+def _rank_columnar(class_id):
+    """取出聚合结果后按列计算排名（数据库不支持窗口函数时使用）"""
+    rows = [dict(row) for row in db.session.execute(_student_stats(class_id)).mappings().all()]
+    values = [row['avg_score'] for row in rows]
+    keys = {
+        'class': [row['class_id'] for row in rows],
+        'major': [(row['cohort'], row['major']) for row in rows],
+        'cohort': [row['cohort'] for row in rows],
+    }
+    for level, groups in keys.items():
+        competition, dense, percent, size = _rank_columns(groups, values)
+        for i, row in enumerate(rows):
+            row[f'{level}_rank'] = competition[i]
+            row[f'{level}_dense_rank'] = dense[i]
+            row[f'{level}_percent_rank'] = percent[i]
+            row[f'{level}_size'] = size[i]
+    return [row for row in rows if row['class_id'] == class_id]
+
+
+class ClassRanking:
+    """一个班级的排名结果（只读）"""
+
+    def __init__(self, class_id, class_name, stamp, cohorts, rows):
+        self.class_id = class_id
+        self.class_name = class_name
+        self.stamp = stamp
+        self.cohorts = cohorts
+        self.rows = sorted(rows, key=lambda row: (row['class_rank'], row['student_id']))
+        self.loaded_at = time.monotonic()
+
+    def to_dict(self, tie=TIE_COMPETITION):
+        """
+        转换为接口返回格式
+
+        Args:
+            tie: 并列名次处理方式 competition / dense
+
+        Returns:
+            dict: 班级信息与学生排名列表
+        """
+        suffix = '_dense_rank' if tie == TIE_DENSE else '_rank'
+        students = []
+        for row in self.rows:
+            student = {
+                'student_id': row['student_id'],
+                'name': row['name'],
+                'gender': row['gender'],
+                'total_credits': row['total_credits'],
+                'avg_score': row['avg_score'],
+                'course_count': row['course_count'],
+            }
+            for level in LEVELS:
+                prefix = '' if level == 'class' else f'{level}_'
+                student[f'{prefix}rank'] = row[f'{level}{suffix}']
+                student[f'{prefix}percentile'] = round((1 - row[f'{level}_percent_rank']) * 100, 1)
+                student[f'{level}_size'] = row[f'{level}_size']
+            students.append(student)
+        return {
+            'class_id': self.class_id,
+            'class_name': self.class_name,
+            'tie': tie,
+            'students': students
+        }
+
+
+def _stamp(class_id, cohorts):
+    keys = [RANKING_GENERATION_KEY, RANKING_CLASS_PREFIX + class_id]
+    keys += [RANKING_COHORT_PREFIX + cohort for cohort in cohorts]
+    values = get_store().get_many(keys)
+    return tuple(values.get(key, 0) for key in keys)
+
+
+class RankingService:
+    """成绩排名服务类"""
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_class_ranking(class_id, tie=TIE_COMPETITION):
+        """
+        获取班级学生的班级/专业/年级排名
+
+        Args:
+            class_id: 班级ID
+            tie: 并列名次处理方式 competition（1,1,3）/ dense（1,1,2）
+
+        Returns:
+            dict: 班级信息与学生排名列表
+
+        Raises:
+            ServiceError: 班级不存在或 tie 参数无效
+        """
+        if tie not in (TIE_COMPETITION, TIE_DENSE):
+            raise ServiceError("tie 参数只能是 competition 或 dense")
+
+        now = time.monotonic()
+        with RankingService._lock:
+            ranking = RankingService._entries.get(class_id)
+        if ranking is not None and now - ranking.loaded_at < RANKING_CACHE_TTL \
+                and _stamp(class_id, ranking.cohorts) == ranking.stamp:
+            with RankingService._lock:
+                if class_id in RankingService._entries:
+                    RankingService._entries.move_to_end(class_id)
+            return ranking.to_dict(tie)
+
+        ranking = RankingService._load(class_id)
+        with RankingService._lock:
+            RankingService._entries[class_id] = ranking
+            RankingService._entries.move_to_end(class_id)
+            while len(RankingService._entries) > RANKING_CACHE_SIZE:
+                RankingService._entries.popitem(last=False)
+        return ranking.to_dict(tie)
+
+    @staticmethod
+    def _load(class_id):
+        class_info = db.session.get(Class, class_id)
+        if not class_info:
+            raise ServiceError("班级不存在", 404)
+        cohorts = sorted(row[0] for row in db.session.query(
+            func.substr(Student.student_id, 1, COHORT_PREFIX_LENGTH)
+        ).filter(Student.class_id == class_id).distinct().all())
+        # 先取版本戳再计算，计算期间的修改会让下一次读取重新计算
+        stamp = _stamp(class_id, cohorts)
+        rows = _rank_with_sql(class_id) if _supports_window_functions() else _rank_columnar(class_id)
+        return ClassRanking(class_id, class_info.class_name, stamp, cohorts, rows)
+
+    @staticmethod
+    def invalidate(cohorts=(), class_ids=(), everything=False):
+        """
+        使排名缓存失效（通过共享存储中的版本号，对所有进程生效）
+
+        Args:
+            cohorts: 成绩或学生有变化的年级
+            class_ids: 学生有增删或调整的班级
+            everything: 是否全部失效
+        """
+        store = get_store()
+        if everything:
+            store.incr(RANKING_GENERATION_KEY)
+        for cohort in set(cohorts):
+            store.incr(RANKING_COHORT_PREFIX + cohort)
+        for class_id in set(class_ids):
+            store.incr(RANKING_CLASS_PREFIX + class_id)
+
+
+@on_ledger_commit
+def _on_scores_changed(student_ids, rebuilt):
+    RankingService.invalidate(
+        cohorts=(cohort_of(student_id) for student_id in student_ids),
+        everything=rebuilt
+    )
+
+
+# 只在排名结果中展示、不影响名次的学生字段，修改后只需使所在班级的缓存失效
+_DISPLAY_FIELDS = ('name', 'gender', 'total_credits')
+
+
+@event.listens_for(Student.class_id, 'set', active_history=True)
+def _load_previous_class(target, value, oldvalue, initiator):
+    # 属性已过期时也先加载原班级，保证调班后原班级的排名能从属性历史中失效
+    pass
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_student_changes(session, flush_context):
+    # 学生增删或调班（班级、专业变化）会改变所在年级的排名；其余字段（如密码）不影响排名
+    changes = session.info.setdefault('ranking_changes', set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Student):
+            changes.add((cohort_of(obj.student_id), obj.class_id))
+    for obj in session.dirty:
+        if not isinstance(obj, Student):
+            continue
+        attrs = inspect(obj).attrs
+        history = attrs.class_id.history
+        if history.has_changes():
+            changes.add((cohort_of(obj.student_id), obj.class_id))
+            changes.update((cohort_of(obj.student_id), class_id) for class_id in history.deleted if class_id)
+        elif any(getattr(attrs, field).history.has_changes() for field in _DISPLAY_FIELDS):
+            changes.add((None, obj.class_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_student_changes(session):
+    changes = session.info.pop('ranking_changes', None)
+    if changes and has_app_context():
+        RankingService.invalidate(
+            cohorts=(cohort for cohort, _ in changes if cohort),
+            class_ids=(class_id for _, class_id in changes)
+        )
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_student_changes(session):
+    session.info.pop('ranking_changes', None)
@@ -0,0 +1,225 @@
+"""
+令牌吊销服务
+访问令牌短期有效（JWT_ACCESS_TOKEN_EXPIRES），过期后用刷新令牌换取新的访问令牌。
+修改密码、删除用户时吊销该用户此前签发的全部令牌（记录 '用户类型:用户ID' 与吊销时间，精确到毫秒），
+退出登录时吊销单个令牌（记录 jti）。吊销记录保存在 revoked_tokens 表中，
+每个进程在内存中维护一份副本：校验令牌只做字典查找，外加读取一次共享存储中的吊销版本号，
+版本号变化（其他 worker 新增了吊销）时才增量加载新记录，请求路径上不查询数据库。
+受影响的令牌全部过期后，吊销记录由定期压缩（REVOCATION_COMPACT_INTERVAL）删除
+"""
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import RevokedToken
+from .shared_store import get_store
+
+REVOCATION_VERSION_KEY = 'revocation:version'
+COMPACT_LOCK_KEY = 'revocation:compact-lock'
+
+# 增量加载时向前多取的毫秒数：吊销时间在提交前生成，晚提交的记录可能早于已加载的最大吊销时间
+SYNC_SLACK_MS = 60 * 1000
+
+# 令牌永不过期时吊销记录的过期时间
+NEVER_EXPIRES = 2 ** 31 - 1
+
+
+def issued_at_ms():
+    """令牌签发时间（Unix 毫秒），写入令牌的 iat_ms 声明"""
+    return int(time.time() * 1000)
+
+
+def _lifetime(expires):
+    """JWT 有效期配置（timedelta 或 False）对应的秒数，不过期时返回 None"""
+    return int(expires.total_seconds()) if expires else None
+
+
+def max_token_lifetime():
+    """当前配置下令牌的最长有效期（秒），不过期时返回 None"""
+    config = current_app.config
+    lifetimes = [_lifetime(config.get('JWT_ACCESS_TOKEN_EXPIRES')),
+                 _lifetime(config.get('JWT_REFRESH_TOKEN_EXPIRES'))]
+    if None in lifetimes:
+        return None
+    return max(lifetimes)
+
+
+class TokenRevocation:
+    """令牌吊销服务类"""
+
+    _lock = threading.Lock()
+    _entries = {}  # key -> (吊销时间（毫秒）, 过期时间（秒）)
+    _version = None  # 已加载到的共享存储吊销版本号，None 表示尚未加载
+    _cursor = 0  # 已加载记录中最大的吊销时间，增量加载从这里开始
+    _compacted_at = 0.0
+
+    @staticmethod
+    def is_revoked(jwt_header, jwt_payload):
+        """
+        判断令牌是否已吊销（注册为 token_in_blocklist_loader）
+
+        Args:
+            jwt_header: 令牌头
+            jwt_payload: 令牌声明
+
+        Returns:
+            bool: 是否已吊销
+        """
+        TokenRevocation._sync()
+        # 刷新令牌的 type 声明固定为 refresh，用户类型在 user_type 中
+        user_type = jwt_payload.get('user_type') or jwt_payload.get('type')
+        with TokenRevocation._lock:
+            if jwt_payload.get('jti') in TokenRevocation._entries:
+                return True
+            entry = TokenRevocation._entries.get(f"{user_type}:{jwt_payload.get('sub')}")
+        if entry is None:
+            return False
+        # 没有 iat_ms 的令牌只有秒级签发时间，与吊销同一秒签发的也视为已吊销
+        issued = jwt_payload.get('iat_ms') or (jwt_payload.get('iat', 0) * 1000 + 999)
+        return issued < entry[0]
+
+    @staticmethod
+    def revoke_token(jwt_payload):
+        """
+        吊销单个令牌（如退出登录），在当前事务中写入，提交后生效
+
+        Args:
+            jwt_payload: 令牌声明
+        """
+        expires_at = jwt_payload.get('exp') or NEVER_EXPIRES
+        TokenRevocation._record(jwt_payload['jti'], issued_at_ms(), expires_at)
+
+    @staticmethod
+    def revoke_principal(user_type, user_id):
+        """
+        吊销用户此前签发的全部令牌（修改密码、删除用户），在当前事务中写入，提交后生效
+
+        Args:
+            user_type: 用户类型
+            user_id: 用户ID
+        """
+        lifetime = max_token_lifetime()
+        # 令牌不过期时吊销记录永久保留
+        expires_at = int(time.time()) + lifetime if lifetime else NEVER_EXPIRES
+        TokenRevocation._record(f'{user_type}:{user_id}', issued_at_ms(), expires_at)
+
+    @staticmethod
+    def _record(key, revoked_at, expires_at):
+        db.session.merge(RevokedToken(key=key, revoked_at=revoked_at, expires_at=expires_at))
+        db.session.info.setdefault('revoked_tokens', {})[key] = (revoked_at, expires_at)
+
+    @staticmethod
+    def _sync():
+        """共享存储中的吊销版本号变化时，从数据库增量加载吊销记录"""
+        version = int(get_store().get(REVOCATION_VERSION_KEY, 0))
+        with TokenRevocation._lock:
+            if version == TokenRevocation._version:
+                TokenRevocation._maybe_prune()
+                return
+            cursor = 0 if TokenRevocation._version is None else TokenRevocation._cursor - SYNC_SLACK_MS
+        now = int(time.time())
+        rows = db.session.execute(
+            db.select(RevokedToken.key, RevokedToken.revoked_at, RevokedToken.expires_at)
+            .where(RevokedToken.revoked_at >= cursor, RevokedToken.expires_at > now)
+        ).all()
+        with TokenRevocation._lock:
+            for key, revoked_at, expires_at in rows:
+                TokenRevocation._apply(key, revoked_at, expires_at)
+            # 加载期间又有新的吊销时版本号已再次变化，下一次校验会继续加载
+            TokenRevocation._version = version
+
+    @staticmethod
+    def _apply(key, revoked_at, expires_at):
+        # 调用方已持有锁；同一用户多次吊销保留最晚的时间
+        current = TokenRevocation._entries.get(key)
+        if current is None or current[0] < revoked_at:
+            TokenRevocation._entries[key] = (revoked_at, expires_at)
+        TokenRevocation._cursor = max(TokenRevocation._cursor, revoked_at)
+
+    @staticmethod
+    def _maybe_prune():
+        # 调用方已持有锁；定期丢弃内存中已过期的记录
+        interval = current_app.config.get('REVOCATION_COMPACT_INTERVAL', 3600)
+        now = time.time()
+        if not interval or now - TokenRevocation._compacted_at < interval:
+            return
+        TokenRevocation._compacted_at = now
+        for key in [k for k, (_, expires_at) in TokenRevocation._entries.items() if expires_at <= now]:
+            del TokenRevocation._entries[key]
+
+    @staticmethod
+    def compact():
+        """
+        删除受影响令牌已全部过期的吊销记录（不影响校验结果）
+
+        Returns:
+            int: 删除的记录数
+        """
+        now = int(time.time())
+        result = db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.session.commit()
+        with TokenRevocation._lock:
+            TokenRevocation._compacted_at = 0.0
+            TokenRevocation._maybe_prune()
+        return result.rowcount
+
+    @staticmethod
+    def start_compactor(app, interval):
+        """
+        启动后台压缩线程
+
+        多个 worker 共享存储时，每个周期只有抢到锁的一个 worker 执行压缩。
+
+        Args:
+            app: Flask 应用
+            interval: 压缩周期（秒）
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                with app.app_context():
+                    try:
+                        if not get_store().add(COMPACT_LOCK_KEY, 1, ttl=interval / 2):
+                            continue
+                        removed = TokenRevocation.compact()
+                        if removed:
+                            app.logger.info("已清理过期的令牌吊销记录 %d 条", removed)
+                    except Exception:
+                        db.session.rollback()
+                        app.logger.exception("清理令牌吊销记录失败")
+                    finally:
+                        db.session.remove()
+
+        thread = threading.Thread(target=run, name='revocation-compactor', daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def stats():
+        """内存中的吊销记录数与已加载的版本号"""
+        with TokenRevocation._lock:
+            return {'entries': len(TokenRevocation._entries), 'version': TokenRevocation._version}
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_revocations(session):
+    # 提交后再生效：本进程立即更新内存副本，其他 worker 看到版本号变化后增量加载
+    revoked = session.info.pop('revoked_tokens', None)
+    if not revoked or not has_app_context():
+        return
+    with TokenRevocation._lock:
+        for key, (revoked_at, expires_at) in revoked.items():
+            TokenRevocation._apply(key, revoked_at, expires_at)
+    version = get_store().incr(REVOCATION_VERSION_KEY)
+    with TokenRevocation._lock:
+        # 期间没有其他 worker 吊销时，本进程的副本已是最新，不必重新加载
+        if TokenRevocation._version is not None and version == TokenRevocation._version + 1:
+            TokenRevocation._version = version
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_revocations(session):
+    session.info.pop('revoked_tokens', None)
@@ -0,0 +1,555 @@
+"""
+学期排课求解服务
+为学期内尚未排时间的开课分配星期、节次与教室：
+  - 硬约束：同一教室、同一教师同一时间只能有一门课；教室容量不小于选课上限；教师只在可用节次上课
+  - 目标：最小化学生冲突，两门课程的冲突权重由历史选课中同时选修两门课程的学生数估计
+求解采用"随机贪心构造 + 模拟退火局部搜索"，多次随机重启可分布到进程池并行执行，取最优解
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time as dt_time
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import CourseOffering, Enrollment
+from .booking_service import BookingGuard
+from .exceptions import ServiceError
+from .timetable_service import TimetableCache
+
+# 默认节次：周一至周五，每天五大节
+DEFAULT_PERIODS = (
+    ('08:00', '09:50'), ('10:10', '12:00'), ('14:00', '15:50'), ('16:10', '18:00'), ('19:00', '20:50'),
+)
+DEFAULT_DAYS = (1, 2, 3, 4, 5)
+
+# 无法安排的开课在目标函数中的惩罚（远大于任何冲突权重之和）
+UNPLACED_PENALTY = 1_000_000
+
+# 退火起止温度（相对于最大冲突权重）
+ANNEAL_START = 0.2
+ANNEAL_END = 0.002
+
+DEFAULT_RESTARTS = 8
+DEFAULT_ITERATIONS = 50000
+
+
+def _minutes(text):
+    value = datetime.strptime(text, '%H:%M').time()
+    return value.hour * 60 + value.minute
+
+
+def _clock(minutes):
+    return dt_time(minutes // 60, minutes % 60)
+
+
+def default_slots():
+    """默认节次列表 [(星期, 开始分钟, 结束分钟)]"""
+    return [(day, _minutes(start), _minutes(end)) for day in DEFAULT_DAYS for start, end in DEFAULT_PERIODS]
+
+
+def _overlap(a, b):
+    return a[0] == b[0] and a[1] < b[2] and b[1] < a[2]
+
+
+# ---------------------------------------------------------------------------
+# 纯计算部分：只使用基本数据类型，可以在进程池中运行
+# ---------------------------------------------------------------------------
+
+class _State:
+    """一次求解的可变状态"""
+
+    def __init__(self, problem, rng):
+        self.p = problem
+        self.rng = rng
+        n = len(problem['offerings'])
+        self.slot_of = [None] * n
+        self.room_of = [None] * n
+        self.room_busy = {}     # (slot, room) -> 开课下标
+        self.teacher_busy = {}  # (teacher, slot) -> 开课下标
+
+    def slot_costs(self, i):
+        """开课 i 放在各节次时新增的冲突权重"""
+        p = self.p
+        costs = list(p['fixed_cost'][i])
+        for j, weight in p['neighbors'][i]:
+            t = self.slot_of[j]
+            if t is not None:
+                for s in p['overlaps'][t]:
+                    costs[s] += weight
+        return costs
+
+    def free_room(self, i, s):
+        """节次 s 上容量足够且空闲的最小教室"""
+        p = self.p
+        for room in p['rooms_for'][i]:
+            if room in p['fixed_rooms'][s]:
+                continue
+            if all((t, room) not in self.room_busy for t in p['overlaps'][s]):
+                return room
+        return None
+
+    def feasible(self, i, s):
+        p = self.p
+        teacher = p['offerings'][i][1]
+        if s not in p['allowed'][i] or s in p['fixed_teachers'].get(teacher, ()):
+            return None
+        if any((teacher, t) in self.teacher_busy for t in p['overlaps'][s]):
+            return None
+        return self.free_room(i, s)
+
+    def place(self, i, s, room):
+        self.slot_of[i], self.room_of[i] = s, room
+        self.room_busy[(s, room)] = i
+        self.teacher_busy[(self.p['offerings'][i][1], s)] = i
+
+    def unplace(self, i):
+        s = self.slot_of[i]
+        if s is None:
+            return
+        del self.room_busy[(s, self.room_of[i])]
+        del self.teacher_busy[(self.p['offerings'][i][1], s)]
+        self.slot_of[i] = self.room_of[i] = None
+
+    def candidates(self, i):
+        """开课 i 的全部可行 (新增冲突, 节次, 教室)"""
+        costs = self.slot_costs(i)
+        result = []
+        for s in range(len(self.p['slots'])):
+            room = self.feasible(i, s)
+            if room is not None:
+                result.append((costs[s], s, room))
+        return result
+
+    def restore(self, slot_of, room_of):
+        """恢复到保存的分配"""
+        for i in range(len(self.slot_of)):
+            self.unplace(i)
+        for i, (s, room) in enumerate(zip(slot_of, room_of)):
+            if s is not None:
+                self.place(i, s, room)
+
+    def score(self):
+        conflicts, unplaced = self.objective()
+        return conflicts + unplaced * UNPLACED_PENALTY
+
+    def objective(self):
+        """(学生冲突权重, 未安排数)"""
+        p = self.p
+        total = 0
+        unplaced = 0
+        for i, s in enumerate(self.slot_of):
+            if s is None:
+                unplaced += 1
+                continue
+            total += p['fixed_cost'][i][s]
+            for j, weight in p['neighbors'][i]:
+                t = self.slot_of[j]
+                if j > i and t is not None and t in p['overlap_sets'][s]:
+                    total += weight
+        return total, unplaced
+
+
+def _construct(state):
+    """随机化贪心：冲突权重大的开课优先，选新增冲突最小的节次"""
+    p = state.p
+    rng = state.rng
+    order = sorted(range(len(p['offerings'])), key=lambda i: (-p['degree'][i] * rng.uniform(0.8, 1.2),
+                                                                len(p['allowed'][i])))
+    for i in order:
+        options = state.candidates(i)
+        if options:
+            best = min(cost for cost, _, _ in options)
+            _, s, room = rng.choice([option for option in options if option[0] == best])
+            state.place(i, s, room)
+
+
+def _anneal(state, iterations):
+    """
+    模拟退火：每步随机挑选一门开课移动到随机的另一个节次，只计算该开课自身的冲突变化；
+    未安排的开课优先尝试放入任意可行节次。返回过程中见到的最优解
+    """
+    p = state.p
+    rng = state.rng
+    n = len(p['offerings'])
+    slot_count = len(p['slots'])
+    if n == 0 or slot_count < 2 or iterations <= 0:
+        return
+    max_weight = max((w for nbrs in p['neighbors'] for _, w in nbrs), default=0)
+    if max_weight <= 0:
+        return
+    temperature = max_weight * ANNEAL_START
+    cooling = (ANNEAL_END / ANNEAL_START) ** (1 / iterations)
+    score = state.score()
+    best = (score, list(state.slot_of), list(state.room_of))
+    for _ in range(iterations):
+        temperature *= cooling
+        i = rng.randrange(n)
+        current = state.slot_of[i]
+        if current is None:
+            options = state.candidates(i)
+            if options:
+                cost, s, room = min(options)
+                state.place(i, s, room)
+                score += cost - UNPLACED_PENALTY
+        else:
+            s = rng.randrange(slot_count)
+            if s == current:
+                continue
+            costs = state.slot_costs(i)
+            delta = costs[s] - costs[current]
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                continue
+            current_room = state.room_of[i]
+            state.unplace(i)
+            room = state.feasible(i, s)
+            if room is None:
+                state.place(i, current, current_room)
+                continue
+            state.place(i, s, room)
+            score += delta
+        if score < best[0] - 1e-9:
+            best = (score, list(state.slot_of), list(state.room_of))
+    state.restore(best[1], best[2])
+
+
+def run_restart(problem, seed, iterations):
+    """
+    执行一次随机重启（可在子进程中运行）
+
+    Returns:
+        dict: 种子、目标值、未安排数、耗时与分配结果 [(节次, 教室) 或 None]
+    """
+    started = time.perf_counter()
+    state = _State(problem, random.Random(seed))
+    _construct(state)
+    _anneal(state, iterations)
+    conflicts, unplaced = state.objective()
+    return {
+        'seed': seed,
+        'student_conflicts': conflicts,
+        'unplaced': unplaced,
+        'score': conflicts + unplaced * UNPLACED_PENALTY,
+        'seconds': round(time.perf_counter() - started, 3),
+        'assignment': list(zip(state.slot_of, state.room_of)),
+    }
+
+
+def solve(problem, restarts=DEFAULT_RESTARTS, iterations=DEFAULT_ITERATIONS, workers=1, seed=0):
+    """
+    多次随机重启求解，workers > 1 时分布到进程池
+
+    Returns:
+        tuple: (最优结果, 全部重启结果)
+    """
+    seeds = [seed + k for k in range(max(restarts, 1))]
+    if workers > 1 and len(seeds) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(seeds))) as pool:
+            runs = list(pool.map(run_restart, [problem] * len(seeds), seeds, [iterations] * len(seeds)))
+    else:
+        runs = [run_restart(problem, s, iterations) for s in seeds]
+    best = min(runs, key=lambda run: (run['score'], run['seed']))
+    return best, runs
+
+
+# ---------------------------------------------------------------------------
+# 数据库部分
+# ---------------------------------------------------------------------------
+
+def _parse_rooms(rooms):
+    parsed = {}
+    for room in rooms or []:
+        location = str(room.get('location') or '').strip() if isinstance(room, dict) else ''
+        capacity = room.get('capacity') if isinstance(room, dict) else None
+        if not location or not isinstance(capacity, int) or capacity <= 0:
+            raise ServiceError("教室需包含 location 与正整数 capacity")
+        parsed[location] = capacity
+    if not parsed:
+        raise ServiceError("请提供可用教室列表")
+    return parsed
+
+
+def _parse_slots(slots):
+    if not slots:
+        return default_slots()
+    parsed = []
+    try:
+        for slot in slots:
+            item = (int(slot['day_of_week']), _minutes(slot['start_time']), _minutes(slot['end_time']))
+            if not 1 <= item[0] <= 7 or item[1] >= item[2]:
+                raise ValueError
+            parsed.append(item)
+    except (KeyError, TypeError, ValueError):
+        raise ServiceError("节次需包含 day_of_week、start_time、end_time（HH:MM），且开始早于结束")
+    return sorted(set(parsed))
+
+
+def _co_enrollment(course_ids, academic_year, semester):
+    """历史选课中同时选修两门课程的学生数（不含目标学期）"""
+    if len(course_ids) < 2:
+        return {}
+    e1, e2 = aliased(Enrollment), aliased(Enrollment)
+    o1, o2 = aliased(CourseOffering), aliased(CourseOffering)
+    target = (o1.academic_year == academic_year) & (o1.semester == bool(semester))
+    target2 = (o2.academic_year == academic_year) & (o2.semester == bool(semester))
+    rows = db.session.query(
+        o1.course_id, o2.course_id, func.count(func.distinct(e1.student_id))
+    ).select_from(e1)\
+     .join(o1, e1.offering_id == o1.offering_id)\
+     .join(e2, e1.student_id == e2.student_id)\
+     .join(o2, e2.offering_id == o2.offering_id)\
+     .filter(
+        o1.course_id.in_(course_ids), o2.course_id.in_(course_ids),
+        o1.course_id < o2.course_id, ~target, ~target2
+    ).group_by(o1.course_id, o2.course_id).all()
+    return {(a, b): count for a, b, count in rows}
+
+
+def build_problem(academic_year, semester, rooms, teacher_availability=None, slots=None):
+    """
+    从数据库构建学期排课问题
+
+    Args:
+        academic_year: 学年
+        semester: 学期
+        rooms: [{'location': 教室, 'capacity': 容量}]
+        teacher_availability: {教师ID: [{'day_of_week', 'start_time'}]}，未列出的教师全部节次可用
+        slots: [{'day_of_week', 'start_time', 'end_time'}]，默认周一至周五每天五大节
+
+    Returns:
+        dict: 排课问题（只含基本数据类型，可传给子进程）
+    """
+    capacities = _parse_rooms(rooms)
+    slot_list = _parse_slots(slots)
+    overlaps = [[t for t, other in enumerate(slot_list) if _overlap(slot, other)] for slot in slot_list]
+
+    rows = db.session.query(
+        CourseOffering.offering_id, CourseOffering.teacher_id, CourseOffering.course_id,
+        CourseOffering.max_students, CourseOffering.day_of_week, CourseOffering.start_time,
+        CourseOffering.end_time, CourseOffering.location
+    ).filter(
+        CourseOffering.academic_year == academic_year,
+        CourseOffering.semester == bool(semester)
+    ).order_by(CourseOffering.offering_id).all()
+
+    pending, fixed = [], []
+    for row in rows:
+        scheduled = row.day_of_week is not None and row.start_time is not None and row.end_time is not None
+        (fixed if scheduled else pending).append(row)
+
+    # 教师可用节次
+    slot_index = {(day, start): s for s, (day, start, _) in enumerate(slot_list)}
+    available = {}
+    for teacher_id, items in (teacher_availability or {}).items():
+        try:
+            available[teacher_id] = {slot_index[(int(item['day_of_week']), _minutes(item['start_time']))]
+                                     for item in items}
+        except (KeyError, TypeError, ValueError):
+            raise ServiceError(f"教师 {teacher_id} 的可用时间与节次不匹配")
+
+    # 已排课开课占用的教室与教师
+    fixed_rooms = [set() for _ in slot_list]
+    fixed_teachers = {}
+    fixed_slots = []
+    for row in fixed:
+        interval = (row.day_of_week, row.start_time.hour * 60 + row.start_time.minute,
+                    row.end_time.hour * 60 + row.end_time.minute)
+        hit = [s for s, slot in enumerate(slot_list) if _overlap(slot, interval)]
+        for s in hit:
+            if row.location:
+                fixed_rooms[s].add(row.location.strip())
+            fixed_teachers.setdefault(row.teacher_id, set()).add(s)
+        fixed_slots.append((row.course_id, hit))
+
+    # 冲突权重：两门课程的共同选课人数按两门课程的开课数平均分摊
+    courses = {row.course_id for row in rows}
+    co = _co_enrollment(courses, academic_year, semester)
+    sections = {}
+    for row in rows:
+        sections[row.course_id] = sections.get(row.course_id, 0) + 1
+
+    def weight(a, b):
+        if a == b:
+            return 0
+        count = co.get((a, b) if a < b else (b, a), 0)
+        return count / (sections[a] * sections[b]) if count else 0
+
+    offerings = [(row.offering_id, row.teacher_id, row.course_id, row.max_students) for row in pending]
+    neighbors = [[] for _ in offerings]
+    by_course = {}
+    for i, offering in enumerate(offerings):
+        by_course.setdefault(offering[2], []).append(i)
+    related = {}
+    for (a, b) in co:
+        related.setdefault(a, set()).add(b)
+        related.setdefault(b, set()).add(a)
+    for i, (_, _, course_id, _) in enumerate(offerings):
+        for other in related.get(course_id, ()):
+            for j in by_course.get(other, ()):
+                neighbors[i].append((j, weight(course_id, other)))
+
+    fixed_cost = []
+    for _, _, course_id, _ in offerings:
+        costs = [0.0] * len(slot_list)
+        for other, hit in fixed_slots:
+            w = weight(course_id, other)
+            if w:
+                for s in hit:
+                    costs[s] += w
+        fixed_cost.append(costs)
+
+    rooms_sorted = sorted(capacities.items(), key=lambda item: (item[1], item[0]))
+    rooms_for = [[location for location, capacity in rooms_sorted if capacity >= max_students]
+                 for _, _, _, max_students in offerings]
+    all_slots = set(range(len(slot_list)))
+
+    return {
+        'slots': slot_list,
+        'overlaps': overlaps,
+        'overlap_sets': [set(items) for items in overlaps],
+        'offerings': offerings,
+        'neighbors': neighbors,
+        'degree': [sum(w for _, w in nbrs) + sum(costs) for nbrs, costs in zip(neighbors, fixed_cost)],
+        'fixed_cost': fixed_cost,
+        'fixed_rooms': fixed_rooms,
+        'fixed_teachers': fixed_teachers,
+        'rooms_for': rooms_for,
+        'allowed': [available.get(teacher_id, all_slots) for _, teacher_id, _, _ in offerings],
+        'fixed_count': len(fixed),
+    }
+
+
+class ScheduleSolverService:
+    """学期排课求解服务类"""
+
+    @staticmethod
+    def solve_term(academic_year, semester, rooms, teacher_availability=None, slots=None,
+                   restarts=DEFAULT_RESTARTS, iterations=DEFAULT_ITERATIONS, workers=None,
+                   seed=0, apply=False):
+        """
+        为学期内未排时间的开课求解时间与教室，可选写回数据库
+
+        Args:
+            academic_year: 学年
+            semester: 学期
+            rooms: 可用教室 [{'location', 'capacity'}]
+            teacher_availability: 教师可用节次（可选）
+            slots: 节次定义（可选）
+            restarts: 随机重启次数
+            iterations: 每次重启的局部搜索步数
+            workers: 进程数，默认 CPU 核数
+            seed: 随机种子
+            apply: 是否写回开课记录
+
+        Returns:
+            dict: 目标值、各次重启得分、耗时与排课结果
+        """
+        timings = {}
+        started = time.perf_counter()
+        problem = build_problem(academic_year, semester, rooms, teacher_availability, slots)
+        timings['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        best, runs = solve(problem, restarts, iterations, workers, seed)
+        timings['solve_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        assignments = []
+        unplaced = []
+        for (offering_id, teacher_id, _, _), (s, room) in zip(problem['offerings'], best['assignment']):
+            if s is None:
+                unplaced.append(offering_id)
+                continue
+            day, start, end = problem['slots'][s]
+            assignments.append({
+                'offering_id': offering_id,
+                'teacher_id': teacher_id,
+                'day_of_week': day,
+                'start_time': f'{start // 60:02d}:{start % 60:02d}',
+                'end_time': f'{end // 60:02d}:{end % 60:02d}',
+                'location': room
+            })
+
+        result = {
+            'academic_year': academic_year,
+            'semester': semester,
+            'pending_count': len(problem['offerings']),
+            'fixed_count': problem['fixed_count'],
+            'placed_count': len(assignments),
+            'unplaced': unplaced,
+            'student_conflicts': round(best['student_conflicts'], 2),
+            'best_seed': best['seed'],
+            'restarts': [{
+                'seed': run['seed'],
+                'student_conflicts': round(run['student_conflicts'], 2),
+                'unplaced': run['unplaced'],
+                'seconds': run['seconds']
+            } for run in runs],
+            'workers': workers,
+            'assignments': assignments,
+            'applied': False,
+            'timings': timings
+        }
+        if apply:
+            started = time.perf_counter()
+            result.update(ScheduleSolverService.apply(academic_year, semester, assignments))
+            timings['apply_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    @staticmethod
+    def apply(academic_year, semester, assignments):
+        """
+        在学期排课锁内写回排课结果
+
+        求解期间其他人可能已修改了开课，写回前逐条用占用索引复核，冲突、已排课或已有学生选课的
+        开课跳过（与教师修改上课时间的限制一致）；提交前仍有学生并发选中时，提交后使其课表缓存失效。
+
+        Returns:
+            dict: applied / applied_count / skipped
+        """
+        skipped = []
+        with BookingGuard.reserve(academic_year, semester) as bookings:
+            offerings = {offering.offering_id: offering for offering in CourseOffering.query.filter(
+                CourseOffering.offering_id.in_([item['offering_id'] for item in assignments])
+            ).all()}
+            enrolled = {row[0] for row in db.session.query(Enrollment.offering_id).filter(
+                Enrollment.offering_id.in_(list(offerings))
+            ).distinct()}
+            placed = []
+            for item in assignments:
+                offering = offerings.get(item['offering_id'])
+                start, end = _clock(_minutes(item['start_time'])), _clock(_minutes(item['end_time']))
+                if offering is None or offering.day_of_week is not None:
+                    skipped.append({'offering_id': item['offering_id'], 'reason': '开课不存在或已排课'})
+                    continue
+                if offering.offering_id in enrolled:
+                    skipped.append({'offering_id': item['offering_id'], 'reason': '已有学生选课'})
+                    continue
+                conflict = bookings.find_conflict(offering.teacher_id, item['day_of_week'], start, end,
+                                                  item['location'], exclude=offering.offering_id)
+                if conflict:
+                    skipped.append({'offering_id': item['offering_id'], 'reason': f'与 {conflict[1]} 冲突'})
+                    continue
+                offering.day_of_week = item['day_of_week']
+                offering.start_time = start
+                offering.end_time = end
+                offering.location = item['location']
+                # 先登记到索引，后续条目复核时能看到本批次已安排的开课
+                bookings.add(offering.offering_id, offering.teacher_id, item['day_of_week'],
+                             start, end, item['location'])
+                placed.append(offering.offering_id)
+            try:
+                db.session.commit()
+            except Exception:
+                for offering_id in placed:
+                    bookings.remove(offering_id)
+                raise
+        if placed:
+            for (student_id,) in db.session.query(Enrollment.student_id).filter(
+                Enrollment.offering_id.in_(placed)
+            ).distinct():
+                TimetableCache.invalidate(student_id)
+        return {'applied': True, 'applied_count': len(placed), 'skipped': skipped}
@@ -0,0 +1,239 @@
+"""
+成绩批量录入服务
+成绩可来自 JSON、CSV 或 XLSX；一次加载开课的全部选课记录，在内存中校验，
+再用批量 UPDATE 写回成绩，并在同一事务内重算学分台账
+"""
+import codecs
+import csv
+
+from sqlalchemy import update
+from app import db
+from app.models import CourseOffering, Enrollment, Student
+from .exceptions import ServiceError, CourseNotFoundError
+from .seat_service import SeatReservationService
+from .ledger_service import CreditLedgerService
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # XLSX 导入为可选功能
+    load_workbook = None
+
+# 单次导入的最大行数
+MAX_IMPORT_ROWS = 5000
+
+# 表头别名 -> 字段名
+_HEADER_ALIASES = {
+    'student_id': 'student_id',
+    '学号': 'student_id',
+    'score': 'score',
+    '成绩': 'score',
+}
+
+
+def _header_index(header):
+    """解析表头，返回学号列与成绩列的下标"""
+    columns = {}
+    for index, name in enumerate(header):
+        field = _HEADER_ALIASES.get(str(name).strip().lower() if name is not None else '')
+        if field and field not in columns:
+            columns[field] = index
+    if 'student_id' not in columns or 'score' not in columns:
+        raise ServiceError("表头需要包含 student_id(学号) 与 score(成绩) 两列")
+    return columns['student_id'], columns['score']
+
+
+def _table_rows(rows):
+    """
+    把带表头的表格行转换为 (行号, 学号, 成绩) 序列
+
+    Args:
+        rows: 可迭代的行，第一行为表头
+
+    Yields:
+        tuple: (行号, 学号, 成绩原始值)
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ServiceError("上传的文件为空")
+    student_col, score_col = _header_index(header)
+    for line_no, row in enumerate(rows, start=2):
+        if not row or all(cell in (None, '') for cell in row):
+            continue
+        student_id = row[student_col] if student_col < len(row) else None
+        score = row[score_col] if score_col < len(row) else None
+        yield line_no, student_id, score
+
+
+def parse_json_rows(items):
+    """
+    解析 JSON 成绩列表
+
+    Args:
+        items: [{'student_id': ..., 'score': ...}, ...]
+
+    Returns:
+        list: [(序号, 学号, 成绩原始值)]
+    """
+    if not isinstance(items, list):
+        raise ServiceError("scores 必须是数组")
+    return [
+        (index, item.get('student_id'), item.get('score')) if isinstance(item, dict) else (index, None, None)
+        for index, item in enumerate(items, start=1)
+    ]
+
+
+def parse_csv_rows(stream, encoding='utf-8-sig'):
+    """
+    逐行解析 CSV 字节流（不把整个文件读入内存）
+
+    Args:
+        stream: 二进制文件对象
+        encoding: 文件编码，默认兼容带 BOM 的 UTF-8
+
+    Returns:
+        list: [(行号, 学号, 成绩原始值)]
+
+    Raises:
+        ServiceError: 文件编码或表头错误
+    """
+    try:
+        return list(_table_rows(csv.reader(codecs.iterdecode(stream, encoding))))
+    except UnicodeDecodeError:
+        raise ServiceError("CSV 文件需使用 UTF-8 编码")
+
+
+def parse_xlsx_rows(stream):
+    """
+    以只读模式流式解析 XLSX 第一个工作表
+
+    Args:
+        stream: 二进制文件对象
+
+    Returns:
+        list: [(行号, 学号, 成绩原始值)]
+
+    Raises:
+        ServiceError: 未安装 openpyxl 或文件无法解析
+    """
+    if load_workbook is None:
+        raise ServiceError("服务器未安装 openpyxl，暂不支持 XLSX 导入，请上传 CSV", 415)
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception:
+        raise ServiceError("无法解析 XLSX 文件")
+    try:
+        return list(_table_rows(workbook.worksheets[0].iter_rows(values_only=True)))
+    finally:
+        workbook.close()
+
+
+def _parse_score(raw):
+    """把成绩原始值转换为 0-100 的整数，无效时返回 None"""
+    if isinstance(raw, bool) or raw is None:
+        return None
+    try:
+        value = float(str(raw).strip())
+    except ValueError:
+        return None
+    if not value.is_integer() or not 0 <= value <= 100:
+        return None
+    return int(value)
+
+
+class ScoreService:
+    """成绩业务逻辑服务"""
+
+    @staticmethod
+    def import_scores(teacher_id, offering_id, rows):
+        """
+        批量录入/修改一门开课的成绩
+
+        合法的行全部写入，不合法的行逐条返回错误；遇到数据库写冲突时整体重试。
+
+        Args:
+            teacher_id: 教师ID
+            offering_id: 开课ID
+            rows: [(行号, 学号, 成绩原始值)]
+
+        Returns:
+            dict: 导入结果（更新数、未变化数、逐行错误）
+
+        Raises:
+            CourseNotFoundError: 开课不存在或不属于该教师
+            ServiceError: 行数超过上限
+        """
+        if len(rows) > MAX_IMPORT_ROWS:
+            raise ServiceError(f"单次最多导入 {MAX_IMPORT_ROWS} 行成绩")
+        return SeatReservationService.run_with_retry(
+            ScoreService._import_scores_once, teacher_id, offering_id, rows
+        )
+
+    @staticmethod
+    def _import_scores_once(teacher_id, offering_id, rows):
+        # 1. 开课（一次查询）
+        offering = CourseOffering.query.filter_by(
+            offering_id=offering_id,
+            teacher_id=teacher_id
+        ).first()
+        if not offering:
+            raise CourseNotFoundError("开课记录不存在或无权限")
+
+        # 2. 该开课全部选课记录的当前成绩（一次查询）
+        current_scores = dict(db.session.query(Enrollment.student_id, Enrollment.score).filter(
+            Enrollment.offering_id == offering_id
+        ).all())
+
+        # 3. 在内存中逐行校验
+        errors = []
+        accepted = {}  # student_id -> (行号, 新成绩)
+        for line_no, student_id, raw_score in rows:
+            student_id = str(student_id).strip() if student_id is not None else ''
+            if not student_id:
+                errors.append({'row': line_no, 'student_id': None, 'message': '缺少学号'})
+                continue
+            score = _parse_score(raw_score)
+            if score is None:
+                errors.append({'row': line_no, 'student_id': student_id, 'message': '成绩必须是 0-100 的整数'})
+                continue
+            if student_id in accepted:
+                errors.append({
+                    'row': line_no, 'student_id': student_id,
+                    'message': f'与第 {accepted[student_id][0]} 行学号重复'
+                })
+                continue
+            if student_id not in current_scores:
+                errors.append({'row': line_no, 'student_id': student_id, 'message': None})
+                continue
+            accepted[student_id] = (line_no, score)
+
+        # 未选课的学号区分"学生不存在"与"未选此课程"（一次查询）
+        unknown = [error for error in errors if error['message'] is None]
+        if unknown:
+            existing = {row[0] for row in db.session.query(Student.student_id).filter(
+                Student.student_id.in_({error['student_id'] for error in unknown})
+            ).all()}
+            for error in unknown:
+                error['message'] = '该学生未选此课程' if error['student_id'] in existing else '学生不存在'
+
+        # 4. 只写回有变化的成绩
+        score_updates = [
+            {'offering_id': offering_id, 'student_id': student_id, 'score': score}
+            for student_id, (_, score) in accepted.items()
+            if current_scores[student_id] != score
+        ]
+
+        # 5. 成绩按主键批量 UPDATE，并在同一事务内重算受影响学生本学期的学分台账
+        if score_updates:
+            db.session.execute(update(Enrollment), score_updates)
+            CreditLedgerService.refresh_offering(offering, [item['student_id'] for item in score_updates])
+        db.session.commit()
+
+        errors.sort(key=lambda error: error['row'])
+        return {
+            'message': f'成绩录入完成：更新 {len(score_updates)} 条，失败 {len(errors)} 条',
+            'updated_count': len(score_updates),
+            'unchanged_count': len(accepted) - len(score_updates),
+            'error_count': len(errors),
+            'errors': errors
+        }
@@ -0,0 +1,355 @@
+"""
+实时选课人数服务
+名额以 course_offerings.current_students 为准：选课/退课在各自的事务中用条件 UPDATE
+增减人数（见 SeatReservationService），回滚时一并撤销，多个 worker 之间不会超选。
+共享存储中不维护可独立扣减的人数计数器，只做开课记录的读穿透（read-through）缓存：
+配置了多进程共享的存储（SHARED_STORE 为 sqlite:// 等）时，课程列表、统计等只读路径
+未命中时从开课记录读取并写入缓存（带过期时间），人数变化的事务提交后删除对应缓存；
+进程内存储（memory://）不启用缓存，直接读取开课记录。
+定期用一条 GROUP BY 与选课记录对账，修正开课记录中的人数并丢弃与之不一致的缓存
+"""
+import threading
+import time
+from datetime import datetime
+
+from flask import has_app_context
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models import CourseOffering, Enrollment
+from .shared_store import get_store
+
+SEAT_KEY_PREFIX = 'seats:'
+# 缓存过期时间（秒），限制提交与回填并发时写入旧值的影响时长
+SEAT_CACHE_TTL = 60
+RECONCILE_LOCK_KEY = 'seat-reconcile:lock'
+
+# 对账修正计数器前，两次采样之间的间隔（秒），用于排除正在提交中的选课
+RECONCILE_SETTLE = 0.5
+
+# 由人数决定的课程状态，其余状态（教师手动设置）保持不变
+STATUS_OPEN = '开放选课'
+STATUS_FULL = '名额已满'
+
+
+def seat_status(status, current_students, max_students):
+    """
+    根据实时人数推导课程状态
+
+    Args:
+        status: 开课记录中保存的状态
+        current_students: 实时已选人数
+        max_students: 最大人数
+
+    Returns:
+        str: 课程状态
+    """
+    if status not in (STATUS_OPEN, STATUS_FULL):
+        return status
+    return STATUS_FULL if current_students >= max_students else STATUS_OPEN
+
+
+# 人数变化的订阅回调 callback(offering_id, current_students)，由实时推送等模块注册
+_listeners = []
+
+
+def on_seat_change(callback):
+    """
+    注册人数变化回调（可用作装饰器）
+
+    回调在事务提交后、于选课/退课线程中同步执行，只应做内存操作，不能访问数据库。
+    """
+    _listeners.append(callback)
+    return callback
+
+
+def _notify(offering_id, current_students):
+    if current_students is None:
+        return
+    for callback in _listeners:
+        callback(offering_id, current_students)
+
+
+def _key(offering_id):
+    return f'{SEAT_KEY_PREFIX}{offering_id}'
+
+
+def stage_seat_change(session, offering_id, current_students):
+    """
+    记录当前事务中的人数变化，提交后丢弃缓存并通知订阅者，回滚时丢弃记录
+
+    Args:
+        session: 数据库会话
+        offering_id: 开课ID
+        current_students: 变化后开课记录中的人数
+    """
+    session.info.setdefault('seat_changes', {})[offering_id] = current_students
+
+
+def _stored_counts(offering_ids=None):
+    """开课记录中的已选人数"""
+    query = db.session.query(CourseOffering.offering_id, CourseOffering.current_students)
+    if offering_ids is not None:
+        query = query.filter(CourseOffering.offering_id.in_(offering_ids))
+    return {offering_id: count or 0 for offering_id, count in query.all()}
+
+
+def _count_enrollments(offering_ids=None):
+    """一条 GROUP BY 统计各开课的实际选课人数"""
+    query = db.session.query(Enrollment.offering_id, func.count(Enrollment.student_id))
+    if offering_ids is not None:
+        query = query.filter(Enrollment.offering_id.in_(offering_ids))
+    return dict(query.group_by(Enrollment.offering_id).all())
+
+
+class SeatCounter:
+    """开课人数（开课记录为准，共享存储中只做读穿透缓存）"""
+
+    @staticmethod
+    def enabled():
+        """是否启用人数缓存：只有多进程共享的存储才能保证各 worker 读到一致的缓存"""
+        return get_store().shared
+
+    @staticmethod
+    def get(offering_id):
+        """
+        获取开课的已选人数
+
+        Args:
+            offering_id: 开课ID
+
+        Returns:
+            int: 已选人数
+        """
+        return SeatCounter.get_many([offering_id])[offering_id]
+
+    @staticmethod
+    def get_many(offering_ids):
+        """
+        批量获取已选人数，缓存未命中的从开课记录读取并回填
+
+        只用于展示与快速拒绝，名额是否足够以选课事务中的条件 UPDATE 为准。
+
+        Args:
+            offering_ids: 开课ID列表
+
+        Returns:
+            dict: offering_id -> 已选人数
+        """
+        offering_ids = list(offering_ids)
+        if not SeatCounter.enabled():
+            stored = _stored_counts(offering_ids) if offering_ids else {}
+            return {offering_id: stored.get(offering_id, 0) for offering_id in offering_ids}
+        values = get_store().get_many(_key(offering_id) for offering_id in offering_ids)
+        counts = {}
+        missing = []
+        for offering_id in offering_ids:
+            value = values.get(_key(offering_id))
+            if value is None:
+                missing.append(offering_id)
+            else:
+                counts[offering_id] = value
+        if missing:
+            counts.update(SeatCounter._seed(missing))
+        return counts
+
+    @staticmethod
+    def forget(offering_id):
+        """丢弃开课的缓存（人数变化、开课新建/删除后调用）"""
+        get_store().delete(_key(offering_id))
+
+    @staticmethod
+    def reset():
+        """丢弃全部缓存（数据库重建后调用）"""
+        get_store().delete_prefix(SEAT_KEY_PREFIX)
+
+    @staticmethod
+    def _seed(offering_ids):
+        # 从开课记录回填缓存；多个进程同时回填时只有第一个写入生效
+        store = get_store()
+        stored = _stored_counts(offering_ids)
+        counts = {}
+        for offering_id in offering_ids:
+            count = stored.get(offering_id, 0)
+            store.add(_key(offering_id), count, ttl=SEAT_CACHE_TTL)
+            counts[offering_id] = count
+        return counts
+
+    @staticmethod
+    def reconcile(apply=False, settle=RECONCILE_SETTLE):
+        """
+        与选课记录对账，生成偏差报告
+
+        实际人数由一条 GROUP BY 得出。开课记录的偏差只有在间隔 settle 秒的
+        两次采样中保持一致时才会修正，避免把正在提交的选课误判为偏差；
+        开课记录中的人数用相关子查询按提交时的选课记录重算。
+        与开课记录不一致的缓存直接丢弃，下次读取时重新回填。
+
+        Args:
+            apply: 是否修正开课记录中的人数与状态并丢弃不一致的缓存
+            settle: 两次采样的间隔（秒）
+
+        Returns:
+            dict: 偏差报告
+        """
+        store = get_store()
+        enabled = SeatCounter.enabled()
+        offerings = db.session.query(
+            CourseOffering.offering_id, CourseOffering.current_students,
+            CourseOffering.max_students, CourseOffering.status
+        ).all()
+        counters = store.get_many(_key(row.offering_id) for row in offerings) if enabled else {}
+        actual = _count_enrollments()
+
+        drift = []
+        stale_rows = {}
+        for row in offerings:
+            count = actual.get(row.offering_id, 0)
+            stored = row.current_students or 0
+            counter = counters.get(_key(row.offering_id))
+            status = seat_status(row.status, count, row.max_students)
+            if stored != count or row.status != status:
+                stale_rows[row.offering_id] = stored - count
+            if counter is not None and counter != stored:
+                drift.append({
+                    'offering_id': row.offering_id,
+                    'counter': counter,
+                    'actual': count,
+                    'stored': stored,
+                    'drift': counter - stored
+                })
+
+        report = {
+            'checked_at': datetime.utcnow().isoformat(),
+            'offering_count': len(offerings),
+            'enrollment_count': sum(actual.values()),
+            'counter_enabled': enabled,
+            'counter_drift_count': len(drift),
+            'stale_row_count': len(stale_rows),
+            'drift': drift,
+            'applied': apply,
+            'corrected': []
+        }
+        if not apply or not (stale_rows or drift):
+            return report
+
+        time.sleep(settle)
+        if stale_rows:
+            offering_ids = list(stale_rows)
+            stored = _stored_counts(offering_ids)
+            actual = _count_enrollments(offering_ids)
+            settled = [offering_id for offering_id in offering_ids
+                       if stored.get(offering_id, 0) - actual.get(offering_id, 0) == stale_rows[offering_id]]
+            if settled:
+                enrolled = select(func.count(Enrollment.student_id))\
+                    .where(Enrollment.offering_id == CourseOffering.offering_id)\
+                    .scalar_subquery()
+                db.session.execute(
+                    update(CourseOffering)
+                    .where(CourseOffering.offering_id.in_(settled))
+                    .values(current_students=enrolled)
+                    .execution_options(synchronize_session=False)
+                )
+                rows = db.session.query(
+                    CourseOffering.offering_id, CourseOffering.current_students,
+                    CourseOffering.max_students, CourseOffering.status
+                ).filter(CourseOffering.offering_id.in_(settled)).all()
+                db.session.execute(update(CourseOffering), [{
+                    'offering_id': row.offering_id,
+                    'status': seat_status(row.status, row.current_students, row.max_students)
+                } for row in rows])
+        db.session.commit()
+
+        for item in drift:
+            SeatCounter.forget(item['offering_id'])
+            report['corrected'].append(item['offering_id'])
+        if drift:
+            stored = _stored_counts(report['corrected'])
+            db.session.commit()
+            for offering_id, count in stored.items():
+                _notify(offering_id, count)
+        return report
+
+    @staticmethod
+    def start_reconciler(app, interval):
+        """
+        启动后台对账线程
+
+        多个 worker 共享存储时，每个周期只有抢到锁的一个 worker 执行对账。
+
+        Args:
+            app: Flask 应用
+            interval: 对账周期（秒）
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                with app.app_context():
+                    try:
+                        if not get_store().add(RECONCILE_LOCK_KEY, 1, ttl=interval / 2):
+                            continue
+                        report = SeatCounter.reconcile(apply=True)
+                        if report['counter_drift_count']:
+                            app.logger.warning(
+                                "选课人数偏差：开课记录 %d 个，缓存 %d 个，已丢弃缓存 %d 个",
+                                report['stale_row_count'], report['counter_drift_count'], len(report['corrected'])
+                            )
+                    except Exception:
+                        db.session.rollback()
+                        app.logger.exception("选课人数对账失败")
+                    finally:
+                        db.session.remove()
+
+        thread = threading.Thread(target=run, name='seat-reconciler', daemon=True)
+        thread.start()
+        return thread
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_seat_changes(session, flush_context):
+    # 通过 ORM 级联删除的选课记录（如删除学生）在同一事务内扣减开课人数
+    forgotten = session.info.setdefault('forgotten_seats', set())
+    released = {}
+    for obj in session.deleted:
+        if isinstance(obj, Enrollment):
+            released[obj.offering_id] = released.get(obj.offering_id, 0) + 1
+        elif isinstance(obj, CourseOffering):
+            forgotten.add(obj.offering_id)
+    for obj in session.new:
+        if isinstance(obj, CourseOffering):
+            forgotten.add(obj.offering_id)
+    offerings = CourseOffering.__table__.c
+    connection = session.connection()
+    for offering_id, amount in released.items():
+        if offering_id in forgotten:
+            continue
+        connection.execute(
+            CourseOffering.__table__.update()
+            .where(offerings.offering_id == offering_id, offerings.current_students >= amount)
+            .values(current_students=offerings.current_students - amount)
+        )
+        count = connection.execute(
+            select(offerings.current_students).where(offerings.offering_id == offering_id)
+        ).scalar()
+        stage_seat_change(session, offering_id, count)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_seat_changes(session):
+    changes = session.info.pop('seat_changes', None) or {}
+    forgotten = session.info.pop('forgotten_seats', None) or set()
+    if not has_app_context():
+        return
+    enabled = SeatCounter.enabled()
+    for offering_id in forgotten | set(changes):
+        if enabled:
+            SeatCounter.forget(offering_id)
+    for offering_id, count in changes.items():
+        if offering_id not in forgotten:
+            _notify(offering_id, count)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_seat_changes(session):
+    session.info.pop('seat_changes', None)
+    session.info.pop('forgotten_seats', None)
@@ -0,0 +1,275 @@
+"""
+选课人数实时推送（Server-Sent Events）
+选课/退课的事务提交后，人数变化回调把 (开课ID, 人数) 写入进程内的待发送表；后台线程每秒
+最多 SEAT_STREAM_RATE 次取出待发送表，同一开课的多次变化只保留最新人数，生成一批增量
+（offering_id、current_students、status）并唤醒所有订阅者。
+订阅者只是等待条件变量的生成器，不持有自己的队列：批次保存在有界环形缓冲中，每个订阅者
+只记住已读到的序号，空闲连接除了一个线程栈之外几乎不占内存；落后超过缓冲长度的订阅者
+收到 resync 事件，由前端重新拉取一次课程列表。
+多 worker 部署时回调只能看到本进程的变化，后台线程每隔 SEAT_STREAM_RESYNC 秒批量读取一次
+人数（共享存储中的缓存或开课记录），把其他 worker 造成的变化补发出去
+"""
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from app import db
+from app.models import CourseOffering
+from .seat_counter_service import (
+    STATUS_FULL, STATUS_OPEN, SeatCounter, on_seat_change, seat_status
+)
+
+# 环形缓冲保留的批次数：每秒 2 批时约两分钟，足够覆盖断线重连
+BUFFER_SIZE = 256
+
+# 没有变化时发送心跳注释的间隔（秒），让代理保持连接、让服务端及时发现断开的客户端
+HEARTBEAT_INTERVAL = 15
+
+# 客户端断线后的重连等待（毫秒）
+RECONNECT_DELAY_MS = 3000
+
+# 按开课ID加载元数据时每条 IN 查询的最大参数数
+LOAD_CHUNK = 500
+
+
+def _frame(event, data, event_id=None):
+    """格式化一条 SSE 消息"""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {event}\ndata: {data}\n\n'
+
+
+def _dumps(deltas):
+    return json.dumps(deltas, ensure_ascii=False, separators=(',', ':'))
+
+
+class SeatFeed:
+    """进程内的选课人数发布中心"""
+
+    # 订阅者等待新批次；批次、序号与订阅者数都受它保护
+    _cond = threading.Condition()
+    _batches = deque(maxlen=BUFFER_SIZE)  # (seq, {offering_id: delta}, 预先序列化的 SSE 消息)
+    _seq = 0
+    _subscribers = 0
+
+    # 选课线程写入、后台线程取走，单独加锁以免与订阅者的唤醒争用
+    _pending_lock = threading.Lock()
+    _pending = {}
+
+    # offering_id -> [max_students, 保存的状态, 最近一次推送的人数]，只由后台线程读写
+    _known = {}
+
+    _thread = None
+    _start_lock = threading.Lock()
+
+    @staticmethod
+    def publish(offering_id, current_students):
+        """
+        记录一次人数变化（人数变化回调，只做内存操作）
+
+        Args:
+            offering_id: 开课ID
+            current_students: 变化后的已选人数
+        """
+        if not SeatFeed._subscribers:
+            return
+        with SeatFeed._pending_lock:
+            SeatFeed._pending[offering_id] = current_students
+
+    @staticmethod
+    def subscriber_count():
+        """当前进程的订阅连接数"""
+        return SeatFeed._subscribers
+
+    @staticmethod
+    def start(app):
+        """
+        启动后台合并线程（首个订阅者连接时调用，重复调用无副作用）
+
+        Args:
+            app: Flask 应用
+        """
+        if SeatFeed._thread is not None:
+            return SeatFeed._thread
+        with SeatFeed._start_lock:
+            if SeatFeed._thread is None:
+                rate = max(float(app.config.get('SEAT_STREAM_RATE', 2)), 0.1)
+                resync = float(app.config.get('SEAT_STREAM_RESYNC', 5))
+                thread = threading.Thread(
+                    target=SeatFeed._run, args=(app, 1.0 / rate, resync), name='seat-feed', daemon=True
+                )
+                thread.start()
+                SeatFeed._thread = thread
+        return SeatFeed._thread
+
+    @staticmethod
+    def _run(app, interval, resync):
+        next_resync = None
+        synced = False
+        while True:
+            time.sleep(interval)
+            if not SeatFeed._subscribers:
+                # 无人订阅时不推送；记录的人数可能已过期，重新有订阅者时从头同步
+                if synced:
+                    SeatFeed._known = {}
+                    with SeatFeed._pending_lock:
+                        SeatFeed._pending = {}
+                    synced = False
+                continue
+            due = not synced or (next_resync is not None and time.monotonic() >= next_resync)
+            if not due and not SeatFeed._pending:
+                continue
+            with app.app_context():
+                try:
+                    if due:
+                        SeatFeed.resync()
+                        synced = True
+                        next_resync = time.monotonic() + resync if resync > 0 else None
+                    SeatFeed.flush()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("选课人数推送失败")
+                finally:
+                    db.session.remove()
+
+    @staticmethod
+    def _load(offering_ids):
+        """加载开课的人数上限与保存的状态（需在应用上下文中调用）"""
+        offering_ids = list(offering_ids)
+        for i in range(0, len(offering_ids), LOAD_CHUNK):
+            rows = db.session.query(
+                CourseOffering.offering_id, CourseOffering.max_students, CourseOffering.status
+            ).filter(CourseOffering.offering_id.in_(offering_ids[i:i + LOAD_CHUNK])).all()
+            for row in rows:
+                SeatFeed._known[row.offering_id] = [row.max_students, row.status, None]
+
+    @staticmethod
+    def flush():
+        """
+        合并待发送的变化并广播一批增量（需在应用上下文中调用）
+
+        Returns:
+            int: 本批增量条数
+        """
+        with SeatFeed._pending_lock:
+            pending, SeatFeed._pending = SeatFeed._pending, {}
+        if not pending:
+            return 0
+        known = SeatFeed._known
+        missing = [offering_id for offering_id in pending if offering_id not in known]
+        if missing:
+            SeatFeed._load(missing)
+
+        deltas = {}
+        for offering_id, count in pending.items():
+            meta = known.get(offering_id)
+            # 开课已删除，或选课后又退课，人数与上次推送相同
+            if meta is None or meta[2] == count:
+                continue
+            meta[2] = count
+            deltas[offering_id] = {
+                'offering_id': offering_id,
+                'current_students': count,
+                'status': seat_status(meta[1], count, meta[0])
+            }
+        if deltas:
+            with SeatFeed._cond:
+                SeatFeed._seq += 1
+                seq = SeatFeed._seq
+                SeatFeed._batches.append((seq, deltas, _frame('seats', _dumps(list(deltas.values())), seq)))
+                SeatFeed._cond.notify_all()
+        return len(deltas)
+
+    @staticmethod
+    def resync():
+        """
+        重新加载开放选课的开课信息，并补齐其他 worker 造成的人数变化
+        （需在应用上下文中调用）
+        """
+        previous = SeatFeed._known
+        SeatFeed._known = {}
+        rows = db.session.query(
+            CourseOffering.offering_id, CourseOffering.max_students, CourseOffering.status
+        ).filter(CourseOffering.status.in_((STATUS_OPEN, STATUS_FULL))).all()
+        for row in rows:
+            last = previous.get(row.offering_id)
+            SeatFeed._known[row.offering_id] = [row.max_students, row.status, last[2] if last else None]
+
+        counts = SeatCounter.get_many(SeatFeed._known)
+        with SeatFeed._pending_lock:
+            for offering_id, meta in SeatFeed._known.items():
+                count = counts[offering_id]
+                if meta[2] is None:
+                    # 首次同步只记录基线，不推送：客户端的课程列表本来就是最新的
+                    meta[2] = count
+                elif meta[2] != count:
+                    SeatFeed._pending.setdefault(offering_id, count)
+
+    @staticmethod
+    def subscribe(last_event_id=None, offering_ids=None, heartbeat=HEARTBEAT_INTERVAL, alive=None):
+        """
+        订阅人数变化，返回 SSE 文本流的生成器
+
+        Args:
+            last_event_id: 断线重连时客户端带回的最后一个事件序号
+            offering_ids: 只关心的开课ID集合，None 表示全部
+            heartbeat: 心跳间隔（秒）
+            alive: 连接是否仍被授权的检查函数，每个心跳间隔调用一次；
+                   返回 False 时发送 expired 事件并结束连接
+
+        Yields:
+            str: SSE 消息
+        """
+        cond = SeatFeed._cond
+        with cond:
+            SeatFeed._subscribers += 1
+            cursor = SeatFeed._seq
+            # 序号比当前还大说明服务端重启过，客户端手里的人数已不可信
+            stale = last_event_id is not None and last_event_id > cursor
+            if last_event_id is not None and 0 <= last_event_id <= cursor:
+                cursor = last_event_id
+        checked = time.monotonic()
+        try:
+            yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+            if stale:
+                yield _frame('resync', '{}', cursor)
+            while True:
+                if alive is not None and time.monotonic() - checked >= heartbeat:
+                    checked = time.monotonic()
+                    if not alive():
+                        yield _frame('expired', '{}')
+                        return
+                with cond:
+                    if SeatFeed._seq == cursor:
+                        cond.wait(heartbeat)
+                    seq = SeatFeed._seq
+                    behind = seq - cursor
+                    if 0 < behind <= len(SeatFeed._batches):
+                        batches = list(islice(SeatFeed._batches, len(SeatFeed._batches) - behind, None))
+                    else:
+                        batches = None
+                if seq == cursor:
+                    yield ': ping\n\n'
+                    continue
+                cursor = seq
+                if batches is None:
+                    # 落后超过缓冲长度（或服务端已重启），由客户端重新拉取完整列表
+                    yield _frame('resync', '{}', seq)
+                    continue
+                if len(batches) == 1 and offering_ids is None:
+                    yield batches[0][2]
+                    continue
+                merged = {}
+                for _, deltas, _ in batches:
+                    merged.update(deltas)
+                if offering_ids is not None:
+                    merged = {key: value for key, value in merged.items() if key in offering_ids}
+                if merged:
+                    yield _frame('seats', _dumps(list(merged.values())), seq)
+        finally:
+            with cond:
+                SeatFeed._subscribers -= 1
+
+
+on_seat_change(SeatFeed.publish)
@@ -0,0 +1,134 @@
+"""
+选课名额预留服务
+在选课/退课事务中用条件 UPDATE 原子地"检查并自增/自减"开课人数，避免"先读后写"导致的超选，
+并在数据库写冲突（SQLite 锁、MySQL 死锁/锁等待超时）时退避重试
+"""
+import random
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import CourseOffering
+from .seat_counter_service import stage_seat_change
+
+# 写冲突重试参数
+MAX_RETRIES = 5
+BASE_BACKOFF = 0.01  # 首次退避时间（秒）
+MAX_BACKOFF = 0.5    # 单次退避上限（秒）
+
+# 视为写冲突、可以重试的数据库错误特征
+_CONTENTION_MARKERS = (
+    'database is locked',    # SQLite
+    'database table is locked',
+    'deadlock found',        # MySQL 1213
+    'lock wait timeout',     # MySQL 1205
+)
+
+
+class SeatReservationService:
+    """选课名额预留服务类"""
+
+    @staticmethod
+    def reserve_seat(offering_id, amount=1):
+        """
+        在当前事务中原子地占用名额
+
+        名额检查与人数自增在同一条条件 UPDATE 中完成，数据库行锁保证并发请求
+        （包括其他 worker）不会把已选人数推过 max_students；占用随事务提交生效，
+        回滚时一并撤销，不需要单独归还。
+
+        Args:
+            offering_id: 开课ID
+            amount: 占用的名额数（批量分配时一次占用多个）
+
+        Returns:
+            int: 占用后的已选人数；剩余名额不足或开课不存在时返回 None
+        """
+        result = db.session.execute(
+            update(CourseOffering)
+            .where(
+                CourseOffering.offering_id == offering_id,
+                CourseOffering.current_students + amount <= CourseOffering.max_students
+            )
+            .values(current_students=CourseOffering.current_students + amount)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return None
+        return SeatReservationService._staged(offering_id)
+
+    @staticmethod
+    def release_seat(offering_id, amount=1):
+        """
+        在当前事务中原子地释放名额
+
+        Args:
+            offering_id: 开课ID
+            amount: 释放的名额数
+
+        Returns:
+            int: 释放后的已选人数；人数不足以扣减时返回 None
+        """
+        result = db.session.execute(
+            update(CourseOffering)
+            .where(
+                CourseOffering.offering_id == offering_id,
+                CourseOffering.current_students >= amount
+            )
+            .values(current_students=CourseOffering.current_students - amount)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return None
+        return SeatReservationService._staged(offering_id)
+
+    @staticmethod
+    def _staged(offering_id):
+        """读取本事务更新后的人数，并登记到提交后的缓存失效与推送"""
+        count = db.session.execute(
+            select(CourseOffering.current_students).where(CourseOffering.offering_id == offering_id)
+        ).scalar()
+        stage_seat_change(db.session, offering_id, count)
+        return count
+
+    @staticmethod
+    def is_contention_error(error):
+        """
+        判断数据库异常是否属于可重试的写冲突
+
+        Args:
+            error: OperationalError 异常
+
+        Returns:
+            bool: 是否可以重试
+        """
+        message = str(getattr(error, 'orig', error)).lower()
+        return any(marker in message for marker in _CONTENTION_MARKERS)
+
+    @staticmethod
+    def run_with_retry(operation, *args, **kwargs):
+        """
+        执行一个完整的写事务，遇到写冲突时回滚并按指数退避（带随机抖动）重试
+
+        operation 必须自行提交事务，且可以安全地整体重放。
+
+        Args:
+            operation: 事务函数
+            *args, **kwargs: 传给事务函数的参数
+
+        Returns:
+            事务函数的返回值
+
+        Raises:
+            OperationalError: 超过最大重试次数或非写冲突错误
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return operation(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt >= MAX_RETRIES or not SeatReservationService.is_contention_error(e):
+                    raise
+                backoff = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt))
+                time.sleep(random.uniform(0, backoff))
@@ -0,0 +1,377 @@
+"""
+进程间共享状态存储
+默认使用进程内存；多 worker 部署时可通过 SHARED_STORE=sqlite:///路径
+切换为同一台机器上所有 worker 共享的 SQLite 文件
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+# 存储实例标识的键
+STORE_NONCE_KEY = 'store:nonce'
+
+# 写入带过期时间的键时，距上次清理超过该间隔（秒）就顺带清理一次过期键，
+# 限流令牌桶、幂等记录等大量短期键不会无限堆积
+PURGE_INTERVAL = 60
+
+
+class MemoryStore:
+    """进程内键值存储（线程安全，支持过期时间）"""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+
+    def _alive(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._alive(key, time.time())
+            return default if item is None else item[0]
+
+    def get_many(self, keys):
+        """批量读取，返回存在的键 -> 值"""
+        with self._lock:
+            now = time.time()
+            result = {}
+            for key in keys:
+                item = self._alive(key, now)
+                if item is not None:
+                    result[key] = item[0]
+            return result
+
+    def _maybe_purge(self, now):
+        # 调用方已持有锁
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        for key in [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]:
+            del self._data[key]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            now = time.time()
+            if ttl:
+                self._maybe_purge(now)
+            self._data[key] = (value, now + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        """仅当键不存在时写入，返回是否写入成功"""
+        with self._lock:
+            now = time.time()
+            if ttl:
+                self._maybe_purge(now)
+            if self._alive(key, now) is not None:
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def incr(self, key, amount=1):
+        """原子自增并返回新值（不存在时从 0 开始）"""
+        with self._lock:
+            item = self._alive(key, time.time())
+            value = (item[0] if item else 0) + amount
+            self._data[key] = (value, item[1] if item else None)
+            return value
+
+    def incr_bounded(self, key, amount, lower=None, upper=None):
+        """
+        原子自增，结果超出 [lower, upper] 时不修改
+
+        Returns:
+            int: 新值；越界时返回 None
+        """
+        with self._lock:
+            item = self._alive(key, time.time())
+            value = (item[0] if item else 0) + amount
+            if (lower is not None and value < lower) or (upper is not None and value > upper):
+                return None
+            self._data[key] = (value, item[1] if item else None)
+            return value
+
+    def take_token(self, key, rate, burst, amount=1):
+        """
+        令牌桶：按每秒 rate 个补充、最多存 burst 个，原子地取走 amount 个令牌
+
+        桶在补满时过期删除，空闲用户不占用存储。
+
+        Returns:
+            float: 0 表示取到令牌；否则为令牌足够前需要等待的秒数
+        """
+        with self._lock:
+            now = time.time()
+            item = self._alive(key, now)
+            tokens, stamp = item[0] if item else (burst, now)
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            if tokens < amount:
+                return (amount - tokens) / rate
+            tokens -= amount
+            self._maybe_purge(now)
+            self._data[key] = ((tokens, now), now + max((burst - tokens) / rate, 0.001))
+            return 0.0
+
+    def pop(self, key):
+        """原子地读取并删除，键不存在或已过期时返回 None（一次性凭证只能被取走一次）"""
+        with self._lock:
+            item = self._alive(key, time.time())
+            if item is None:
+                return None
+            del self._data[key]
+            return item[0]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        """删除指定前缀的全部键"""
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def purge_expired(self):
+        """清理过期键，返回清理数量"""
+        with self._lock:
+            now = time.time()
+            expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+
+class SqliteStore:
+    """基于 SQLite 文件的键值存储，同一台机器上的多个 worker 共享"""
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = time.time()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self):
+        # 每个线程独立连接，手动管理事务
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def get_many(self, keys):
+        keys = list(keys)
+        result = {}
+        now = time.time()
+        # SQLite 单条语句的参数个数有限，分批查询
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn().execute(
+                "SELECT key, value FROM kv WHERE key IN (%s) AND (expires_at IS NULL OR expires_at > ?)"
+                % ','.join('?' * len(chunk)),
+                (*chunk, now)
+            ).fetchall()
+            result.update((key, json.loads(value)) for key, value in rows)
+        return result
+
+    def _maybe_purge(self, now):
+        # 各线程各自判断，偶尔重复清理无害
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        self.purge_expired()
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._maybe_purge(time.time())
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        now = time.time()
+        if ttl:
+            self._maybe_purge(now)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl if ttl else None)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def incr(self, key, amount=1):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            value = (json.loads(row[0]) if row else 0) + amount
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), row[1] if row else None)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def incr_bounded(self, key, amount, lower=None, upper=None):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            value = (json.loads(row[0]) if row else 0) + amount
+            if (lower is not None and value < lower) or (upper is not None and value > upper):
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), row[1] if row else None)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def take_token(self, key, rate, burst, amount=1):
+        conn = self._conn()
+        now = time.time()
+        self._maybe_purge(now)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            tokens, stamp = json.loads(row[0]) if row else (burst, now)
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            if tokens < amount:
+                conn.execute("ROLLBACK")
+                return (amount - tokens) / rate
+            tokens -= amount
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps([tokens, now]), now + max((burst - tokens) / rate, 0.001))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return 0.0
+
+    def pop(self, key):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return None if row is None else json.loads(row[0])
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        self._conn().execute("DELETE FROM kv WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+
+    def purge_expired(self):
+        cursor = self._conn().execute(
+            "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+
+def create_store(url):
+    """
+    根据配置创建存储
+
+    Args:
+        url: 'memory://' 或 'sqlite:///文件路径'
+
+    Returns:
+        MemoryStore 或 SqliteStore
+    """
+    if not url or url.startswith('memory://'):
+        return MemoryStore()
+    if url.startswith('sqlite:///'):
+        return SqliteStore(url[len('sqlite:///'):])
+    raise ValueError(f"不支持的共享存储: {url}")
+
+
+def init_shared_store(app):
+    """为应用创建共享存储实例"""
+    app.extensions['shared_store'] = create_store(app.config.get('SHARED_STORE'))
+
+
+def get_store():
+    """获取当前应用的共享存储"""
+    return current_app.extensions['shared_store']
+
+
+def store_nonce():
+    """
+    共享存储实例的随机标识，拼入由存储中的版本号生成的 ETag
+
+    进程内存储每次启动都会重新生成，SQLite 存储在文件重建后重新生成，
+    不同存储（或重启前后）中相同的版本号不会得到相同的 ETag。
+
+    Returns:
+        str: 存储实例标识
+    """
+    store = get_store()
+    nonce = getattr(store, 'nonce', None)
+    if nonce is None:
+        # 多个 worker 同时生成时只有第一个写入生效
+        store.add(STORE_NONCE_KEY, uuid.uuid4().hex[:12])
+        nonce = store.nonce = store.get(STORE_NONCE_KEY)
+    return nonce
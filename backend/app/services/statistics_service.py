@@ -2,9 +2,39 @@
 课程统计服务
 提供课程相关的统计数据和分析功能
 """
-from sqlalchemy import func, and_, desc
+from sqlalchemy import func, and_, case, desc
 from app import db
 from app.models import Course, CourseOffering, Enrollment, Student, Teacher, Class
+from .seat_counter_service import SeatCounter
+from .transcript_service import TranscriptService
+from .conflict_service import ConflictAnalysisService
+
+
+def _filter_term(query, academic_year=None, semester=None):
+    """按学年、学期筛选开课"""
+    if academic_year:
+        query = query.filter(CourseOffering.academic_year == academic_year)
+    if semester is not None:
+        query = query.filter(CourseOffering.semester == bool(semester))
+    return query
+
+
+def _enrollment_totals(academic_year=None, semester=None, teacher_id=None):
+    """
+    按开课汇总选课人数、已评分人数与成绩总和的子查询
+
+    Returns:
+        Subquery: 列 offering_id, enrolled, scored, score_sum
+    """
+    query = db.session.query(
+        Enrollment.offering_id,
+        func.count().label('enrolled'),
+        func.count(Enrollment.score).label('scored'),
+        func.sum(Enrollment.score).label('score_sum')
+    ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)
+    if teacher_id is not None:
+        query = query.filter(CourseOffering.teacher_id == teacher_id)
+    return _filter_term(query, academic_year, semester).group_by(Enrollment.offering_id).subquery()
 
 
 class CourseStatisticsService:
@@ -22,32 +52,29 @@ class CourseStatisticsService:
         Returns:
             dict: 包含各种统计数据的字典
         """
-        query = db.session.query(CourseOffering)
-        
-        if academic_year:
-            query = query.filter(CourseOffering.academic_year == academic_year)
-        if semester is not None:
-            query = query.filter(CourseOffering.semester == bool(semester))
-            
-        offerings = query.all()
-        
-        total_offerings = len(offerings)
-        total_capacity = sum(offering.max_students for offering in offerings)
-        total_enrolled = sum(offering.current_students for offering in offerings)
-        
-        # 计算课程状态分布
-        full_courses = sum(1 for offering in offerings if offering.current_students >= offering.max_students)
-        available_courses = total_offerings - full_courses
+        # 一条聚合查询完成，不加载开课对象；选课人数按已提交的选课记录统计
+        per_offering = _enrollment_totals(academic_year, semester)
+        enrolled = func.coalesce(per_offering.c.enrolled, 0)
+        row = db.session.query(
+            func.count(CourseOffering.offering_id).label('total_offerings'),
+            func.coalesce(func.sum(CourseOffering.max_students), 0).label('total_capacity'),
+            func.coalesce(func.sum(enrolled), 0).label('total_enrolled'),
+            func.coalesce(func.sum(case((enrolled >= CourseOffering.max_students, 1), else_=0)), 0).label('full_courses')
+        ).outerjoin(per_offering, per_offering.c.offering_id == CourseOffering.offering_id)
+        row = _filter_term(row, academic_year, semester).one()
+        
+        total_capacity = row.total_capacity
+        total_enrolled = row.total_enrolled
         
         # 计算平均选课率
         avg_enrollment_rate = (total_enrolled / total_capacity * 100) if total_capacity > 0 else 0
         
         return {
-            'total_offerings': total_offerings,
+            'total_offerings': row.total_offerings,
             'total_capacity': total_capacity,
             'total_enrolled': total_enrolled,
-            'full_courses': full_courses,
-            'available_courses': available_courses,
+            'full_courses': row.full_courses,
+            'available_courses': row.total_offerings - row.full_courses,
             'avg_enrollment_rate': round(avg_enrollment_rate, 2)
         }
     
@@ -75,11 +102,15 @@ class CourseStatisticsService:
         if semester is not None:
             query = query.filter(CourseOffering.semester == bool(semester))
             
-        offerings = query.order_by(desc(CourseOffering.current_students)).limit(limit).all()
+        # 按实时选课人数排序
+        offerings = query.all()
+        seat_counts = SeatCounter.get_many(offering.offering_id for offering, _, _ in offerings)
+        offerings.sort(key=lambda row: seat_counts[row[0].offering_id], reverse=True)
         
         result = []
-        for offering, course, teacher in offerings:
-            enrollment_rate = (offering.current_students / offering.max_students * 100) if offering.max_students > 0 else 0
+        for offering, course, teacher in offerings[:limit]:
+            current_students = seat_counts[offering.offering_id]
+            enrollment_rate = (current_students / offering.max_students * 100) if offering.max_students > 0 else 0
             
             result.append({
                 'offering_id': offering.offering_id,
@@ -87,7 +118,7 @@ class CourseStatisticsService:
                 'course_name': course.course_name,
                 'teacher_name': teacher.name,
                 'teacher_title': teacher.title,
-                'current_students': offering.current_students,
+                'current_students': current_students,
                 'max_students': offering.max_students,
                 'enrollment_rate': round(enrollment_rate, 2),
                 'academic_year': offering.academic_year,
@@ -109,33 +140,25 @@ class CourseStatisticsService:
         Returns:
             dict: 教师课程统计数据
         """
-        query = db.session.query(CourseOffering).filter(CourseOffering.teacher_id == teacher_id)
-        
-        if academic_year:
-            query = query.filter(CourseOffering.academic_year == academic_year)
-        if semester is not None:
-            query = query.filter(CourseOffering.semester == bool(semester))
-            
-        offerings = query.all()
-        
-        total_courses = len(offerings)
-        total_students = sum(offering.current_students for offering in offerings)
-        total_capacity = sum(offering.max_students for offering in offerings)
-        
-        # 计算已评分的学生数量
-        scored_students = db.session.query(func.count(Enrollment.student_id)).join(CourseOffering).filter(
-            CourseOffering.teacher_id == teacher_id,
-            Enrollment.score.isnot(None)
-        ).scalar() or 0
-        
-        # 计算平均成绩
-        avg_score = db.session.query(func.avg(Enrollment.score)).join(CourseOffering).filter(
-            CourseOffering.teacher_id == teacher_id,
-            Enrollment.score.isnot(None)
-        ).scalar() or 0
+        # 开课数、容量、选课人数、已评分人数与平均成绩由同一条聚合查询得出
+        per_offering = _enrollment_totals(academic_year, semester, teacher_id)
+        row = db.session.query(
+            func.count(CourseOffering.offering_id).label('total_courses'),
+            func.coalesce(func.sum(CourseOffering.max_students), 0).label('total_capacity'),
+            func.coalesce(func.sum(per_offering.c.enrolled), 0).label('total_students'),
+            func.coalesce(func.sum(per_offering.c.scored), 0).label('scored_students'),
+            func.sum(per_offering.c.score_sum).label('score_sum')
+        ).outerjoin(per_offering, per_offering.c.offering_id == CourseOffering.offering_id)\
+         .filter(CourseOffering.teacher_id == teacher_id)
+        row = _filter_term(row, academic_year, semester).one()
+        
+        total_students = row.total_students
+        total_capacity = row.total_capacity
+        scored_students = row.scored_students
+        avg_score = row.score_sum / scored_students if scored_students else 0
         
         return {
-            'total_courses': total_courses,
+            'total_courses': row.total_courses,
             'total_students': total_students,
             'total_capacity': total_capacity,
             'scored_students': scored_students,
@@ -155,65 +178,8 @@ class CourseStatisticsService:
         Returns:
             dict: 学生课程统计数据
         """
-        # 查询学生所有选课记录
-        enrollments = db.session.query(
-            Enrollment, CourseOffering, Course
-        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
-         .join(Course, CourseOffering.course_id == Course.course_id)\
-         .filter(Enrollment.student_id == student_id)\
-         .all()
-        
-        total_enrollments = len(enrollments)
-        total_credits = sum(course.credits for _, _, course in enrollments)
-        
-        # 计算已评分课程
-        scored_enrollments = [e for e, _, _ in enrollments if e.score is not None]
-        scored_credits = sum(course.credits for enrollment, _, course in enrollments if enrollment.score is not None)
-        
-        # 计算平均分
-        if scored_enrollments:
-            # 按学分加权计算平均分
-            weighted_score_sum = sum(
-                enrollment.score * course.credits 
-                for enrollment, _, course in enrollments 
-                if enrollment.score is not None
-            )
-            avg_score = weighted_score_sum / scored_credits if scored_credits > 0 else 0
-        else:
-            avg_score = 0
-        
-        # 按成绩等级分类
-        grade_distribution = {
-            'excellent': 0,  # 90-100
-            'good': 0,       # 80-89
-            'fair': 0,       # 70-79
-            'pass': 0,       # 60-69
-            'fail': 0        # <60
-        }
-        
-        for enrollment, _, _ in enrollments:
-            if enrollment.score is not None:
-                score = enrollment.score
-                if score >= 90:
-                    grade_distribution['excellent'] += 1
-                elif score >= 80:
-                    grade_distribution['good'] += 1
-                elif score >= 70:
-                    grade_distribution['fair'] += 1
-                elif score >= 60:
-                    grade_distribution['pass'] += 1
-                else:
-                    grade_distribution['fail'] += 1
-        
-        return {
-            'total_enrollments': total_enrollments,
-            'total_credits': total_credits,
-            'scored_courses': len(scored_enrollments),
-            'unscored_courses': total_enrollments - len(scored_enrollments),
-            'scored_credits': scored_credits,
-            'avg_score': round(avg_score, 2),
-            'grade_distribution': grade_distribution
-        }
+        # 与成绩查询共用同一份按台账版本缓存的成绩单
+        return TranscriptService.get_statistics(student_id)
     
     @staticmethod
     def get_time_conflict_analysis(academic_year=None, semester=None):
@@ -225,56 +191,7 @@ class CourseStatisticsService:
             semester: 学期 (可选)
             
         Returns:
-            dict: 时间冲突分析结果
+            dict: 时间冲突分析结果（时间重叠、教室重复占用、教师重复排课）
         """
-        query = db.session.query(CourseOffering).filter(
-            CourseOffering.day_of_week.isnot(None),
-            CourseOffering.start_time.isnot(None),
-            CourseOffering.end_time.isnot(None)
-        )
-        
-        if academic_year:
-            query = query.filter(CourseOffering.academic_year == academic_year)
-        if semester is not None:
-            query = query.filter(CourseOffering.semester == bool(semester))
-            
-        offerings = query.all()
-        
-        # 按时间段分组统计
-        time_slots = {}
-        conflicts = []
-        
-        for offering in offerings:
-            time_key = f"{offering.day_of_week}_{offering.start_time}_{offering.end_time}"
-            
-            if time_key not in time_slots:
-                time_slots[time_key] = []
-            time_slots[time_key].append(offering)
-            
-            # 检查是否有多个课程在同一时间段
-            if len(time_slots[time_key]) > 1:
-                conflict_info = {
-                    'day_of_week': offering.day_of_week,
-                    'start_time': str(offering.start_time),
-                    'end_time': str(offering.end_time),
-                    'courses': []
-                }
-                
-                for conflicted_offering in time_slots[time_key]:
-                    course = Course.query.get(conflicted_offering.course_id)
-                    teacher = Teacher.query.get(conflicted_offering.teacher_id)
-                    
-                    conflict_info['courses'].append({
-                        'offering_id': conflicted_offering.offering_id,
-                        'course_name': course.course_name if course else '未知',
-                        'teacher_name': teacher.name if teacher else '未知'
-                    })
-                
-                conflicts.append(conflict_info)
-        
-        return {
-            'total_scheduled_courses': len(offerings),
-            'unique_time_slots': len(time_slots),
-            'conflict_count': len(conflicts),
-            'conflicts': conflicts
-        }
+        # 按星期做区间扫描，识别部分重叠以及教室、教师重复占用
+        return ConflictAnalysisService.analyze(academic_year, semester)
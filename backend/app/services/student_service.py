@@ -1,11 +1,18 @@
 from app import db
 from app.models import Student, Course, CourseOffering, Enrollment
 from .exceptions import (
-    CourseFullError, TimeConflictError, AlreadyEnrolledError,
+    ServiceError, CourseFullError, TimeConflictError, AlreadyEnrolledError,
     PrerequisiteNotMetError, CourseNotFoundError, StudentNotFoundError
 )
+from .seat_service import SeatReservationService
+from .seat_counter_service import SeatCounter
+from .timetable_service import TimetableCache
+from .prerequisite_service import PrerequisiteCache
+from .lottery_service import LotteryService
+from .waitlist_service import WaitlistService
 from datetime import datetime, time
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 
 class StudentService:
     """学生业务逻辑服务"""
@@ -15,6 +22,8 @@ class StudentService:
         """
         学生选课核心业务逻辑
         
+        名额由事务内的条件 UPDATE 原子占用，选课记录提交失败时随事务回滚；遇到数据库写冲突时整体重试。
+        
         Args:
             student_id: 学生ID
             offering_id: 开课ID
@@ -30,7 +39,22 @@ class StudentService:
             TimeConflictError: 时间冲突
             PrerequisiteNotMetError: 先修课程要求未满足
         """
+        return SeatReservationService.run_with_retry(
+            StudentService._enroll_in_course_once, student_id, offering_id
+        )
+    
+    @staticmethod
+    def _enroll_in_course_once(student_id, offering_id):
+        """
+        执行一次选课事务（可被整体重放）
         
+        Args:
+            student_id: 学生ID
+            offering_id: 开课ID
+            
+        Returns:
+            dict: 选课结果信息
+        """
         # 1. 验证学生是否存在
         student = Student.query.filter_by(student_id=student_id).first()
         if not student:
@@ -40,6 +64,7 @@ class StudentService:
         offering = CourseOffering.query.filter_by(offering_id=offering_id).first()
         if not offering:
             raise CourseNotFoundError("开课不存在")
+        LotteryService.check_enrollment_open(offering)
         
         # 3. 检查是否已经选过这门课
         existing_enrollment = Enrollment.query.filter_by(
@@ -57,8 +82,8 @@ class StudentService:
         if same_course_enrollment:
             raise AlreadyEnrolledError("已经选过此课程的其他班级")
         
-        # 5. 检查是否还有名额
-        if offering.current_students >= offering.max_students:
+        # 5. 快速拒绝已满课程（最终以第8步的条件 UPDATE 为准）
+        if SeatCounter.get(offering_id) >= offering.max_students:
             raise CourseFullError()
         
         # 6. 检查时间冲突
@@ -67,87 +92,241 @@ class StudentService:
         # 7. 检查先修课程要求
         StudentService._check_prerequisites(student_id, offering.course_id)
         
-        # 8. 创建选课记录
-        enrollment = Enrollment(
-            offering_id=offering_id,
-            student_id=student_id
-        )
-        
-        # 9. 更新当前选课人数
-        offering.current_students += 1
+        # 8. 原子占用名额（条件 UPDATE 检查并自增，与选课记录在同一事务内提交）
+        current_students = SeatReservationService.reserve_seat(offering_id)
+        if current_students is None:
+            db.session.rollback()
+            raise CourseFullError()
         
-        # 10. 更新课程状态
-        if offering.current_students >= offering.max_students:
-            offering.status = '名额已满'
+        # 9. 创建选课记录，提交失败时名额随事务回滚
+        enrollment_date = datetime.utcnow()
+        db.session.add(Enrollment(
+            offering_id=offering_id,
+            student_id=student_id,
+            enrollment_date=enrollment_date
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 并发的重复提交：主键冲突
+            db.session.rollback()
+            raise AlreadyEnrolledError("已经选过这门课")
         
-        # 11. 保存到数据库
-        db.session.add(enrollment)
-        db.session.commit()
+        # 10. 增量更新课表缓存
+        TimetableCache.on_enroll(student_id, offering, offering.course.course_name, enrollment_date)
         
         return {
             'message': '选课成功',
             'enrollment_id': f"{offering_id}-{student_id}",
             'course_name': offering.course.course_name,
             'teacher_name': offering.teacher.name,
-            'current_students': offering.current_students,
+            'current_students': current_students,
             'max_students': offering.max_students
         }
     
     @staticmethod
-    def _check_time_conflict(student_id, new_offering):
+    def enroll_many(student_id, offering_ids):
         """
-        检查时间冲突
+        批量选课（购物车模式）
+        
+        一次性加载学生已选课程、课表与已修课程，在内存中校验整个购物车
+        （包括购物车内课程之间的冲突），再在同一事务内占用名额并写入选课记录。
+        单门课程失败不影响其他课程。
         
         Args:
             student_id: 学生ID
-            new_offering: 新的开课对象
+            offering_ids: 开课ID列表
+            
+        Returns:
+            dict: 包含每门课程选课结果的字典
             
         Raises:
-            TimeConflictError: 时间冲突时抛出异常
+            StudentNotFoundError: 学生不存在
         """
-        # 如果新开课没有设置时间，跳过冲突检查
-        if not all([new_offering.day_of_week, new_offering.start_time, new_offering.end_time]):
-            return
+        return SeatReservationService.run_with_retry(
+            StudentService._enroll_many_once, student_id, offering_ids
+        )
+    
+    @staticmethod
+    def _enroll_many_once(student_id, offering_ids):
+        """
+        执行一次批量选课事务（可被整体重放）
         
-        # 查询学生已选课程的时间安排
-        enrolled_offerings = db.session.query(CourseOffering).join(Enrollment).filter(
-            Enrollment.student_id == student_id,
-            CourseOffering.day_of_week.isnot(None),
-            CourseOffering.start_time.isnot(None),
-            CourseOffering.end_time.isnot(None)
-        ).all()
-        
-        for existing_offering in enrolled_offerings:
-            # 检查是否为同一天
-            if existing_offering.day_of_week == new_offering.day_of_week:
-                # 检查时间是否重叠
-                if StudentService._is_time_overlap(
-                    existing_offering.start_time, existing_offering.end_time,
-                    new_offering.start_time, new_offering.end_time
-                ):
-                    raise TimeConflictError(
-                        f"与课程《{existing_offering.course.course_name}》时间冲突"
+        Args:
+            student_id: 学生ID
+            offering_ids: 开课ID列表
+            
+        Returns:
+            dict: 批量选课结果
+        """
+        if not Student.query.filter_by(student_id=student_id).first():
+            raise StudentNotFoundError()
+        
+        # 去重并保持提交顺序
+        offering_ids = list(dict.fromkeys(offering_ids))
+        
+        # 1. 一次查询加载购物车中的开课及课程信息
+        cart = {
+            offering.offering_id: (offering, course)
+            for offering, course in db.session.query(CourseOffering, Course)
+            .join(Course, CourseOffering.course_id == Course.course_id)
+            .filter(CourseOffering.offering_id.in_(offering_ids))
+            .all()
+        }
+        
+        # 2. 一次查询加载学生已选课程，课表取自缓存的副本（购物车在副本上试排）
+        enrolled = db.session.query(
+            CourseOffering.offering_id, CourseOffering.course_id
+        ).join(Enrollment, Enrollment.offering_id == CourseOffering.offering_id)\
+         .filter(Enrollment.student_id == student_id)\
+         .all()
+        enrolled_offering_ids = {row.offering_id for row in enrolled}
+        taken_course_ids = {row.course_id for row in enrolled}
+        timetable = TimetableCache.get(student_id).copy()
+        
+        seat_counts = SeatCounter.get_many(cart)
+        open_terms = LotteryService.open_terms()
+        
+        # 3. 先修关系取自缓存，需要时一次查询加载已通过课程
+        graph = PrerequisiteCache.get()
+        needs_prerequisites = any(graph.direct(course.course_id) for _, course in cart.values())
+        passed_course_ids = StudentService._get_passed_course_ids(student_id) if needs_prerequisites else set()
+        
+        # 4. 在内存中逐项校验，通过的课程加入课表以检测购物车内部冲突
+        results = {}
+        accepted = []
+        for offering_id in offering_ids:
+            try:
+                if offering_id not in cart:
+                    raise CourseNotFoundError("开课不存在")
+                offering, course = cart[offering_id]
+                LotteryService.check_enrollment_open(offering, open_terms)
+                if offering_id in enrolled_offering_ids:
+                    raise AlreadyEnrolledError("已经选过这门课")
+                if course.course_id in taken_course_ids:
+                    raise AlreadyEnrolledError("已经选过此课程的其他班级")
+                if seat_counts[offering_id] >= offering.max_students:
+                    raise CourseFullError()
+                conflict = timetable.find_conflict(
+                    offering.day_of_week, offering.start_time, offering.end_time
+                )
+                if conflict:
+                    raise TimeConflictError(f"与课程《{conflict}》时间冲突")
+                missing = graph.missing(course.course_id, passed_course_ids)
+                if missing:
+                    raise PrerequisiteNotMetError(
+                        f"需要先完成课程《{graph.course_names.get(missing[0], missing[0])}》"
                     )
+            except ServiceError as e:
+                results[offering_id] = {
+                    'offering_id': offering_id,
+                    'success': False,
+                    'message': e.message,
+                    'code': e.code
+                }
+                continue
+            
+            accepted.append(offering_id)
+            taken_course_ids.add(course.course_id)
+            timetable.add(
+                offering_id, offering.day_of_week, offering.start_time,
+                offering.end_time, course.course_name
+            )
+        
+        # 5. 原子占用名额并写入选课记录，名额与选课记录在同一事务内提交
+        enrollment_date = datetime.utcnow()
+        created = []
+        for offering_id in accepted:
+            offering, course = cart[offering_id]
+            if SeatReservationService.reserve_seat(offering_id) is None:
+                results[offering_id] = {
+                    'offering_id': offering_id,
+                    'success': False,
+                    'message': CourseFullError().message,
+                    'code': 400
+                }
+                continue
+            db.session.add(Enrollment(
+                offering_id=offering_id,
+                student_id=student_id,
+                enrollment_date=enrollment_date
+            ))
+            created.append((offering, course.course_name))
+            results[offering_id] = {
+                'offering_id': offering_id,
+                'success': True,
+                'message': '选课成功',
+                'course_name': course.course_name
+            }
+        
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 与单门选课请求并发提交导致主键冲突，整批回滚（名额随之撤销）
+            db.session.rollback()
+            raise AlreadyEnrolledError("选课记录已变化，请刷新后重试")
+        
+        for offering, course_name in created:
+            TimetableCache.on_enroll(student_id, offering, course_name, enrollment_date)
+        
+        ordered = [results[offering_id] for offering_id in offering_ids]
+        enrolled_count = sum(1 for item in ordered if item['success'])
+        return {
+            'message': f'成功选课 {enrolled_count} 门',
+            'enrolled_count': enrolled_count,
+            'failed_count': len(ordered) - enrolled_count,
+            'results': ordered
+        }
     
     @staticmethod
-    def _is_time_overlap(start1, end1, start2, end2):
+    def _get_passed_course_ids(student_id):
         """
-        检查两个时间段是否重叠
+        查询学生已通过（成绩>=60分）的课程ID集合
         
         Args:
-            start1, end1: 第一个时间段
-            start2, end2: 第二个时间段
+            student_id: 学生ID
             
         Returns:
-            bool: 是否重叠
+            set: 课程ID集合
+        """
+        rows = db.session.query(CourseOffering.course_id).join(
+            Enrollment, Enrollment.offering_id == CourseOffering.offering_id
+        ).filter(
+            Enrollment.student_id == student_id,
+            Enrollment.score >= 60
+        ).distinct().all()
+        return {row[0] for row in rows}
+    
+    @staticmethod
+    def _check_time_conflict(student_id, new_offering):
         """
-        return not (end1 <= start2 or end2 <= start1)
+        检查时间冲突（基于缓存的周课表位图）
+        
+        Args:
+            student_id: 学生ID
+            new_offering: 新的开课对象
+            
+        Raises:
+            TimeConflictError: 时间冲突时抛出异常
+        """
+        # 如果新开课没有设置时间，跳过冲突检查
+        if not all([new_offering.day_of_week, new_offering.start_time, new_offering.end_time]):
+            return
+        
+        conflict = TimetableCache.get(student_id).find_conflict(
+            new_offering.day_of_week, new_offering.start_time, new_offering.end_time
+        )
+        if conflict:
+            raise TimeConflictError(f"与课程《{conflict}》时间冲突")
     
     @staticmethod
     def _check_prerequisites(student_id, course_id):
         """
         检查先修课程要求
         
+        先修关系取自进程内缓存的先修关系图，学生已通过课程一次查询取得，
+        检查本身是一次集合差。
+        
         Args:
             student_id: 学生ID
             course_id: 课程ID
@@ -155,29 +334,16 @@ class StudentService:
         Raises:
             PrerequisiteNotMetError: 先修课程要求未满足时抛出异常
         """
-        # 获取课程的先修课程
-        course = Course.query.filter_by(course_id=course_id).first()
-        if not course:
-            return
-        
-        prerequisites = course.prerequisites.all()
-        if not prerequisites:
+        graph = PrerequisiteCache.get()
+        if not graph.direct(course_id):
             return  # 没有先修课程要求
         
         # 检查学生是否已完成所有先修课程（成绩>=60分）
-        for prereq_course in prerequisites:
-            # 查询学生是否已修过此先修课程且成绩合格
-            completed = db.session.query(Enrollment).join(CourseOffering).filter(
-                CourseOffering.course_id == prereq_course.course_id,
-                Enrollment.student_id == student_id,
-                Enrollment.score.isnot(None),
-                Enrollment.score >= 60
-            ).first()
-            
-            if not completed:
-                raise PrerequisiteNotMetError(
-                    f"需要先完成课程《{prereq_course.course_name}》"
-                )
+        missing = graph.missing(course_id, StudentService._get_passed_course_ids(student_id))
+        if missing:
+            raise PrerequisiteNotMetError(
+                f"需要先完成课程《{graph.course_names.get(missing[0], missing[0])}》"
+            )
     
     @staticmethod
     def drop_course(student_id, offering_id):
@@ -195,6 +361,22 @@ class StudentService:
             CourseNotFoundError: 未选择此课程
             AlreadyGradedError: 已有成绩，无法退选
         """
+        return SeatReservationService.run_with_retry(
+            StudentService._drop_course_once, student_id, offering_id
+        )
+    
+    @staticmethod
+    def _drop_course_once(student_id, offering_id):
+        """
+        执行一次退课事务（可被整体重放）
+        
+        Args:
+            student_id: 学生ID
+            offering_id: 开课ID
+            
+        Returns:
+            dict: 退课结果信息
+        """
         # 查找选课记录
         enrollment = Enrollment.query.filter_by(
             offering_id=offering_id,
@@ -208,21 +390,34 @@ class StudentService:
         if enrollment.score is not None:
             raise AlreadyEnrolledError("已有成绩，无法退选")
         
-        # 获取开课信息并更新人数
-        offering = CourseOffering.query.filter_by(offering_id=offering_id).first()
-        if offering:
-            offering.current_students = max(0, offering.current_students - 1)
-            # 更新状态
-            if offering.current_students < offering.max_students:
-                offering.status = '开放选课'
+        offering = enrollment.offering
+        course_name = offering.course.course_name if offering else '未知课程'
+        
+        # 条件删除选课记录：并发的重复退课只有一个能删除成功
+        deleted = Enrollment.query.filter(
+            Enrollment.offering_id == offering_id,
+            Enrollment.student_id == student_id,
+            Enrollment.score.is_(None)
+        ).delete(synchronize_session=False)
+        if not deleted:
+            db.session.rollback()
+            raise CourseNotFoundError("未选择此课程")
         
-        # 删除选课记录
-        db.session.delete(enrollment)
+        promoted = None
+        if offering:
+            # 名额直接转给候补队首的学生，与退课在同一事务内提交；无人递补时释放名额
+            promoted = WaitlistService.promote(offering)
+            if not promoted:
+                SeatReservationService.release_seat(offering_id)
         db.session.commit()
         
+        if promoted:
+            TimetableCache.invalidate(promoted)
+        TimetableCache.on_drop(student_id, offering_id)
+        
         return {
             'message': '退选成功',
-            'course_name': offering.course.course_name if offering else '未知课程'
+            'course_name': course_name
         }
     
     @staticmethod
@@ -1,8 +1,83 @@
 from app import db
 from app.models import Teacher, Course, CourseOffering, Enrollment, Student, Class
-from .exceptions import ServiceError, CourseNotFoundError, InsufficientPermissionError
+from .exceptions import ServiceError, CourseNotFoundError, InsufficientPermissionError, ScheduleConflictError
+from .booking_service import BookingGuard
+from .seat_counter_service import SeatCounter
 from datetime import datetime, time
 
+
+def _parse_time(value, label):
+    """解析 HH:MM 格式的时间"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ServiceError(f"{label}格式错误，请使用HH:MM格式")
+
+
+def _parse_schedule(data):
+    """
+    解析并校验上课时间
+
+    Returns:
+        tuple: (星期几, 开始时间, 结束时间)
+    """
+    day_of_week = data.get('day_of_week')
+    if day_of_week is not None and (not isinstance(day_of_week, int) or not 1 <= day_of_week <= 7):
+        raise ServiceError("星期几必须是 1-7 的整数")
+    start_time = _parse_time(data.get('start_time'), '开始时间')
+    end_time = _parse_time(data.get('end_time'), '结束时间')
+    if start_time and end_time and start_time >= end_time:
+        raise ServiceError("结束时间必须晚于开始时间")
+    return day_of_week, start_time, end_time
+
+
+def _is_scheduled(offering):
+    return offering.day_of_week is not None and offering.start_time is not None and offering.end_time is not None
+
+
+def _find_booking_conflict(bookings, offering):
+    """在占用索引中查找冲突，返回 (冲突类型, 冲突开课的信息行)；索引中的开课已不存在时返回的行为 None"""
+    found = bookings.find_conflict(
+        offering.teacher_id, offering.day_of_week, offering.start_time, offering.end_time,
+        offering.location, exclude=offering.offering_id
+    )
+    if not found:
+        return None, None
+    kind, conflict_id = found
+    conflict = db.session.query(
+        CourseOffering.offering_id, CourseOffering.day_of_week, CourseOffering.start_time,
+        CourseOffering.end_time, CourseOffering.location, Course.course_name, Teacher.name
+    ).join(Course, CourseOffering.course_id == Course.course_id)\
+     .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
+     .filter(CourseOffering.offering_id == conflict_id).first()
+    return kind, conflict
+
+def _check_booking(bookings, offering):
+    """检查教室、教师占用，冲突时抛出 ScheduleConflictError 并附带冲突的开课"""
+    kind, conflict = _find_booking_conflict(bookings, offering)
+    if kind and conflict is None:
+        # 冲突的开课已不存在（索引过期，如数据库重建后），从数据库重建学期索引后再检查
+        bookings.reload(offering.academic_year, offering.semester)
+        kind, conflict = _find_booking_conflict(bookings, offering)
+    if conflict is None:
+        return
+    if kind == 'room':
+        message = f"教室 {conflict.location} 在该时间段已被《{conflict.course_name}》占用"
+    else:
+        message = f"教师在该时间段已有课程《{conflict.course_name}》"
+    raise ScheduleConflictError(message, {
+        'type': kind,
+        'offering_id': conflict.offering_id,
+        'course_name': conflict.course_name,
+        'teacher_name': conflict.name,
+        'day_of_week': conflict.day_of_week,
+        'start_time': conflict.start_time.strftime('%H:%M'),
+        'end_time': conflict.end_time.strftime('%H:%M'),
+        'location': conflict.location
+    })
+
 class TeacherService:
     """教师业务逻辑服务"""
     
@@ -10,6 +85,8 @@ class TeacherService:
     def create_course_offering(teacher_id, course_data):
         """
         教师开设课程
+
+        有完整上课时间时，在学期排课锁内检查教室与教师是否已被占用，再写入开课。
         
         Args:
             teacher_id: 教师ID
@@ -17,9 +94,94 @@ class TeacherService:
             
         Returns:
             dict: 开课结果信息
+
+        Raises:
+            ServiceError: 参数错误、课程不存在或已开设
+            ScheduleConflictError: 教室或教师在该时间段已有课程
         """
-        # 基础逻辑将在后续实现
-        pass
+        course = Course.query.filter_by(course_id=course_data['course_id']).first()
+        if not course:
+            raise ServiceError("课程不存在")
+
+        # 生成开课编号
+        offering_id = f"{course_data['academic_year']}-{course_data['semester']}-{course_data['course_id']}-{teacher_id}"
+        if CourseOffering.query.filter_by(offering_id=offering_id).first():
+            raise ServiceError("该学期已开设此课程")
+
+        day_of_week, start_time, end_time = _parse_schedule(course_data)
+        offering = CourseOffering(
+            offering_id=offering_id,
+            course_id=course_data['course_id'],
+            teacher_id=teacher_id,
+            academic_year=course_data['academic_year'],
+            semester=bool(course_data['semester']),
+            max_students=course_data['max_students'],
+            day_of_week=day_of_week,
+            start_time=start_time,
+            end_time=end_time,
+            location=course_data.get('location'),
+            status=course_data.get('status', '开放选课')
+        )
+
+        if not _is_scheduled(offering):
+            db.session.add(offering)
+            db.session.commit()
+            return {'message': '课程开设成功', 'offering_id': offering_id}
+
+        with BookingGuard.reserve(offering.academic_year, offering.semester) as bookings:
+            _check_booking(bookings, offering)
+            db.session.add(offering)
+            db.session.commit()
+            bookings.add(offering_id, teacher_id, day_of_week, start_time, end_time, offering.location)
+
+        return {'message': '课程开设成功', 'offering_id': offering_id}
+
+    @staticmethod
+    def update_course_schedule(teacher_id, offering_id, schedule_data):
+        """
+        修改开课的上课时间与地点
+
+        已有学生选课的开课不允许改期；改期后的时间段同样需要通过教室、教师占用检查。
+
+        Args:
+            teacher_id: 教师ID
+            offering_id: 开课ID
+            schedule_data: day_of_week / start_time / end_time / location 中需要修改的字段
+
+        Returns:
+            dict: 修改结果信息
+
+        Raises:
+            CourseNotFoundError: 开课不存在或不属于该教师
+            ServiceError: 参数错误或已有学生选课
+            ScheduleConflictError: 教室或教师在该时间段已有课程
+        """
+        offering = CourseOffering.query.filter_by(offering_id=offering_id, teacher_id=teacher_id).first()
+        if not offering:
+            raise CourseNotFoundError("开课记录不存在或无权限")
+        if SeatCounter.get(offering_id) > 0:
+            raise ServiceError("已有学生选课，无法修改上课时间地点")
+
+        merged = {
+            'day_of_week': offering.day_of_week,
+            'start_time': offering.start_time.strftime('%H:%M') if offering.start_time else None,
+            'end_time': offering.end_time.strftime('%H:%M') if offering.end_time else None,
+        }
+        merged.update({key: schedule_data[key] for key in merged if key in schedule_data})
+        day_of_week, start_time, end_time = _parse_schedule(merged)
+
+        with BookingGuard.reserve(offering.academic_year, offering.semester) as bookings:
+            offering.day_of_week = day_of_week
+            offering.start_time = start_time
+            offering.end_time = end_time
+            if 'location' in schedule_data:
+                offering.location = schedule_data['location']
+            if _is_scheduled(offering):
+                _check_booking(bookings, offering)
+            db.session.commit()
+            bookings.add(offering_id, teacher_id, day_of_week, start_time, end_time, offering.location)
+
+        return {'message': '上课时间地点修改成功', 'offering_id': offering_id}
     
     @staticmethod
     def get_teacher_courses(teacher_id, academic_year=None, semester=None):
@@ -0,0 +1,211 @@
+"""
+学生周课表位图服务
+按星期为每个学生维护分钟级占用位图（每天一个 int，第 n 位表示第 n 分钟），
+时间冲突检测只需一次按位与
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func
+from app import db
+from app.models import Course, CourseOffering, Enrollment
+
+# 进程内最多缓存的学生课表数量
+TIMETABLE_CACHE_SIZE = 5000
+
+
+def interval_mask(start, end):
+    """
+    将时间段转换为分钟位掩码（半开区间 [start, end)）
+
+    Args:
+        start: 开始时间 (datetime.time)
+        end: 结束时间 (datetime.time)
+
+    Returns:
+        int: 位掩码
+    """
+    start_minute = start.hour * 60 + start.minute
+    end_minute = end.hour * 60 + end.minute
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+def _fingerprint(count, latest):
+    # 部分数据库（如 MySQL DATETIME）不保存微秒，统一截断到秒再比较
+    return count, latest.replace(microsecond=0) if latest else None
+
+
+class WeeklyTimetable:
+    """单个学生的周课表占用位图"""
+
+    def __init__(self):
+        self._days = {}       # day_of_week -> 当天所有课程的占用位图
+        self._slots = {}      # offering_id -> (day_of_week, 位掩码, 课程名)
+        self._enrolled = {}   # offering_id -> enrollment_date，用于校验缓存是否过期
+
+    @classmethod
+    def load(cls, student_id):
+        """
+        从数据库一次性构建学生课表
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            WeeklyTimetable: 课表对象
+        """
+        timetable = cls()
+        rows = db.session.query(
+            Enrollment.offering_id, Enrollment.enrollment_date,
+            CourseOffering.day_of_week, CourseOffering.start_time, CourseOffering.end_time,
+            Course.course_name
+        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+         .join(Course, CourseOffering.course_id == Course.course_id)\
+         .filter(Enrollment.student_id == student_id)\
+         .all()
+        for row in rows:
+            timetable.add(
+                row.offering_id, row.day_of_week, row.start_time, row.end_time,
+                row.course_name, row.enrollment_date
+            )
+        return timetable
+
+    def copy(self):
+        """复制课表（批量选课在副本上试排，不影响缓存）"""
+        timetable = WeeklyTimetable()
+        timetable._days = dict(self._days)
+        timetable._slots = dict(self._slots)
+        timetable._enrolled = dict(self._enrolled)
+        return timetable
+
+    def add(self, offering_id, day_of_week, start_time, end_time, course_name, enrollment_date=None):
+        """加入一门已选课程（未排课时间的课程只记录选课信息）"""
+        self._enrolled[offering_id] = enrollment_date
+        if not all([day_of_week, start_time, end_time]):
+            return
+        mask = interval_mask(start_time, end_time)
+        self._slots[offering_id] = (day_of_week, mask, course_name)
+        self._days[day_of_week] = self._days.get(day_of_week, 0) | mask
+
+    def remove(self, offering_id):
+        """移除一门已选课程"""
+        self._enrolled.pop(offering_id, None)
+        slot = self._slots.pop(offering_id, None)
+        if not slot:
+            return
+        day_of_week = slot[0]
+        # 已有数据中可能存在重叠课程，按当天剩余课程重新合并位图
+        mask = 0
+        for day, slot_mask, _ in self._slots.values():
+            if day == day_of_week:
+                mask |= slot_mask
+        self._days[day_of_week] = mask
+
+    def find_conflict(self, day_of_week, start_time, end_time):
+        """
+        检测时间段是否与课表冲突
+
+        Args:
+            day_of_week: 星期几
+            start_time: 开始时间
+            end_time: 结束时间
+
+        Returns:
+            str: 冲突课程名，无冲突时返回 None
+        """
+        if not all([day_of_week, start_time, end_time]):
+            return None
+        mask = interval_mask(start_time, end_time)
+        if not self._days.get(day_of_week, 0) & mask:
+            return None
+        # 仅在确有冲突时查找具体课程，用于提示信息
+        for day, slot_mask, course_name in self._slots.values():
+            if day == day_of_week and slot_mask & mask:
+                return course_name
+        return None
+
+    def fingerprint(self):
+        """课表指纹：(选课数, 最近选课时间)，与数据库对比判断缓存是否过期"""
+        dates = [d for d in self._enrolled.values() if d is not None]
+        return _fingerprint(len(self._enrolled), max(dates) if dates else None)
+
+
+class TimetableCache:
+    """
+    进程内学生课表缓存（LRU），懒加载并在选课/退课时增量更新
+
+    缓存中的课表对象视为不可变：更新时替换为修改后的副本，读取方无需加锁。
+    """
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(student_id):
+        """
+        获取学生课表
+
+        先用一次单表聚合查询校验指纹，避免其他进程的选课/退课导致缓存过期；
+        指纹不一致时整体重建。
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            WeeklyTimetable: 课表对象
+        """
+        count, latest = db.session.query(
+            func.count(Enrollment.offering_id), func.max(Enrollment.enrollment_date)
+        ).filter(Enrollment.student_id == student_id).one()
+
+        with TimetableCache._lock:
+            timetable = TimetableCache._entries.get(student_id)
+            if timetable is not None and timetable.fingerprint() == _fingerprint(count, latest):
+                TimetableCache._entries.move_to_end(student_id)
+                return timetable
+
+        timetable = WeeklyTimetable.load(student_id)
+        TimetableCache._store(student_id, timetable)
+        return timetable
+
+    @staticmethod
+    def on_enroll(student_id, offering, course_name, enrollment_date):
+        """选课成功后增量更新缓存（未缓存的学生不做处理，下次懒加载）"""
+        with TimetableCache._lock:
+            timetable = TimetableCache._entries.get(student_id)
+            if timetable is not None:
+                timetable = timetable.copy()
+                timetable.add(
+                    offering.offering_id, offering.day_of_week, offering.start_time,
+                    offering.end_time, course_name, enrollment_date
+                )
+                TimetableCache._entries[student_id] = timetable
+
+    @staticmethod
+    def on_drop(student_id, offering_id):
+        """退课成功后增量更新缓存"""
+        with TimetableCache._lock:
+            timetable = TimetableCache._entries.get(student_id)
+            if timetable is not None:
+                timetable = timetable.copy()
+                timetable.remove(offering_id)
+                TimetableCache._entries[student_id] = timetable
+
+    @staticmethod
+    def invalidate(student_id=None):
+        """使指定学生（或全部）的课表缓存失效"""
+        with TimetableCache._lock:
+            if student_id is None:
+                TimetableCache._entries.clear()
+            else:
+                TimetableCache._entries.pop(student_id, None)
+
+    @staticmethod
+    def _store(student_id, timetable):
+        with TimetableCache._lock:
+            TimetableCache._entries[student_id] = timetable
+            TimetableCache._entries.move_to_end(student_id)
+            while len(TimetableCache._entries) > TIMETABLE_CACHE_SIZE:
+                TimetableCache._entries.popitem(last=False)
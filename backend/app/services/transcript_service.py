@@ -0,0 +1,225 @@
+"""
+学生成绩单服务
+各学期的成绩学分、加权分与等级分布直接取自学分台账（按学年、学期 GROUP BY 预聚合），
+成绩明细一次查询取出；整份成绩单按学生缓存在进程内，
+以台账版本戳（成绩写入后递增）判断是否过期。选课门数与学分随选课、退课变化，读取时单独聚合
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app import db
+from app.models import Course, CourseOffering, Enrollment, Teacher
+from .ledger_service import CreditLedgerService, PASSING_SCORE
+
+# 进程内最多缓存的成绩单数量
+TRANSCRIPT_CACHE_SIZE = 5000
+
+# 缓存最长保留时间（秒），兜底其他进程（如离线脚本）未能递增版本号的情况
+TRANSCRIPT_CACHE_TTL = 300
+
+# 学期汇总字段（与学分台账列一致）
+_TERM_FIELDS = (
+    'enrolled_courses', 'enrolled_credits',
+    'scored_courses', 'scored_credits', 'score_credit_sum',
+    'passed_courses', 'earned_credits', 'passed_score_credit_sum',
+    'grade_excellent', 'grade_good', 'grade_fair', 'grade_pass', 'grade_fail',
+)
+
+
+def _weighted(total, credits):
+    return round(total / credits, 2) if credits > 0 else 0
+
+
+def _sum_terms(terms):
+    """汇总多个学期的统计字段"""
+    total = dict.fromkeys(_TERM_FIELDS, 0)
+    for term in terms:
+        for field in _TERM_FIELDS:
+            total[field] += term[field]
+    return total
+
+
+class Transcript:
+    """
+    一个学生的成绩单（只读）
+
+    terms 按学年、学期倒序，每项包含台账汇总字段与该学期已出成绩的课程列表。
+    """
+
+    def __init__(self, student_id, stamp, terms):
+        self.student_id = student_id
+        self.stamp = stamp
+        self.terms = terms
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, student_id, stamp):
+        """
+        从数据库构建成绩单：一次读取台账行，一次读取成绩明细
+
+        Args:
+            student_id: 学生ID
+            stamp: 构建时的台账版本戳
+
+        Returns:
+            Transcript: 成绩单
+        """
+        terms = OrderedDict()
+        for row in CreditLedgerService.get_terms(student_id):
+            term = {field: getattr(row, field) for field in _TERM_FIELDS}
+            term.update(academic_year=row.academic_year, semester=row.semester, courses=[])
+            terms[(row.academic_year, row.semester)] = term
+
+        rows = db.session.query(
+            Enrollment.offering_id,
+            Enrollment.score,
+            Course.course_id,
+            Course.course_name,
+            Course.credits,
+            Course.exam_type,
+            Teacher.name.label('teacher_name'),
+            CourseOffering.academic_year,
+            CourseOffering.semester
+        ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id)\
+         .join(Course, CourseOffering.course_id == Course.course_id)\
+         .join(Teacher, CourseOffering.teacher_id == Teacher.teacher_id)\
+         .filter(
+            Enrollment.student_id == student_id,
+            Enrollment.score.isnot(None)
+        ).order_by(Course.course_id).all()
+
+        for row in rows:
+            term = terms.get((row.academic_year, row.semester))
+            if term is None:
+                continue
+            term['courses'].append({
+                'offering_id': row.offering_id,
+                'course_id': row.course_id,
+                'course_name': row.course_name,
+                'teacher_name': row.teacher_name,
+                'academic_year': row.academic_year,
+                'semester': row.semester,
+                'credits': row.credits,
+                'score': row.score,
+                'exam_type': row.exam_type,
+                'passed': row.score >= PASSING_SCORE
+            })
+        return cls(student_id, stamp, list(terms.values()))
+
+    def select(self, academic_year=None, semester=None):
+        """筛选学期（semester 为 None 时不限学期）"""
+        return [
+            term for term in self.terms
+            if (not academic_year or term['academic_year'] == academic_year)
+            and (semester is None or term['semester'] == bool(semester))
+        ]
+
+
+class TranscriptService:
+    """成绩单服务类"""
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(student_id):
+        """
+        获取学生成绩单
+
+        每次读取只比对共享存储中的台账版本戳，版本未变时直接返回缓存。
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            Transcript: 成绩单
+        """
+        stamp = CreditLedgerService.version(student_id)
+        now = time.monotonic()
+        with TranscriptService._lock:
+            transcript = TranscriptService._entries.get(student_id)
+            if transcript is not None and transcript.stamp == stamp \
+                    and now - transcript.loaded_at < TRANSCRIPT_CACHE_TTL:
+                TranscriptService._entries.move_to_end(student_id)
+                return transcript
+
+        transcript = Transcript.load(student_id, stamp)
+        with TranscriptService._lock:
+            TranscriptService._entries[student_id] = transcript
+            TranscriptService._entries.move_to_end(student_id)
+            while len(TranscriptService._entries) > TRANSCRIPT_CACHE_SIZE:
+                TranscriptService._entries.popitem(last=False)
+        return transcript
+
+    @staticmethod
+    def invalidate(student_id=None):
+        """使指定学生（或全部）的成绩单缓存失效"""
+        with TranscriptService._lock:
+            if student_id is None:
+                TranscriptService._entries.clear()
+            else:
+                TranscriptService._entries.pop(student_id, None)
+
+    @staticmethod
+    def get_scores(student_id, academic_year=None, semester=None):
+        """
+        按学年/学期查询成绩、学分与加权平均分
+
+        Args:
+            student_id: 学生ID
+            academic_year: 学年（可选）
+            semester: 学期 0/1（可选）
+
+        Returns:
+            dict: 总学分、加权平均分、分学期成绩与全部成绩
+        """
+        terms = [
+            term for term in TranscriptService.get(student_id).select(academic_year, semester)
+            if term['scored_courses']
+        ]
+        totals = _sum_terms(terms)
+
+        semesters = [{
+            'academic_year': term['academic_year'],
+            'semester': term['semester'],
+            'courses': term['courses'],
+            'semester_credits': term['earned_credits'],
+            'semester_gpa': _weighted(term['passed_score_credit_sum'], term['earned_credits'])
+        } for term in terms]
+
+        return {
+            'total_credits': totals['earned_credits'],
+            'overall_gpa': _weighted(totals['passed_score_credit_sum'], totals['earned_credits']),
+            'semesters': semesters,
+            'all_scores': [course for term in terms for course in term['courses']]
+        }
+
+    @staticmethod
+    def get_statistics(student_id):
+        """
+        学生选课与成绩统计
+
+        Args:
+            student_id: 学生ID
+
+        Returns:
+            dict: 学生课程统计数据
+        """
+        totals = _sum_terms(TranscriptService.get(student_id).terms)
+        enrolled_courses, enrolled_credits = CreditLedgerService.enrolled_totals(student_id)
+        return {
+            'total_enrollments': enrolled_courses,
+            'total_credits': enrolled_credits,
+            'scored_courses': totals['scored_courses'],
+            'unscored_courses': enrolled_courses - totals['scored_courses'],
+            'scored_credits': totals['scored_credits'],
+            'avg_score': _weighted(totals['score_credit_sum'], totals['scored_credits']),
+            'grade_distribution': {
+                'excellent': totals['grade_excellent'],  # 90-100
+                'good': totals['grade_good'],            # 80-89
+                'fair': totals['grade_fair'],            # 70-79
+                'pass': totals['grade_pass'],            # 60-69
+                'fail': totals['grade_fail']             # <60
+            }
+        }
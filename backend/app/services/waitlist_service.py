@@ -0,0 +1,289 @@
+"""
+候补名单服务
+课程满员后学生可加入该开课的候补队列（按加入顺序先进先出），不必反复调用选课接口；
+有学生退课时，在同一事务内把空出的名额直接转给队首第一个仍然符合条件的学生
+（重新检查重复课程、时间冲突与先修要求），名额不释放，其他请求无法抢占。
+候补状态查询以共享存储中的版本号作为 ETag，队列没有变化时不访问数据库
+"""
+import hashlib
+from datetime import datetime
+
+from flask import has_app_context
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, aliased
+from app import db
+from app.models import Course, CourseOffering, Enrollment, Student, WaitlistEntry
+from .exceptions import (
+    ServiceError, AlreadyEnrolledError, CourseNotFoundError, StudentNotFoundError
+)
+from .ledger_service import PASSING_SCORE
+from .lottery_service import LotteryService
+from .prerequisite_service import PrerequisiteCache
+from .seat_counter_service import SeatCounter
+from .shared_store import get_store, store_nonce
+from .timetable_service import TimetableCache
+
+WAITLIST_OFFERING_PREFIX = 'waitlist:offering:'
+WAITLIST_STUDENT_PREFIX = 'waitlist:student:'
+WAITLIST_STUDENT_VERSION_PREFIX = 'waitlist:student-version:'
+
+STATUS_WAITING = '等待中'
+STATUS_PROMOTED = '已递补'
+STATUS_EXPIRED = '已失效'
+
+# 每个学生同时候补的开课数上限
+MAX_WAITLISTS_PER_STUDENT = 10
+
+# 一次退课最多检查的候补人数（其余留给下一次退课）
+MAX_PROMOTION_SCAN = 20
+
+
+def _changes(session):
+    return session.info.setdefault('waitlist_changes', (set(), set()))
+
+
+def _mark_changed(offering_id, student_id):
+    offerings, students = _changes(db.session)
+    offerings.add(offering_id)
+    students.add(student_id)
+
+
+def _ineligible_reason(student_id, offering):
+    """候补学生递补前的资格复查，返回不符合条件的原因"""
+    enrolled = db.session.query(Enrollment.offering_id).join(
+        CourseOffering, Enrollment.offering_id == CourseOffering.offering_id
+    ).filter(
+        Enrollment.student_id == student_id,
+        CourseOffering.course_id == offering.course_id
+    ).first()
+    if enrolled:
+        return '已选此课程的其他班级' if enrolled[0] != offering.offering_id else '已选过这门课'
+
+    conflict = TimetableCache.get(student_id).find_conflict(
+        offering.day_of_week, offering.start_time, offering.end_time
+    )
+    if conflict:
+        return f'与课程《{conflict}》时间冲突'
+
+    graph = PrerequisiteCache.get()
+    if graph.direct(offering.course_id):
+        passed = {row[0] for row in db.session.query(CourseOffering.course_id).join(
+            Enrollment, Enrollment.offering_id == CourseOffering.offering_id
+        ).filter(Enrollment.student_id == student_id, Enrollment.score >= PASSING_SCORE).all()}
+        missing = graph.missing(offering.course_id, passed)
+        if missing:
+            return f"先修课程《{graph.course_names.get(missing[0], missing[0])}》未完成"
+    return None
+
+
+class WaitlistService:
+    """候补名单服务类"""
+
+    @staticmethod
+    def join(student_id, offering_id):
+        """
+        加入开课的候补队列
+
+        Args:
+            student_id: 学生ID
+            offering_id: 开课ID
+
+        Returns:
+            dict: 加入结果与当前排位
+
+        Raises:
+            StudentNotFoundError: 学生不存在
+            CourseNotFoundError: 开课不存在
+            AlreadyEnrolledError: 已选课或已在候补队列中
+            ServiceError: 课程未满、不符合选课条件或候补数已达上限
+        """
+        if not db.session.get(Student, student_id):
+            raise StudentNotFoundError()
+        offering = db.session.get(CourseOffering, offering_id)
+        if not offering:
+            raise CourseNotFoundError("开课不存在")
+        LotteryService.check_enrollment_open(offering)
+        if SeatCounter.get(offering_id) < offering.max_students:
+            raise ServiceError("课程尚有名额，请直接选课")
+
+        reason = _ineligible_reason(student_id, offering)
+        if reason:
+            raise ServiceError(f"不符合选课条件：{reason}")
+
+        entries = WaitlistEntry.query.filter_by(student_id=student_id).all()
+        if any(entry.offering_id == offering_id and entry.status == STATUS_WAITING for entry in entries):
+            raise AlreadyEnrolledError("已在候补队列中")
+        if sum(1 for entry in entries if entry.status == STATUS_WAITING) >= MAX_WAITLISTS_PER_STUDENT:
+            raise ServiceError(f"最多同时候补 {MAX_WAITLISTS_PER_STUDENT} 门课程")
+
+        # 重新加入时排到队尾：删除旧记录后新建
+        WaitlistEntry.query.filter_by(student_id=student_id, offering_id=offering_id)\
+            .delete(synchronize_session=False)
+        entry = WaitlistEntry(offering_id=offering_id, student_id=student_id, status=STATUS_WAITING)
+        db.session.add(entry)
+        db.session.flush()
+        position = WaitlistService._position(offering_id, entry.entry_id)
+        _mark_changed(offering_id, student_id)
+        db.session.commit()
+        return {
+            'message': '已加入候补队列',
+            'offering_id': offering_id,
+            'position': position
+        }
+
+    @staticmethod
+    def leave(student_id, offering_id):
+        """
+        退出候补队列
+
+        Raises:
+            CourseNotFoundError: 不在该开课的候补队列中
+        """
+        deleted = WaitlistEntry.query.filter_by(
+            student_id=student_id, offering_id=offering_id, status=STATUS_WAITING
+        ).delete(synchronize_session=False)
+        if not deleted:
+            raise CourseNotFoundError("不在该课程的候补队列中")
+        _mark_changed(offering_id, student_id)
+        db.session.commit()
+        return {'message': '已退出候补队列'}
+
+    @staticmethod
+    def _position(offering_id, entry_id):
+        """队列中的排位（从 1 开始）"""
+        return db.session.query(func.count(WaitlistEntry.entry_id)).filter(
+            WaitlistEntry.offering_id == offering_id,
+            WaitlistEntry.status == STATUS_WAITING,
+            WaitlistEntry.entry_id <= entry_id
+        ).scalar()
+
+    @staticmethod
+    def promote(offering):
+        """
+        在退课事务内为空出的名额递补队首学生（不提交）
+
+        调用前退课记录已删除；按加入顺序检查候补学生，不符合条件的标记为失效，
+        第一个符合条件的学生直接写入选课记录，名额由退课学生转给该学生。
+
+        Args:
+            offering: 开课对象
+
+        Returns:
+            str: 递补的学生ID；没有可递补的学生时返回 None
+        """
+        candidates = WaitlistEntry.query.filter_by(offering_id=offering.offering_id, status=STATUS_WAITING)\
+            .order_by(WaitlistEntry.entry_id).limit(MAX_PROMOTION_SCAN).all()
+        if not candidates:
+            return None
+        for entry in candidates:
+            _mark_changed(offering.offering_id, entry.student_id)
+            reason = _ineligible_reason(entry.student_id, offering)
+            status = STATUS_EXPIRED if reason else STATUS_PROMOTED
+            # 条件更新：并发的两次退课不会递补同一个候补学生
+            claimed = WaitlistEntry.query.filter_by(entry_id=entry.entry_id, status=STATUS_WAITING).update(
+                {'status': status, 'note': reason, 'updated_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            if not claimed or reason:
+                continue
+            db.session.add(Enrollment(
+                offering_id=offering.offering_id,
+                student_id=entry.student_id,
+                enrollment_date=datetime.utcnow()
+            ))
+            db.session.flush()
+            return entry.student_id
+        return None
+
+    @staticmethod
+    def stamp(student_id):
+        """
+        学生候补状态的版本标识（只读共享存储）
+
+        由共享存储实例标识、学生的候补开课列表（在 status 中缓存）与这些开课的队列版本号组成。
+
+        Returns:
+            str: ETag；缓存的候补列表不存在或已过期时返回 None
+        """
+        store = get_store()
+        list_key = WAITLIST_STUDENT_PREFIX + student_id
+        version_key = WAITLIST_STUDENT_VERSION_PREFIX + student_id
+        values = store.get_many([list_key, version_key])
+        cached = values.get(list_key)
+        if cached is None or cached[0] != values.get(version_key, 0):
+            return None
+        offering_ids = cached[1]
+        versions = store.get_many(WAITLIST_OFFERING_PREFIX + offering_id for offering_id in offering_ids)
+        raw = '|'.join(f"{offering_id}:{versions.get(WAITLIST_OFFERING_PREFIX + offering_id, 0)}"
+                       for offering_id in offering_ids)
+        return hashlib.sha1(f"{store_nonce()}|{student_id}|{cached[0]}|{raw}".encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def reset():
+        """丢弃共享存储中的全部候补版本信息（数据库重建后调用）"""
+        get_store().delete_prefix('waitlist:')
+
+    @staticmethod
+    def status(student_id):
+        """
+        学生的候补状态：每个候补开课的排位、队列长度与递补/失效结果
+
+        Returns:
+            list: 候补记录列表
+        """
+        store = get_store()
+        # 先读版本号再查询：查询期间若有变化，缓存的列表版本落后，stamp 会判定过期
+        version = store.get(WAITLIST_STUDENT_VERSION_PREFIX + student_id, 0)
+        ahead = aliased(WaitlistEntry)
+        position = db.session.query(func.count(ahead.entry_id)).filter(
+            ahead.offering_id == WaitlistEntry.offering_id,
+            ahead.status == STATUS_WAITING,
+            ahead.entry_id <= WaitlistEntry.entry_id
+        ).correlate(WaitlistEntry).scalar_subquery()
+        rows = db.session.query(
+            WaitlistEntry.offering_id, WaitlistEntry.status, WaitlistEntry.note, WaitlistEntry.joined_at,
+            WaitlistEntry.updated_at, Course.course_name, position.label('position')
+        ).join(CourseOffering, WaitlistEntry.offering_id == CourseOffering.offering_id)\
+         .join(Course, CourseOffering.course_id == Course.course_id)\
+         .filter(WaitlistEntry.student_id == student_id)\
+         .order_by(WaitlistEntry.entry_id).all()
+
+        store.set(WAITLIST_STUDENT_PREFIX + student_id, [version, sorted({row.offering_id for row in rows})])
+        return [{
+            'offering_id': row.offering_id,
+            'course_name': row.course_name,
+            'status': row.status,
+            'position': row.position if row.status == STATUS_WAITING else None,
+            'note': row.note,
+            'joined_at': row.joined_at.isoformat() if row.joined_at else None,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
+        } for row in rows]
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_waitlist_changes(session, flush_context):
+    # 删除开课或学生时级联删除的候补记录
+    for obj in session.deleted:
+        if isinstance(obj, WaitlistEntry):
+            offerings, students = _changes(session)
+            offerings.add(obj.offering_id)
+            students.add(obj.student_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_waitlist_changes(session):
+    # 队列变化后递增开课版本号（所有排队学生的排位都可能变化）与相关学生的版本号
+    changes = session.info.pop('waitlist_changes', None)
+    if not changes or not has_app_context():
+        return
+    offerings, students = changes
+    store = get_store()
+    for offering_id in offerings:
+        store.incr(WAITLIST_OFFERING_PREFIX + offering_id)
+    for student_id in students:
+        store.incr(WAITLIST_STUDENT_VERSION_PREFIX + student_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_waitlist_changes(session):
+    session.info.pop('waitlist_changes', None)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+选课准入控制基准
+一批学生对满员课程持续重试选课（重试风暴），同时另一批学生正常选一门有名额的课程。
+分别在关闭/开启限流与写并发上限时运行，比较：进入选课逻辑的请求数、被 429 拒绝的请求数、
+正常选课请求的延迟，并检查 429 响应都带有 Retry-After
+
+用法: python benchmarks/admission.py --stormers 32 --duration 5
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from flask_jwt_extended import create_access_token
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.routes.admission import get_admission
+from app.services.student_service import StudentService
+
+FULL_OFFERING = '2024-1-A0001-T0001'
+OPEN_OFFERING = '2024-1-A0002-T0001'
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def run_once(stormers, duration, limited):
+    config = {'RATE_LIMIT_RATE': 2, 'RATE_LIMIT_BURST': 5, 'WRITE_CONCURRENCY': 4,
+              'WRITE_QUEUE_SIZE': 16, 'WRITE_QUEUE_TIMEOUT': 0.5}
+    if not limited:
+        config.update(RATE_LIMIT_RATE=0, WRITE_CONCURRENCY=0)
+    app, _ = create_bench_app(**config)
+    with app.app_context():
+        student_ids = seed_students(stormers + 200)
+        seed_offering(FULL_OFFERING, 'A0001', max_students=1, day_of_week=1, start=(8, 0), end=(9, 50))
+        seed_offering(OPEN_OFFERING, 'A0002', max_students=1000, day_of_week=2, start=(8, 0), end=(9, 50))
+        db.session.commit()
+        StudentService.enroll_in_course(student_ids[-1], FULL_OFFERING)
+        tokens = [create_access_token(identity=student_id, additional_claims={'type': 'student'})
+                  for student_id in student_ids[:-1]]
+    storm_tokens, normal_tokens = tokens[:stormers], tokens[stormers:]
+
+    stop = threading.Event()
+    statuses = Counter()
+    missing_retry_after = Counter()
+    lock = threading.Lock()
+
+    def storm(token):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        local = Counter()
+        missing = 0
+        while not stop.is_set():
+            response = client.post(f'/api/student/courses/{FULL_OFFERING}/enroll', headers=headers)
+            local[response.status_code] += 1
+            if response.status_code == 429 and 'Retry-After' not in response.headers:
+                missing += 1
+        with lock:
+            statuses.update(local)
+            missing_retry_after['storm'] += missing
+
+    latencies = []
+    normal_statuses = Counter()
+
+    def normal():
+        client = app.test_client()
+        interval = duration / len(normal_tokens)
+        for token in normal_tokens:
+            if stop.is_set():
+                break
+            started = time.perf_counter()
+            response = client.post(f'/api/student/courses/{OPEN_OFFERING}/enroll',
+                                   headers={'Authorization': f'Bearer {token}'})
+            latencies.append((time.perf_counter() - started) * 1000)
+            normal_statuses[response.status_code] += 1
+            time.sleep(interval)
+
+    threads = [threading.Thread(target=storm, args=(token,)) for token in storm_tokens]
+    threads.append(threading.Thread(target=normal))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        stats = get_admission().stats()
+    label = '开启准入控制' if limited else '关闭准入控制'
+    total = sum(statuses.values())
+    print(f"[{label}] 风暴请求 {total} 次（{total / duration:.0f}/s）：{dict(statuses)}")
+    print(f"  正常选课 {len(latencies)} 次 {dict(normal_statuses)}：p50 {percentile(latencies, 0.5):.1f} ms，"
+          f"p99 {percentile(latencies, 0.99):.1f} ms")
+    if limited:
+        print(f"  计数: {stats['buckets']}")
+        assert not missing_retry_after['storm'], "429 响应缺少 Retry-After"
+    return statuses, latencies
+
+
+def run(stormers, duration):
+    open_statuses, _ = run_once(stormers, duration, limited=False)
+    limited_statuses, _ = run_once(stormers, duration, limited=True)
+    reached = sum(count for status, count in limited_statuses.items() if status != 429)
+    print(f"开启后进入选课逻辑的风暴请求 {reached} 次，关闭时 {sum(open_statuses.values())} 次")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='选课准入控制基准')
+    parser.add_argument('--stormers', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+    run(args.stormers, args.duration)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+统一鉴权基准
+1. 被拒绝的请求（缺少令牌、签名无效、已吊销、角色不符）的延迟，以及期间的数据库连接借出次数与 SQL 语句数（应为 0）
+2. 放行请求的鉴权开销：原实现（jwt_required + 角色装饰器内再次 get_jwt()）与统一鉴权装饰器对比
+3. /api/admin/authz 中的按接口计数
+
+用法: python benchmarks/authz.py --requests 2000
+"""
+import argparse
+import time
+from collections import Counter
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required
+from sqlalchemy import event
+
+from common import create_bench_app, seed_students
+from app import db
+from app.routes.authz import AuthzStats, student_required
+from app.services.revocation_service import TokenRevocation, issued_at_ms
+
+
+def legacy_student_required(f):
+    """原实现的学生权限装饰器（仅用于对比）"""
+    def decorated_function(*args, **kwargs):
+        try:
+            claims = get_jwt()
+            if claims.get('type') != 'student':
+                return jsonify({'message': '需要学生权限'}), 403
+            return f(*args, **kwargs)
+        except Exception:
+            return jsonify({'message': '身份验证失败'}), 401
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+
+def bench_blueprint():
+    bp = Blueprint('bench', __name__)
+
+    @bp.route('/legacy')
+    @jwt_required()
+    @legacy_student_required
+    def legacy():
+        return jsonify({}), 200
+
+    @bp.route('/unified')
+    @student_required
+    def unified():
+        return jsonify({}), 200
+
+    return bp
+
+
+def measure(client, path, headers, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        status = client.get(path, headers=headers).status_code
+    return status, (time.perf_counter() - started) * 1e6 / requests
+
+
+def run(requests):
+    app, _ = create_bench_app()
+    app.register_blueprint(bench_blueprint(), url_prefix='/bench')
+    with app.app_context():
+        student_ids = seed_students(2)
+        tokens = [create_access_token(identity=student_id, additional_claims={
+            'type': 'student', 'ver': 0, 'iat_ms': issued_at_ms()
+        }) for student_id in student_ids]
+        teacher = create_access_token(identity='T0001', additional_claims={'type': 'teacher'})
+        # 吊销第二个学生的全部令牌
+        time.sleep(0.01)
+        TokenRevocation.revoke_principal('student', student_ids[1])
+        db.session.commit()
+        engine = db.engine
+
+    counts = Counter()
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        counts['checkout'] += 1
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counts['sql'] += 1
+
+    client = app.test_client()
+    # 预热：加载吊销记录
+    client.get('/api/student/profile', headers={'Authorization': f'Bearer {tokens[0]}'})
+
+    cases = (
+        ('缺少令牌', {}),
+        ('签名无效', {'Authorization': f'Bearer {tokens[0][:-4]}AAAA'}),
+        ('令牌已吊销', {'Authorization': f'Bearer {tokens[1]}'}),
+        ('角色不符', {'Authorization': f'Bearer {teacher}'}),
+    )
+    for label, headers in cases:
+        counts.clear()
+        status, latency = measure(client, '/api/student/profile', headers, requests)
+        print(f"[{label}] {status}，{latency:.0f} µs/次；数据库连接借出 {counts['checkout']} 次，SQL {counts['sql']} 条")
+        assert counts['checkout'] == 0 and counts['sql'] == 0
+
+    headers = {'Authorization': f'Bearer {tokens[0]}'}
+    for path in ('/bench/legacy', '/bench/unified', '/bench/legacy', '/bench/unified'):
+        status, latency = measure(client, path, headers, requests)
+        assert status == 200
+    legacy = measure(client, '/bench/legacy', headers, requests)[1]
+    unified = measure(client, '/bench/unified', headers, requests)[1]
+    print(f"放行请求（空视图）：原实现 {legacy:.0f} µs/次，统一鉴权 {unified:.0f} µs/次")
+
+    stats = AuthzStats.snapshot()['routes']
+    print(f"按接口计数: student.get_profile={stats['student.get_profile']}，bench.unified={stats['bench.unified']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='统一鉴权基准')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+排课占用检查基准
+1. 学期内已有一万门开课时，对比区间索引与等价的 SQL 重叠查询的单次检查耗时，并校验两者结论一致
+2. 多个教师并发在同一教室、相互重叠的时间段建课，验证最终没有任何教室或教师重复占用
+
+用法: python benchmarks/booking_guard.py --offerings 10000 --queries 2000 --teachers 64 [--shared-store]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dtime
+
+from sqlalchemy import insert
+
+from common import create_bench_app, PLACEHOLDER_PASSWORD
+from app import db
+from app.models import Course, CourseOffering, Teacher
+from app.services.booking_service import BookingGuard
+from app.services.conflict_service import ConflictAnalysisService
+from app.services.exceptions import ServiceError
+from app.services.teacher_service import TeacherService
+
+ROOMS = 400
+TEACHERS = 800
+DAYS = 5
+
+
+def seed(count, teachers, rng):
+    db.session.execute(insert(Teacher), [{
+        'teacher_id': f'T{i:04d}', 'name': '压测', 'gender': '男', 'age': 40,
+        'title': '讲师', 'phone': '0', 'password': PLACEHOLDER_PASSWORD
+    } for i in range(max(TEACHERS, teachers))])
+    db.session.execute(insert(Course), [{
+        'course_id': f'C{i:04d}', 'course_name': f'课程{i}', 'hours': 48, 'exam_type': True, 'credits': 3.0
+    } for i in range(count + 1)])
+
+    # 每个 (教室, 星期) 的时间段依次排开，互不重叠
+    offerings = []
+    cursor = {}
+    for i in range(count):
+        room, day = rng.randrange(ROOMS), rng.randint(1, DAYS)
+        start = cursor.get((room, day), 8 * 60) + rng.choice((0, 10))
+        end = start + rng.choice((50, 100))
+        if end > 22 * 60:
+            continue
+        cursor[(room, day)] = end
+        offerings.append({
+            'offering_id': f'2024-1-C{i:04d}-X', 'course_id': f'C{i:04d}',
+            'teacher_id': f'T{rng.randrange(TEACHERS):04d}', 'academic_year': '2024', 'semester': True,
+            'max_students': 50, 'current_students': 0, 'status': '开放选课', 'day_of_week': day,
+            'start_time': dtime(start // 60, start % 60), 'end_time': dtime(end // 60, end % 60),
+            'location': f'R{room:03d}'
+        })
+    for i in range(0, len(offerings), 5000):
+        db.session.execute(insert(CourseOffering), offerings[i:i + 5000])
+    db.session.commit()
+    return len(offerings)
+
+
+def sql_overlap(teacher_id, day, start, end, location):
+    """等价的 SQL 重叠查询：同教室或同教师、同一天、时间段相交"""
+    return db.session.query(CourseOffering.offering_id).filter(
+        CourseOffering.academic_year == '2024',
+        CourseOffering.semester.is_(True),
+        CourseOffering.day_of_week == day,
+        CourseOffering.start_time < end,
+        CourseOffering.end_time > start,
+        (CourseOffering.location == location) | (CourseOffering.teacher_id == teacher_id)
+    ).first()
+
+
+def lookup_benchmark(queries, rng):
+    probes = []
+    for _ in range(queries):
+        start = rng.randint(8 * 60, 20 * 60)
+        probes.append((
+            f'T{rng.randrange(TEACHERS):04d}', rng.randint(1, DAYS),
+            dtime(start // 60, start % 60), dtime((start + 50) // 60, (start + 50) % 60),
+            f'R{rng.randrange(ROOMS):03d}'
+        ))
+
+    started = time.perf_counter()
+    bookings = BookingGuard.get('2024', 1)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    index_results = [bookings.find_conflict(*probe) for probe in probes]
+    index_us = (time.perf_counter() - started) * 1e6 / queries
+
+    started = time.perf_counter()
+    sql_results = [sql_overlap(*probe) for probe in probes]
+    sql_us = (time.perf_counter() - started) * 1e6 / queries
+
+    mismatches = sum(1 for a, b in zip(index_results, sql_results) if bool(a) != bool(b))
+    print(f"索引构建: {load_ms:.1f} ms")
+    print(f"单次检查: 区间索引 {index_us:.1f} µs，SQL 查询 {sql_us:.1f} µs")
+    print(f"冲突检出: {sum(1 for r in index_results if r)}/{queries}，与 SQL 结论不一致: {mismatches}")
+    assert mismatches == 0, "区间索引与 SQL 查询结论不一致"
+
+
+def concurrency_benchmark(app, teachers, workers):
+    """多个教师同时在教室 HOT 的周六上午建课，开始时间在 08:00-09:40 之间随机错开"""
+    rng = random.Random(7)
+    requests = []
+    for i in range(teachers):
+        start = 8 * 60 + rng.randrange(0, 100, 10)
+        requests.append((f'T{i:04d}', {
+            'course_id': f'C{i:04d}',
+            'academic_year': '2024', 'semester': 1, 'max_students': 30, 'day_of_week': 6,
+            'start_time': f'{start // 60:02d}:{start % 60:02d}',
+            'end_time': f'{(start + 50) // 60:02d}:{(start + 50) % 60:02d}',
+            'location': 'HOT'
+        }))
+
+    def create(item):
+        teacher_id, data = item
+        with app.app_context():
+            try:
+                TeacherService.create_course_offering(teacher_id, data)
+                return 'created'
+            except ServiceError as e:
+                db.session.rollback()
+                return type(e).__name__
+            except Exception as e:
+                db.session.rollback()
+                return f'error: {e}'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = Counter(pool.map(create, requests))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        report = ConflictAnalysisService.analyze('2024', 1)
+        hot = [c for c in report['room_conflicts']['conflicts'] if c['location'] == 'HOT']
+    print(f"并发建课: {teachers} 个请求，{workers} 线程，耗时 {elapsed:.2f}s")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}")
+    print(f"教室 HOT 重复占用: {len(hot)} 组；全学期教师重复排课: "
+          f"{report['teacher_conflicts']['overlapping_pairs']} 对")
+    assert not hot, "教室被重复占用"
+    assert outcomes['created'] >= 1
+
+
+def run(offerings, queries, teachers, workers, shared_store):
+    config = {}
+    if shared_store:
+        config['SHARED_STORE'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'shared_state.db')
+    app, _ = create_bench_app(**config)
+    rng = random.Random(42)
+    with app.app_context():
+        created = seed(offerings, teachers, rng)
+        print(f"学期开课数: {created}  共享存储: {app.config['SHARED_STORE']}")
+        lookup_benchmark(queries, rng)
+        db.session.remove()
+    concurrency_benchmark(app, teachers, workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='排课占用检查基准')
+    parser.add_argument('--offerings', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--teachers', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--shared-store', action='store_true', help='排课锁与版本号使用 SQLite 共享存储')
+    args = parser.parse_args()
+    run(args.offerings, args.queries, args.teachers, args.workers, args.shared_store)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+班级排名基准
+构造一个年级（默认 2000 名学生、两个专业共 40 个班、每人 10 门已出成绩的课程），
+对比原"聚合查询 + 全量学生查询 + Python 排序"的实现与排名服务的窗口函数、
+按列计算两种方式，以及命中缓存时的耗时；同时校验两种方式的排名结果一致
+
+用法: python benchmarks/class_ranking.py --students 2000 --rounds 20
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import func, insert
+
+from common import create_bench_app, seed_offering, PLACEHOLDER_PASSWORD
+from app import db
+from app.models import Class, Enrollment, Student
+from app.services import ranking_service
+from app.services.ranking_service import RankingService, TIE_COMPETITION, TIE_DENSE
+
+COURSES_PER_STUDENT = 10
+CLASS_SIZE = 50
+
+
+def legacy_ranking(class_id):
+    """原实现：聚合查询后再查全部学生，在 Python 中合并、排序并编号"""
+    class_info = Class.query.filter_by(class_id=class_id).first()
+    students_with_avg = db.session.query(
+        Student,
+        func.avg(Enrollment.score).label('avg_score'),
+        func.count(Enrollment.score).label('course_count')
+    ).outerjoin(Enrollment).filter(
+        Student.class_id == class_id,
+        Enrollment.score.isnot(None)
+    ).group_by(Student.student_id).all()
+    all_students = Student.query.filter_by(class_id=class_id).all()
+    student_scores = {s.student_id: {'avg_score': avg or 0, 'course_count': count or 0}
+                      for s, avg, count in students_with_avg}
+    result = []
+    for student in all_students:
+        score_info = student_scores.get(student.student_id, {'avg_score': 0, 'course_count': 0})
+        result.append({
+            'student_id': student.student_id,
+            'avg_score': round(score_info['avg_score'], 2) if score_info['avg_score'] else 0,
+        })
+    result.sort(key=lambda x: x['avg_score'], reverse=True)
+    for i, student in enumerate(result):
+        student['rank'] = i + 1
+    return {'class_name': class_info.class_name, 'students': result}
+
+
+def seed_cohort(student_count, rng):
+    """按班级、专业批量写入学生与成绩"""
+    class_ids = []
+    for i in range(0, student_count, CLASS_SIZE):
+        major = 'CS' if (i // CLASS_SIZE) % 2 == 0 else 'SE'
+        class_id = f'{major}{i // CLASS_SIZE // 2 + 1:02d}'
+        db.session.add(Class(class_id=class_id, class_name=f'压测{class_id}班'))
+        class_ids.append(class_id)
+    offering_ids = []
+    for i in range(COURSES_PER_STUDENT):
+        offering_ids.append(seed_offering(f'2024-1-R{i:03d}-T', f'R{i:03d}', max_students=student_count).offering_id)
+    db.session.commit()
+
+    students = []
+    enrollments = []
+    for i in range(student_count):
+        student_id = f'2023{i:08d}'
+        students.append({
+            'student_id': student_id, 'name': '压测', 'gender': '男', 'age': 20, 'hometown': '北京',
+            'class_id': class_ids[i // CLASS_SIZE], 'password': PLACEHOLDER_PASSWORD, 'total_credits': 0
+        })
+        for offering_id in offering_ids:
+            # 成绩取整数，保证出现大量并列
+            enrollments.append({'student_id': student_id, 'offering_id': offering_id, 'score': rng.randint(50, 100)})
+    db.session.execute(insert(Student), students)
+    db.session.execute(insert(Enrollment), enrollments)
+    db.session.commit()
+    return class_ids
+
+
+def timed(func, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = func()
+        db.session.remove()
+    return (time.perf_counter() - started) * 1000 / rounds, result
+
+
+def run(student_count, rounds):
+    app, _ = create_bench_app()
+    rng = random.Random(42)
+    with app.app_context():
+        class_ids = seed_cohort(student_count, rng)
+        class_id = class_ids[0]
+
+        legacy_ms, _ = timed(lambda: legacy_ranking(class_id), rounds)
+
+        results = {}
+        timings = {}
+        for engine in ('sql', 'columnar'):
+            app.config['RANKING_ENGINE'] = engine
+            timings[engine], _ = timed(lambda: RankingService._load(class_id), rounds)
+            results[engine] = {
+                tie: RankingService._load(class_id).to_dict(tie) for tie in (TIE_COMPETITION, TIE_DENSE)
+            }
+        assert results['sql'] == results['columnar'], '窗口函数与按列计算的排名结果不一致'
+
+        RankingService.get_class_ranking(class_id)
+        cached_ms, _ = timed(lambda: RankingService.get_class_ranking(class_id), rounds)
+
+        numpy_state = '已安装' if ranking_service.np is not None else '未安装'
+        print(f"年级人数 {student_count}，班级 {len(class_ids)} 个，每人 {COURSES_PER_STUDENT} 门成绩，NumPy {numpy_state}")
+        print(f"{'方式':<14} {'单次耗时(ms)':>12}")
+        print(f"{'原实现(仅班级)':<14} {legacy_ms:>12.1f}")
+        print(f"{'窗口函数':<14} {timings['sql']:>12.1f}")
+        print(f"{'按列计算':<14} {timings['columnar']:>12.1f}")
+        print(f"{'命中缓存':<14} {cached_ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='班级排名基准')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    run(args.students, args.rounds)
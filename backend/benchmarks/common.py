@@ -0,0 +1,75 @@
+"""
+压测脚本公共工具
+在临时 SQLite 文件上创建独立的应用实例，避免污染开发数据库
+"""
+import os
+import sys
+import tempfile
+from datetime import time as dtime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Class, Course, Teacher, Student, CourseOffering
+
+# 压测数据不需要真实密码，直接写入占位哈希以跳过 bcrypt
+PLACEHOLDER_PASSWORD = 'bench'
+
+
+def create_bench_app(**config):
+    """
+    创建使用临时数据库的应用实例并建表
+
+    Returns:
+        tuple: (app, 数据库文件路径)
+    """
+    db_dir = tempfile.mkdtemp(prefix='cs_bench_')
+    db_path = os.path.join(db_dir, 'bench.db')
+    settings = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'}
+    settings.update(config)
+    app = create_app(settings)
+    with app.app_context():
+        db.create_all()
+    return app, db_path
+
+
+def seed_students(count, class_id='B001', prefix='S'):
+    """批量创建压测学生（需在应用上下文中调用）"""
+    if not db.session.get(Class, class_id):
+        db.session.add(Class(class_id=class_id, class_name='压测班级'))
+    students = [
+        Student(
+            student_id=f'{prefix}{i:09d}', name='压测', gender='男', age=20,
+            hometown='北京', class_id=class_id, password=PLACEHOLDER_PASSWORD
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(students)
+    db.session.commit()
+    return [s.student_id for s in students]
+
+
+def seed_offering(offering_id, course_id, teacher_id='T0001', max_students=50,
+                  day_of_week=None, start=None, end=None, location=None,
+                  academic_year='2024', semester=True, credits=3.0):
+    """创建一门开课及其依赖的课程、教师（需在应用上下文中调用）"""
+    if not db.session.get(Teacher, teacher_id):
+        db.session.add(Teacher(
+            teacher_id=teacher_id, name='压测教师', gender='男', age=40,
+            title='讲师', phone='0', password=PLACEHOLDER_PASSWORD
+        ))
+    if not db.session.get(Course, course_id):
+        db.session.add(Course(
+            course_id=course_id, course_name=f'课程{course_id}', hours=48,
+            exam_type=True, credits=credits
+        ))
+    offering = CourseOffering(
+        offering_id=offering_id, course_id=course_id, teacher_id=teacher_id,
+        academic_year=academic_year, semester=semester, max_students=max_students,
+        current_students=0, day_of_week=day_of_week,
+        start_time=dtime(*start) if start else None,
+        end_time=dtime(*end) if end else None,
+        location=location
+    )
+    db.session.add(offering)
+    return offering
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+排课冲突分析基准
+生成一万门随机开课（5 天、部分重叠的时间段、200 间教室、500 名教师），
+测量扫描线分析的耗时，并用两两比较的暴力算法校验重叠对数；
+原"相同时间字符串分组 + 逐个查询课程/教师"的实现输出随组大小平方增长，只在较小规模上对比
+
+用法: python benchmarks/conflict_analysis.py --offerings 10000 --legacy-max 1000
+"""
+import argparse
+import random
+import time
+from datetime import time as dtime
+
+from sqlalchemy import insert
+
+from common import create_bench_app, PLACEHOLDER_PASSWORD
+from app import db
+from app.models import Course, CourseOffering, Teacher
+from app.services.conflict_service import ConflictAnalysisService
+
+ROOMS = 200
+TEACHERS = 500
+COURSES = 1000
+
+
+def legacy_conflict_analysis():
+    """原实现：仅识别开始、结束时间完全相同的开课，每组每次都重新查询课程与教师"""
+    offerings = db.session.query(CourseOffering).filter(
+        CourseOffering.day_of_week.isnot(None),
+        CourseOffering.start_time.isnot(None),
+        CourseOffering.end_time.isnot(None)
+    ).all()
+    time_slots = {}
+    conflicts = []
+    for offering in offerings:
+        time_key = f"{offering.day_of_week}_{offering.start_time}_{offering.end_time}"
+        time_slots.setdefault(time_key, []).append(offering)
+        if len(time_slots[time_key]) > 1:
+            courses = []
+            for conflicted in time_slots[time_key]:
+                course = db.session.get(Course, conflicted.course_id)
+                teacher = db.session.get(Teacher, conflicted.teacher_id)
+                courses.append({
+                    'offering_id': conflicted.offering_id,
+                    'course_name': course.course_name if course else '未知',
+                    'teacher_name': teacher.name if teacher else '未知'
+                })
+            conflicts.append({'time_key': time_key, 'courses': courses})
+    return {'total_scheduled_courses': len(offerings), 'conflict_count': len(conflicts)}
+
+
+def brute_force_pairs(rows, key):
+    """两两比较统计重叠对数（校验用）"""
+    buckets = {}
+    for row in rows:
+        group = key(row)
+        if group is not None:
+            buckets.setdefault((row.day_of_week, group), []).append(row)
+    pairs = 0
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if a.start_time < b.end_time and b.start_time < a.end_time:
+                    pairs += 1
+    return pairs
+
+
+def seed(count, rng):
+    db.session.execute(insert(Teacher), [{
+        'teacher_id': f'T{i:04d}', 'name': '压测', 'gender': '男', 'age': 40,
+        'title': '讲师', 'phone': '0', 'password': PLACEHOLDER_PASSWORD
+    } for i in range(TEACHERS)])
+    db.session.execute(insert(Course), [{
+        'course_id': f'C{i:04d}', 'course_name': f'课程{i}', 'hours': 48, 'exam_type': True, 'credits': 3.0
+    } for i in range(COURSES)])
+    offerings = []
+    for i in range(count):
+        # 整点开始的 50/100/150 分钟课程，另有少量错开 30 分钟的，制造部分重叠
+        start = rng.randint(8, 19) * 60 + rng.choice((0, 0, 0, 30))
+        end = min(start + rng.choice((50, 100, 150)), 22 * 60)
+        offerings.append({
+            'offering_id': f'2024-1-X{i:06d}', 'course_id': f'C{rng.randrange(COURSES):04d}',
+            'teacher_id': f'T{rng.randrange(TEACHERS):04d}', 'academic_year': '2024', 'semester': True,
+            'max_students': 50, 'current_students': 0, 'status': '开放选课',
+            'day_of_week': rng.randint(1, 5),
+            'start_time': dtime(start // 60, start % 60), 'end_time': dtime(end // 60, end % 60),
+            'location': f'R{rng.randrange(ROOMS):03d}'
+        })
+    for i in range(0, count, 5000):
+        db.session.execute(insert(CourseOffering), offerings[i:i + 5000])
+    db.session.commit()
+
+
+def run(count, legacy_max, verify):
+    rng = random.Random(42)
+    for size in sorted({min(legacy_max, count), count}):
+        app, _ = create_bench_app()
+        with app.app_context():
+            seed(size, rng)
+
+            started = time.perf_counter()
+            report = ConflictAnalysisService.analyze()
+            sweep_ms = (time.perf_counter() - started) * 1000
+            db.session.remove()
+
+            legacy_text = '-'
+            if size <= legacy_max:
+                started = time.perf_counter()
+                legacy = legacy_conflict_analysis()
+                legacy_text = f"{(time.perf_counter() - started) * 1000:.0f} ms，{legacy['conflict_count']} 组"
+                db.session.remove()
+
+            print(f"开课 {size}：扫描线 {sweep_ms:.0f} ms；原实现 {legacy_text}")
+            print(f"  时间重叠 {report['conflict_count']} 组 / {report['overlapping_pairs']} 对；"
+                  f"教室重复占用 {report['room_conflicts']['conflict_count']} 组 / "
+                  f"{report['room_conflicts']['overlapping_pairs']} 对；"
+                  f"教师重复排课 {report['teacher_conflicts']['conflict_count']} 组 / "
+                  f"{report['teacher_conflicts']['overlapping_pairs']} 对")
+
+            if verify:
+                rows = ConflictAnalysisService.load_scheduled()
+                expected = (
+                    brute_force_pairs(rows, lambda row: ''),
+                    brute_force_pairs(rows, lambda row: row.location),
+                    brute_force_pairs(rows, lambda row: row.teacher_id),
+                )
+                actual = (
+                    report['overlapping_pairs'],
+                    report['room_conflicts']['overlapping_pairs'],
+                    report['teacher_conflicts']['overlapping_pairs'],
+                )
+                assert actual == expected, (actual, expected)
+                print("  重叠对数与暴力比较结果一致")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='排课冲突分析基准')
+    parser.add_argument('--offerings', type=int, default=10000)
+    parser.add_argument('--legacy-max', type=int, default=1000, help='原实现只在不超过该规模时运行')
+    parser.add_argument('--no-verify', dest='verify', action='store_false', help='跳过暴力校验')
+    args = parser.parse_args()
+    run(args.offerings, args.legacy_max, args.verify)
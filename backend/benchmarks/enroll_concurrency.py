@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+选课并发压测
+N 个学生并发抢同一门开课的名额，验证不会超选并输出吞吐量
+
+用法: python benchmarks/enroll_concurrency.py --students 500 --capacity 100 --workers 32 [--shared-store]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.models import CourseOffering, Enrollment
+from app.services.seat_counter_service import SeatCounter
+from app.services.student_service import StudentService
+from app.services.exceptions import ServiceError
+
+OFFERING_ID = '2024-1-B0001-T0001'
+
+
+def run(students, capacity, workers, shared_store=False):
+    config = {}
+    if shared_store:
+        config['SHARED_STORE'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'shared_state.db')
+    app, db_path = create_bench_app(**config)
+
+    with app.app_context():
+        student_ids = seed_students(students)
+        seed_offering(OFFERING_ID, 'B0001', max_students=capacity)
+        db.session.commit()
+
+    def enroll(student_id):
+        with app.app_context():
+            try:
+                StudentService.enroll_in_course(student_id, OFFERING_ID)
+                return 'enrolled'
+            except ServiceError as e:
+                return type(e).__name__
+            except Exception as e:
+                return f'error: {e}'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = Counter(pool.map(enroll, student_ids))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        enrolled_rows = Enrollment.query.filter_by(offering_id=OFFERING_ID).count()
+        current_students = db.session.get(CourseOffering, OFFERING_ID).current_students
+        cached = SeatCounter.get(OFFERING_ID)
+        report = SeatCounter.reconcile(apply=False)
+
+    print(f"数据库: {db_path}  共享存储: {app.config['SHARED_STORE']}")
+    print(f"请求数: {students}  容量: {capacity}  并发线程: {workers}")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}")
+    print(f"选课记录数: {enrolled_rows}  开课人数: {current_students}  读取人数: {cached}  "
+          f"缓存偏差: {report['counter_drift_count']}")
+    print(f"耗时: {elapsed:.3f}s  吞吐量: {students / elapsed:.1f} req/s")
+
+    assert enrolled_rows <= capacity, "超选：选课记录数超过容量"
+    assert current_students == enrolled_rows == cached, "开课人数与选课记录数不一致"
+    assert outcomes['enrolled'] == enrolled_rows, "成功次数与选课记录数不一致"
+    print("✅ 无超选")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='选课并发压测')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--capacity', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--shared-store', action='store_true', help='人数缓存使用 SQLite 共享存储')
+    args = parser.parse_args()
+    run(args.students, args.capacity, args.workers, args.shared_store)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+志愿抽签选课分配基准
+两万名学生各填报 8 个志愿（热门课程集中、部分课程有先修要求），测量离线分配
+（加载 + 分配 + 批量写入）的总耗时，并校验：没有开课超员、没有学生课表冲突或重复课程、
+所有录取都满足先修要求
+
+用法: python benchmarks/enrollment_lottery.py --students 20000 --wishes 8 --policy random
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, time as dtime
+
+from sqlalchemy import func, insert
+
+from common import create_bench_app, PLACEHOLDER_PASSWORD
+from app import db
+from app.models import (
+    Class, Course, CourseOffering, Enrollment, EnrollmentWish, Student, Teacher, course_prerequisites
+)
+from app.services.lottery_service import LotteryService, RESULT_ADMITTED
+from app.services.timetable_service import interval_mask
+
+COURSES = 300
+SECTIONS = 2
+TEACHERS = 200
+PERIODS = ((8, 0, 9, 50), (10, 10, 12, 0), (14, 0, 15, 50), (16, 10, 18, 0), (19, 0, 20, 50))
+
+
+def seed(students, wishes, policy, rng):
+    db.session.add(Class(class_id='B001', class_name='压测班级'))
+    db.session.execute(insert(Teacher), [{
+        'teacher_id': f'T{i:04d}', 'name': '压测', 'gender': '男', 'age': 40,
+        'title': '讲师', 'phone': '0', 'password': PLACEHOLDER_PASSWORD
+    } for i in range(TEACHERS)])
+    db.session.execute(insert(Course), [{
+        'course_id': f'C{i:04d}', 'course_name': f'课程{i}', 'hours': 48, 'exam_type': True, 'credits': 3.0
+    } for i in range(COURSES + 1)])
+    # 每 10 门课程中有一门以 C0000 为先修课程
+    db.session.execute(insert(course_prerequisites), [
+        {'course_id': f'C{i:04d}', 'prerequisite_id': 'C0000'} for i in range(10, COURSES, 10)
+    ])
+    cohorts = ('2021', '2022', '2023', '2024')
+    student_ids = [f'{cohorts[i % 4]}{i:08d}' for i in range(students)]
+    for i in range(0, students, 5000):
+        db.session.execute(insert(Student), [{
+            'student_id': student_id, 'name': '压测', 'gender': '男', 'age': 20, 'hometown': '北京',
+            'class_id': 'B001', 'password': PLACEHOLDER_PASSWORD, 'total_credits': rng.randint(0, 120)
+        } for student_id in student_ids[i:i + 5000]])
+
+    # 一门往年开课：三成学生已通过先修课程 C0000
+    db.session.execute(insert(CourseOffering), [{
+        'offering_id': '2023-1-C0000', 'course_id': 'C0000', 'teacher_id': 'T0000', 'academic_year': '2023',
+        'semester': True, 'max_students': students, 'current_students': 0, 'status': '已结束'
+    }])
+    passed = [student_id for student_id in student_ids if rng.random() < 0.3]
+    for i in range(0, len(passed), 5000):
+        db.session.execute(insert(Enrollment), [
+            {'offering_id': '2023-1-C0000', 'student_id': student_id, 'score': 80}
+            for student_id in passed[i:i + 5000]
+        ])
+
+    # 目标学期：每门课程两个教学班，总名额约为志愿数的一半
+    offerings = []
+    capacity = max(students * wishes // (COURSES * SECTIONS * 2), 10)
+    for c in range(1, COURSES + 1):
+        for s in range(SECTIONS):
+            period = PERIODS[rng.randrange(len(PERIODS))]
+            offerings.append({
+                'offering_id': f'2024-1-C{c:04d}-{s}', 'course_id': f'C{c:04d}',
+                'teacher_id': f'T{rng.randrange(TEACHERS):04d}', 'academic_year': '2024', 'semester': True,
+                'max_students': capacity, 'current_students': 0, 'status': '开放选课',
+                'day_of_week': rng.randint(1, 5), 'start_time': dtime(period[0], period[1]),
+                'end_time': dtime(period[2], period[3]), 'location': f'R{c:03d}'
+            })
+    db.session.execute(insert(CourseOffering), offerings)
+
+    # 志愿：热门课程（编号小）被选中的概率更高
+    weights = [1 / (k + 1) ** 0.8 for k in range(len(offerings))]
+    rows = []
+    for student_id in student_ids:
+        chosen = list(dict.fromkeys(rng.choices(range(len(offerings)), weights=weights, k=wishes * 2)))[:wishes]
+        rows.extend({
+            'student_id': student_id, 'offering_id': offerings[k]['offering_id'],
+            'academic_year': '2024', 'semester': True, 'rank': rank
+        } for rank, k in enumerate(chosen, 1))
+    for i in range(0, len(rows), 20000):
+        db.session.execute(insert(EnrollmentWish), rows[i:i + 20000])
+    db.session.commit()
+
+    now = datetime.now()
+    LotteryService.save_round({
+        'academic_year': '2024', 'semester': 1, 'policy': policy, 'seed': 7,
+        'opens_at': (now - timedelta(days=7)).isoformat(), 'closes_at': (now - timedelta(minutes=1)).isoformat()
+    })
+    return len(rows)
+
+
+def verify():
+    """校验分配结果：容量、课表冲突、重复课程、先修要求"""
+    over = db.session.query(CourseOffering.offering_id).join(
+        Enrollment, Enrollment.offering_id == CourseOffering.offering_id
+    ).group_by(CourseOffering.offering_id, CourseOffering.max_students)\
+     .having(func.count(Enrollment.student_id) > CourseOffering.max_students).all()
+    assert not over, f"超员开课: {over[:5]}"
+
+    rows = db.session.query(
+        Enrollment.student_id, CourseOffering.course_id, CourseOffering.day_of_week,
+        CourseOffering.start_time, CourseOffering.end_time, Enrollment.score
+    ).join(CourseOffering, Enrollment.offering_id == CourseOffering.offering_id).all()
+    days = {}
+    courses = {}
+    passed = {row.student_id for row in rows if row.course_id == 'C0000' and row.score is not None}
+    gated = {f'C{i:04d}' for i in range(10, COURSES, 10)}
+    for row in rows:
+        assert (row.student_id, row.course_id) not in courses, f"重复课程: {row.student_id} {row.course_id}"
+        courses[(row.student_id, row.course_id)] = True
+        assert row.course_id not in gated or row.student_id in passed, f"先修未满足: {row.student_id}"
+        if row.day_of_week:
+            key = (row.student_id, row.day_of_week)
+            mask = interval_mask(row.start_time, row.end_time)
+            assert not days.get(key, 0) & mask, f"课表冲突: {row.student_id}"
+            days[key] = days.get(key, 0) | mask
+
+    admitted = db.session.query(func.count()).select_from(EnrollmentWish)\
+        .filter(EnrollmentWish.result == RESULT_ADMITTED).scalar()
+    enrolled = db.session.query(func.count()).select_from(Enrollment)\
+        .filter(Enrollment.offering_id.like('2024-%')).scalar()
+    assert admitted == enrolled, (admitted, enrolled)
+
+
+def run(students, wishes, policy):
+    app, _ = create_bench_app()
+    rng = random.Random(42)
+    with app.app_context():
+        started = time.perf_counter()
+        wish_count = seed(students, wishes, policy, rng)
+        print(f"生成 {students} 名学生、{wish_count} 条志愿：{time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        result = LotteryService.allocate_round('2024', 1)
+        elapsed = time.perf_counter() - started
+        timings = result['timings']
+        print(f"分配总耗时 {elapsed:.2f}s（加载 {timings['load_ms'] / 1000:.2f}s，"
+              f"分配 {timings['allocate_ms'] / 1000:.2f}s，写入 {timings['write_ms'] / 1000:.2f}s）")
+        print(f"录取 {result['admitted_count']} 条，第一志愿录取率 {result['first_choice_rate']:.1%}")
+        for name, count in sorted(result['results'].items(), key=lambda item: -item[1]):
+            print(f"  {name}: {count}")
+
+        verify()
+        print("校验通过：无超员、无课表冲突、无重复课程、先修要求均满足")
+        assert elapsed < 60, "分配超过一分钟"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='志愿抽签选课分配基准')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--wishes', type=int, default=8)
+    parser.add_argument('--policy', choices=('random', 'priority'), default='random')
+    args = parser.parse_args()
+    run(args.students, args.wishes, args.policy)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+幂等键基准
+1. 同一幂等键的选课请求：首次执行与重放的耗时对比，并统计重放期间执行的 SQL 语句数（应为 0）
+2. 多线程同时提交同一幂等键：只执行一次，其余请求拿到相同响应
+
+用法: python benchmarks/idempotency.py --replays 2000 --concurrent 32
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.models import Enrollment
+
+OFFERING_ID = '2024-1-I0001-T0001'
+
+
+def run(replays, concurrent):
+    app, _ = create_bench_app(RATE_LIMIT_RATE=0)
+    with app.app_context():
+        student_ids = seed_students(2)
+        seed_offering(OFFERING_ID, 'I0001', max_students=100, day_of_week=1, start=(8, 0), end=(9, 50))
+        db.session.commit()
+        tokens = [create_access_token(identity=student_id, additional_claims={'type': 'student'})
+                  for student_id in student_ids]
+        engine = db.engine
+
+    statements = Counter()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements['sql'] += 1
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {tokens[0]}', 'Idempotency-Key': 'enroll-1'}
+    started = time.perf_counter()
+    first = client.post(f'/api/student/courses/{OFFERING_ID}/enroll', headers=headers)
+    first_us = (time.perf_counter() - started) * 1e6
+    assert first.status_code == 201, first.json
+
+    statements.clear()
+    started = time.perf_counter()
+    for _ in range(replays):
+        response = client.post(f'/api/student/courses/{OFFERING_ID}/enroll', headers=headers)
+        assert response.status_code == 201 and response.headers.get('Idempotent-Replayed') == 'true'
+    replay_us = (time.perf_counter() - started) * 1e6 / replays
+    print(f"首次选课 {first_us:.0f} µs；重放 {replay_us:.0f} µs/次，{replays} 次重放执行 SQL {statements['sql']} 条")
+    assert statements['sql'] == 0
+
+    results = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrent)
+    headers = {'Authorization': f'Bearer {tokens[1]}', 'Idempotency-Key': 'enroll-2'}
+
+    def submit():
+        local = app.test_client()
+        barrier.wait()
+        response = local.post(f'/api/student/courses/{OFFERING_ID}/enroll', headers=headers)
+        with lock:
+            results[(response.status_code, response.headers.get('Idempotent-Replayed') == 'true')] += 1
+
+    threads = [threading.Thread(target=submit) for _ in range(concurrent)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    executed = sum(count for (_, replayed), count in results.items() if not replayed)
+    with app.app_context():
+        rows = Enrollment.query.filter_by(offering_id=OFFERING_ID, student_id=student_ids[1]).count()
+    print(f"{concurrent} 个并发重复请求：执行 {executed} 次，结果 {dict(results)}，选课记录 {rows} 条")
+    assert executed == 1 and rows == 1 and set(status for status, _ in results) == {201}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='幂等键基准')
+    parser.add_argument('--replays', type=int, default=2000)
+    parser.add_argument('--concurrent', type=int, default=32)
+    args = parser.parse_args()
+    run(args.replays, args.concurrent)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+访问令牌声明基准
+1. 原实现（令牌内嵌完整用户资料）与精简令牌（用户ID、类型、版本号）的长度与解码耗时对比
+2. 精简令牌下 /api/auth/verify-token 解析用户资料：缓存命中与未命中的耗时，以及命中时执行的 SQL 语句数（应为 0）
+3. 修改用户资料提交后，下一次解析即返回新资料
+
+用法: python benchmarks/jwt_claims.py --decodes 20000 --requests 2000
+"""
+import argparse
+import time
+from collections import Counter
+
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy import event
+
+from common import create_bench_app, seed_students
+from app import db
+from app.models import Student
+from app.services.principal_service import PrincipalCache, principal_info
+
+
+def time_decode(app, token, decodes):
+    with app.app_context():
+        started = time.perf_counter()
+        for _ in range(decodes):
+            decode_token(token)
+        return (time.perf_counter() - started) * 1e6 / decodes
+
+
+def run(decodes, requests):
+    app, _ = create_bench_app()
+    with app.app_context():
+        student_id = seed_students(1)[0]
+        info = principal_info('student', db.session.get(Student, student_id))
+        fat = create_access_token(identity=student_id, additional_claims={'type': 'student', 'user_data': info})
+        slim = create_access_token(identity=student_id, additional_claims={
+            'type': 'student', 'ver': PrincipalCache.version('student', student_id)
+        })
+        engine = db.engine
+
+    for label, token in (('内嵌用户资料', fat), ('精简声明', slim)):
+        print(f"[{label}] 令牌 {len(token)} 字节，Authorization 请求头 {len('Bearer ') + len(token)} 字节；"
+              f"解码 {time_decode(app, token, decodes):.1f} µs/次")
+
+    statements = Counter()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements['sql'] += 1
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {slim}'}
+    PrincipalCache.clear()
+    started = time.perf_counter()
+    response = client.post('/api/auth/verify-token', headers=headers)
+    miss_us = (time.perf_counter() - started) * 1e6
+    assert response.status_code == 200 and response.json['user_data'] == info, response.json
+
+    statements.clear()
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.post('/api/auth/verify-token', headers=headers)
+    hit_us = (time.perf_counter() - started) * 1e6 / requests
+    print(f"verify-token 解析用户资料：未命中 {miss_us:.0f} µs，命中 {hit_us:.0f} µs/次，"
+          f"{requests} 次命中执行 SQL {statements['sql']} 条；{PrincipalCache.stats()}")
+    assert statements['sql'] == 0
+
+    with app.app_context():
+        db.session.get(Student, student_id).hometown = '上海'
+        db.session.commit()
+    response = client.post('/api/auth/verify-token', headers=headers)
+    print(f"修改籍贯后：hometown={response.json['user_data']['hometown']}，stale={response.json['stale']}")
+    assert response.json['user_data']['hometown'] == '上海' and response.json['stale']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='访问令牌声明基准')
+    parser.add_argument('--decodes', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.decodes, args.requests)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+登录吞吐基准
+多线程并发登录（每个学生只登录一次，bcrypt 缓存未命中），同时另一个线程持续请求个人信息接口，
+比较三种情况下的每核每秒登录数与无关接口的延迟：
+1. 在请求线程内计算 bcrypt（原实现，PASSWORD_WORKERS=-1）
+2. bcrypt 进程池（进程数等于 CPU 核数）
+3. 进程池 + 已校验缓存：同一批学生在缓存有效期内再次登录
+
+用法: python benchmarks/login.py --students 200 --threads 16 --rounds 10
+"""
+import argparse
+import os
+import threading
+import time
+
+import bcrypt
+from flask_jwt_extended import create_access_token
+from sqlalchemy import update
+
+from common import create_bench_app, seed_students
+from app import db
+from app.models import Student
+from app.services.password_service import PasswordService
+
+PASSWORD = '123456'
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def login_all(app, student_ids, threads):
+    """多线程登录全部学生，同时测量个人信息接口的延迟"""
+    with app.app_context():
+        token = create_access_token(identity=student_ids[0], additional_claims={'type': 'student'})
+    stop = threading.Event()
+    latencies = []
+
+    def probe():
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/student/profile', headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    statuses = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        client = app.test_client()
+        for student_id in chunk:
+            response = client.post('/api/auth/login', json={
+                'username': student_id, 'password': PASSWORD, 'user_type': 'student'
+            })
+            with lock:
+                statuses.append(response.status_code)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    chunks = [student_ids[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    assert all(status == 200 for status in statuses), set(statuses)
+    return len(statuses) / elapsed, latencies
+
+
+def report(label, rate, latencies, cores):
+    print(f"[{label}] {rate:.1f} 次登录/秒（{rate / cores:.1f} /秒/核，{cores} 核）；"
+          f"个人信息接口 {len(latencies)} 次 p50 {percentile(latencies, 0.5):.1f} ms，"
+          f"p95 {percentile(latencies, 0.95):.1f} ms，p99 {percentile(latencies, 0.99):.1f} ms")
+
+
+def run(students, threads, rounds):
+    cores = os.cpu_count() or 1
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    for label, workers in (('请求线程内 bcrypt', -1), ('bcrypt 进程池', 0)):
+        app, _ = create_bench_app(PASSWORD_WORKERS=workers, PASSWORD_QUEUE_LIMIT=students)
+        with app.app_context():
+            student_ids = seed_students(students)
+            db.session.execute(update(Student).values(password=password_hash))
+            db.session.commit()
+        PasswordService.clear_cache()
+        report(label, *login_all(app, student_ids, threads), cores)
+
+    report('进程池 + 已校验缓存', *login_all(app, student_ids, threads), cores)
+    print(f"校验计数: {PasswordService.stats()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='登录吞吐基准')
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=10, help='bcrypt 成本因子')
+    args = parser.parse_args()
+    run(args.students, args.threads, args.rounds)
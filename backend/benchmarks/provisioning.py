@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+批量开通账号基准
+1. 批量开通学生账号（密码哈希按 BCRYPT_ROUNDS 在进程池中并行计算），
+   与逐个 set_password 的预计耗时对比
+2. 开通的账号哈希成本与 BCRYPT_ROUNDS 一致，登录成功且不需要重新计算
+
+用法: python benchmarks/provisioning.py --students 2000 --rounds 12
+"""
+import argparse
+import os
+import time
+
+from common import create_bench_app
+from app import db
+from app.models import Class, Student
+from app.services.admin_service import AdminService
+from app.services.password_service import hash_cost
+
+SAMPLES = 3
+
+
+def run(students, rounds):
+    app, _ = create_bench_app(BCRYPT_ROUNDS=rounds)
+    with app.app_context():
+        db.session.add(Class(class_id='B001', class_name='压测班级'))
+        db.session.commit()
+        rows = [{
+            'student_id': f'P{i:09d}', 'name': '压测', 'gender': '男', 'age': 20,
+            'hometown': '北京', 'class_id': 'B001'
+        } for i in range(students)]
+
+        # 原实现：逐个 set_password
+        started = time.perf_counter()
+        for _ in range(SAMPLES):
+            Student(student_id='X').set_password('123456')
+        serial = (time.perf_counter() - started) / SAMPLES * students
+
+        started = time.perf_counter()
+        result = AdminService.provision_students(rows, '123456')
+        elapsed = time.perf_counter() - started
+        assert result['created_count'] == students, result['errors'][:3]
+        provisioned = db.session.get(Student, rows[0]['student_id']).password
+        cost = hash_cost(provisioned)
+        print(f"批量开通 {students} 个账号（成本 {cost}，{os.cpu_count()} 核）: {elapsed:.1f}s；"
+              f"逐个 set_password 预计 {serial:.1f}s")
+        assert cost == rounds
+
+    client = app.test_client()
+    credentials = {'username': rows[0]['student_id'], 'password': '123456', 'user_type': 'student'}
+    response = client.post('/api/auth/login', json=credentials)
+    assert response.status_code == 200, response.json
+    with app.app_context():
+        password_hash = db.session.get(Student, rows[0]['student_id']).password
+    print(f"首次登录成功，密码哈希{'未' if password_hash == provisioned else '已'}重新计算")
+    assert password_hash == provisioned
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='批量开通账号基准')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=12)
+    args = parser.parse_args()
+    run(args.students, args.rounds)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+令牌吊销基准
+1. 吊销表中有大量记录时，校验令牌（token_in_blocklist_loader）的耗时，以及请求路径上执行的 SQL 语句数（应为 0）
+2. 修改密码后旧令牌立即失效、新令牌可用
+3. 压缩：过期的吊销记录被删除，内存副本同步缩小
+
+用法: python benchmarks/revocation.py --revoked 100000 --checks 20000
+"""
+import argparse
+import time
+import uuid
+from collections import Counter
+
+import bcrypt
+from flask_jwt_extended import decode_token
+from sqlalchemy import event, insert, update
+
+from common import create_bench_app, seed_students
+from app import db
+from app.models import RevokedToken, Student
+from app.services.revocation_service import TokenRevocation, issued_at_ms
+
+PASSWORD = '123456'
+
+
+def run(revoked, checks):
+    app, _ = create_bench_app(BCRYPT_ROUNDS=4, PASSWORD_WORKERS=-1)
+    now = int(time.time())
+    with app.app_context():
+        student_id = seed_students(1)[0]
+        db.session.execute(update(Student).values(password=bcrypt.hashpw(
+            PASSWORD.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')))
+        # 一半已过期（待压缩），一半仍有效
+        db.session.execute(insert(RevokedToken), [
+            {'key': str(uuid.uuid4()), 'revoked_at': issued_at_ms(),
+             'expires_at': now - 60 if i % 2 else now + 3600}
+            for i in range(revoked)
+        ])
+        db.session.commit()
+        engine = db.engine
+
+    client = app.test_client()
+    credentials = {'username': student_id, 'password': PASSWORD, 'user_type': 'student'}
+    tokens = client.post('/api/auth/login', json=credentials).json
+    headers = {'Authorization': f"Bearer {tokens['access_token']}"}
+
+    statements = Counter()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements['sql'] += 1
+
+    with app.test_request_context():
+        payload = decode_token(tokens['access_token'])
+        # 进程首次校验时加载全部有效的吊销记录
+        started = time.perf_counter()
+        TokenRevocation.is_revoked({}, payload)
+        load_ms = (time.perf_counter() - started) * 1000
+        statements.clear()
+        started = time.perf_counter()
+        for _ in range(checks):
+            assert not TokenRevocation.is_revoked({}, payload)
+        check_us = (time.perf_counter() - started) * 1e6 / checks
+    print(f"吊销表 {revoked} 条，首次加载 {load_ms:.0f} ms（内存 {TokenRevocation.stats()['entries']} 条）；"
+          f"校验 {check_us:.2f} µs/次，"
+          f"{checks} 次校验执行 SQL {statements['sql']} 条")
+    assert statements['sql'] == 0
+
+    response = client.post('/api/auth/change-password', headers=headers,
+                           json={'old_password': PASSWORD, 'new_password': 'abcdef'})
+    assert response.status_code == 200, response.json
+    old = client.post('/api/auth/verify-token', headers=headers).status_code
+    new = client.post('/api/auth/verify-token', headers={
+        'Authorization': f"Bearer {response.json['access_token']}"}).status_code
+    print(f"修改密码后：旧令牌 {old}，新令牌 {new}")
+    assert old == 401 and new == 200
+
+    with app.app_context():
+        started = time.perf_counter()
+        removed = TokenRevocation.compact()
+        elapsed = (time.perf_counter() - started) * 1000
+        remaining = RevokedToken.query.count()
+    print(f"压缩删除 {removed} 条过期记录，耗时 {elapsed:.0f} ms；剩余 {remaining} 条，"
+          f"内存 {TokenRevocation.stats()['entries']} 条")
+    assert removed == revoked // 2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='令牌吊销基准')
+    parser.add_argument('--revoked', type=int, default=100000)
+    parser.add_argument('--checks', type=int, default=20000)
+    args = parser.parse_args()
+    run(args.revoked, args.checks)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+学期自动排课求解基准
+生成一个学期的待排开课（含少量已排开课）与上一学期的历史选课，
+对比"单次贪心构造"与"多次重启 + 局部搜索"的学生冲突估计，
+比较单进程与进程池的求解耗时，并在写回后校验教室、教师没有重复占用
+
+用法: python benchmarks/schedule_solver.py --offerings 300 --students 3000 --restarts 8 --workers 4
+"""
+import argparse
+import random
+import time
+from datetime import time as dtime
+
+from sqlalchemy import insert
+
+from common import create_bench_app, PLACEHOLDER_PASSWORD
+from app import db
+from app.models import Class, Course, CourseOffering, Enrollment, Student, Teacher
+from app.services.conflict_service import ConflictAnalysisService
+from app.services.schedule_solver import ScheduleSolverService, build_problem, solve
+
+COURSES_PER_STUDENT = 8
+
+
+def seed(offerings, students, rng):
+    teachers = max(offerings // 3, 1)
+    courses = max(offerings // 2, 2)
+    db.session.add(Class(class_id='B001', class_name='压测班级'))
+    db.session.execute(insert(Teacher), [{
+        'teacher_id': f'T{i:04d}', 'name': '压测', 'gender': '男', 'age': 40,
+        'title': '讲师', 'phone': '0', 'password': PLACEHOLDER_PASSWORD
+    } for i in range(teachers)])
+    db.session.execute(insert(Course), [{
+        'course_id': f'C{i:04d}', 'course_name': f'课程{i}', 'hours': 48, 'exam_type': True, 'credits': 3.0
+    } for i in range(courses)])
+    db.session.execute(insert(Student), [{
+        'student_id': f'S{i:09d}', 'name': '压测', 'gender': '男', 'age': 20, 'hometown': '北京',
+        'class_id': 'B001', 'password': PLACEHOLDER_PASSWORD
+    } for i in range(students)])
+
+    # 历史学期：每门课程一个开课；学生按"专业方向"成组选课，共同选修集中在少数课程对上
+    db.session.execute(insert(CourseOffering), [{
+        'offering_id': f'2023-1-C{i:04d}-H', 'course_id': f'C{i:04d}', 'teacher_id': f'T{i % teachers:04d}',
+        'academic_year': '2023', 'semester': True, 'max_students': students, 'current_students': 0,
+        'status': '已结束'
+    } for i in range(courses)])
+    tracks = [rng.sample(range(courses), min(courses, COURSES_PER_STUDENT * 4)) for _ in range(20)]
+    enrollments = []
+    for s in range(students):
+        track = tracks[s % len(tracks)]
+        for c in rng.sample(track, min(len(track), COURSES_PER_STUDENT)):
+            enrollments.append({'student_id': f'S{s:09d}', 'offering_id': f'2023-1-C{c:04d}-H'})
+    for i in range(0, len(enrollments), 5000):
+        db.session.execute(insert(Enrollment), enrollments[i:i + 5000])
+
+    # 目标学期：每门课程 1-3 个教学班，约一成已经排好时间
+    rows = []
+    for i in range(offerings):
+        course = i % courses
+        row = {
+            'offering_id': f'2024-C{course:04d}-{i:04d}', 'course_id': f'C{course:04d}',
+            'teacher_id': f'T{rng.randrange(teachers):04d}', 'academic_year': '2024', 'semester': True,
+            'max_students': rng.choice((30, 50, 80, 120)), 'current_students': 0, 'status': '开放选课',
+            'day_of_week': None, 'start_time': None, 'end_time': None, 'location': None
+        }
+        if i % 10 == 0:
+            k = i // 10
+            row.update(teacher_id=f'T{k % teachers:04d}', day_of_week=k % 5 + 1, start_time=dtime(8, 0),
+                       end_time=dtime(9, 50), location=f'R{k:03d}')
+        rows.append(row)
+    db.session.execute(insert(CourseOffering), rows)
+    db.session.commit()
+
+
+def rooms_for(offerings):
+    """大小教室搭配，总容量略多于需要"""
+    count = max(offerings // 15 + 10, 40)
+    return [{'location': f'R{i:03d}', 'capacity': (60, 60, 100, 150)[i % 4]} for i in range(count)]
+
+
+def run(offerings, students, restarts, iterations, workers):
+    app, _ = create_bench_app()
+    rng = random.Random(42)
+    rooms = rooms_for(offerings)
+    with app.app_context():
+        seed(offerings, students, rng)
+
+        started = time.perf_counter()
+        problem = build_problem('2024', 1, rooms)
+        print(f"待排 {len(problem['offerings'])} 门，已排 {problem['fixed_count']} 门，"
+              f"{len(rooms)} 间教室，{len(problem['slots'])} 个节次；加载 {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        greedy, _ = solve(problem, restarts=1, iterations=0)
+        print(f"单次贪心构造: 冲突 {greedy['student_conflicts']:.1f}，未安排 {greedy['unplaced']}")
+
+        for count in sorted({1, workers}):
+            started = time.perf_counter()
+            best, runs = solve(problem, restarts, iterations, workers=count)
+            elapsed = time.perf_counter() - started
+            scores = ', '.join(f"{run['student_conflicts']:.1f}" for run in runs)
+            print(f"{restarts} 次重启 × {iterations} 步，{count} 个进程: {elapsed:.2f}s；"
+                  f"最优冲突 {best['student_conflicts']:.1f}，未安排 {best['unplaced']}；各次 [{scores}]")
+
+        result = ScheduleSolverService.solve_term('2024', 1, rooms, restarts=restarts,
+                                                  iterations=iterations, workers=workers, apply=True)
+        report = ConflictAnalysisService.analyze('2024', 1)
+        print(f"写回 {result['applied_count']} 门，跳过 {len(result['skipped'])} 门；"
+              f"教室重复占用 {report['room_conflicts']['overlapping_pairs']} 对，"
+              f"教师重复排课 {report['teacher_conflicts']['overlapping_pairs']} 对")
+        assert report['room_conflicts']['overlapping_pairs'] == 0, "教室被重复占用"
+        assert report['teacher_conflicts']['overlapping_pairs'] == 0, "教师被重复排课"
+        assert not result['skipped']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='学期自动排课求解基准')
+    parser.add_argument('--offerings', type=int, default=300)
+    parser.add_argument('--students', type=int, default=3000)
+    parser.add_argument('--restarts', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    run(args.offerings, args.students, args.restarts, args.iterations, args.workers)
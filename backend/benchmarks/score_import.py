@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+成绩批量录入基准
+对比原"逐行查询选课记录与学生"的录入方式与批量录入服务，
+分别在 50 / 300 / 1000 行成绩时测量耗时与 SQL 语句数（含 CSV 解析）
+
+用法: python benchmarks/score_import.py --sizes 50 300 1000
+"""
+import argparse
+import io
+import random
+import time
+
+from sqlalchemy import event
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.models import CourseOffering, Enrollment, Student
+from app.services.score_service import ScoreService, parse_csv_rows
+
+TEACHER_ID = 'T0001'
+
+
+def legacy_update_scores(offering_id, scores):
+    """原实现：每行一次选课记录查询，学分变化时再查询学生"""
+    offering = CourseOffering.query.filter_by(offering_id=offering_id, teacher_id=TEACHER_ID).first()
+    for score_data in scores:
+        enrollment = Enrollment.query.filter_by(
+            offering_id=offering_id,
+            student_id=score_data['student_id']
+        ).first()
+        if enrollment:
+            old_score = enrollment.score
+            enrollment.score = score_data['score']
+            if old_score is None or old_score < 60:
+                if score_data['score'] >= 60:
+                    student = Student.query.filter_by(student_id=score_data['student_id']).first()
+                    if student:
+                        student.total_credits += offering.course.credits
+            elif old_score >= 60 and score_data['score'] < 60:
+                student = Student.query.filter_by(student_id=score_data['student_id']).first()
+                if student:
+                    student.total_credits -= offering.course.credits
+    db.session.commit()
+
+
+class StatementCounter:
+    """统计执行的 SQL 语句数"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def to_csv(scores):
+    buffer = io.StringIO()
+    buffer.write('student_id,score\n')
+    for item in scores:
+        buffer.write(f"{item['student_id']},{item['score']}\n")
+    return buffer.getvalue().encode('utf-8')
+
+
+def run(sizes):
+    app, _ = create_bench_app()
+    rng = random.Random(42)
+
+    with app.app_context():
+        student_ids = seed_students(max(sizes))
+        offering_ids = {}
+        for size in sizes:
+            for variant in ('legacy', 'bulk'):
+                offering_id = f'2024-1-B{size:04d}-{variant[0].upper()}'
+                seed_offering(offering_id, f'B{size:04d}', teacher_id=TEACHER_ID, max_students=size)
+                db.session.add_all(
+                    Enrollment(offering_id=offering_id, student_id=student_id)
+                    for student_id in student_ids[:size]
+                )
+                offering_ids[(size, variant)] = offering_id
+        db.session.commit()
+
+        print(f"{'行数':>6} {'原实现(ms)':>12} {'原语句数':>8} {'批量(ms)':>10} {'批量语句数':>10} {'CSV解析(ms)':>12}")
+        for size in sizes:
+            scores = [
+                {'student_id': student_id, 'score': rng.randint(30, 100)}
+                for student_id in student_ids[:size]
+            ]
+
+            db.session.remove()
+            with StatementCounter(db.engine) as legacy_counter:
+                started = time.perf_counter()
+                legacy_update_scores(offering_ids[(size, 'legacy')], scores)
+                legacy_ms = (time.perf_counter() - started) * 1000
+
+            payload = to_csv(scores)
+            started = time.perf_counter()
+            rows = parse_csv_rows(io.BytesIO(payload))
+            parse_ms = (time.perf_counter() - started) * 1000
+
+            db.session.remove()
+            with StatementCounter(db.engine) as bulk_counter:
+                started = time.perf_counter()
+                result = ScoreService.import_scores(TEACHER_ID, offering_ids[(size, 'bulk')], rows)
+                bulk_ms = (time.perf_counter() - started) * 1000
+            assert result['updated_count'] == size and not result['errors'], result
+
+            print(f"{size:>6} {legacy_ms:>12.1f} {legacy_counter.count:>8} "
+                  f"{bulk_ms:>10.1f} {bulk_counter.count:>10} {parse_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='成绩批量录入基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 300, 1000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+选课人数实时推送基准
+在一个多线程 werkzeug 服务进程中建立大量空闲 SSE 订阅连接（每个连接占用一个服务线程），
+测量：
+1. 建立连接后服务进程的线程数与常驻内存增量
+2. 一次选课到所有订阅者收到增量的延迟
+3. 选课/退课高频变化时，每个订阅者收到的事件数不超过合并频率上限
+
+客户端用 selectors 在单线程中读取全部连接，不额外占用线程；每个连接先换取一次性连接凭证。
+
+用法: python benchmarks/seat_stream.py --subscribers 5000 --rate 2 --burst 3
+"""
+import argparse
+import logging
+import resource
+import selectors
+import socket
+import threading
+import time
+
+from flask_jwt_extended import create_access_token
+from werkzeug.serving import make_server
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.services.seat_feed import SeatFeed
+from app.services.student_service import StudentService
+
+OFFERING_ID = '2024-1-E0001-T0001'
+CONNECT_BATCH = 200
+
+
+def rss_mb():
+    """当前进程常驻内存（MB），读取 /proc，不可用时返回峰值"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Subscribers:
+    """单线程管理的一组 SSE 客户端连接"""
+
+    def __init__(self, port, issue_ticket):
+        self.port = port
+        self.issue_ticket = issue_ticket
+        self.selector = selectors.DefaultSelector()
+        self.sockets = []
+        self.buffers = {}
+
+    def connect(self, count):
+        for start in range(0, count, CONNECT_BATCH):
+            batch = []
+            for _ in range(min(CONNECT_BATCH, count - start)):
+                sock = socket.create_connection(('127.0.0.1', self.port))
+                sock.sendall((
+                    f'GET /api/student/seats/stream?ticket={self.issue_ticket()} HTTP/1.1\r\n'
+                    f'Host: localhost\r\nAccept: text/event-stream\r\n\r\n'
+                ).encode())
+                sock.setblocking(False)
+                self.selector.register(sock, selectors.EVENT_READ)
+                self.buffers[sock] = b''
+                batch.append(sock)
+            self.sockets.extend(batch)
+            # 等这一批都收到第一条 retry 消息（订阅已建立）再继续，避免压垮监听队列
+            self.wait(lambda sock: b'retry:' in self.buffers[sock], batch, timeout=60)
+
+    def poll(self, timeout):
+        for key, _ in self.selector.select(timeout):
+            data = key.fileobj.recv(65536)
+            if data:
+                self.buffers[key.fileobj] += data
+
+    def wait(self, predicate, sockets=None, timeout=10):
+        """读取直到所有连接满足条件，返回每个连接满足条件的时刻"""
+        sockets = sockets or self.sockets
+        done = {}
+        deadline = time.perf_counter() + timeout
+        while len(done) < len(sockets) and time.perf_counter() < deadline:
+            self.poll(0.05)
+            now = time.perf_counter()
+            for sock in sockets:
+                if sock not in done and predicate(sock):
+                    done[sock] = now
+        return done
+
+    def reset(self):
+        for sock in self.sockets:
+            self.buffers[sock] = b''
+
+    def close(self):
+        for sock in self.sockets:
+            self.selector.unregister(sock)
+            sock.close()
+
+
+def run(subscribers, rate, burst):
+    app, _ = create_bench_app(SEAT_STREAM_RATE=rate)
+    with app.app_context():
+        student_ids = seed_students(200)
+        seed_offering(OFFERING_ID, 'E0001', max_students=1000, day_of_week=1, start=(8, 0), end=(9, 50))
+        db.session.commit()
+        token = create_access_token(identity=student_ids[0], additional_claims={'type': 'student'})
+
+    ticket_client = app.test_client()
+
+    def issue_ticket():
+        response = ticket_client.post('/api/student/seats/stream-ticket',
+                                      headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200, response.json
+        return response.json['ticket']
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.request_queue_size = CONNECT_BATCH
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_rss, base_threads = rss_mb(), threading.active_count()
+    clients = Subscribers(server.port, issue_ticket)
+    started = time.perf_counter()
+    clients.connect(subscribers)
+    print(f"建立 {subscribers} 个订阅连接: {time.perf_counter() - started:.1f}s；"
+          f"服务端订阅数 {SeatFeed.subscriber_count()}；线程 {base_threads} -> {threading.active_count()}；"
+          f"常驻内存增加 {rss_mb() - base_rss:.0f} MB（约 {(rss_mb() - base_rss) * 1024 / subscribers:.0f} KB/连接，含客户端）")
+    assert SeatFeed.subscriber_count() == subscribers
+
+    # 第一次变化前等后台线程完成基线同步
+    time.sleep(2.5 / rate)
+
+    clients.reset()
+    with app.app_context():
+        changed = time.perf_counter()
+        StudentService.enroll_in_course(student_ids[0], OFFERING_ID)
+    marker = f'"offering_id":"{OFFERING_ID}","current_students":1'.encode()
+    received = clients.wait(lambda sock: marker in clients.buffers[sock])
+    latencies = sorted((at - changed) * 1000 for at in received.values())
+    assert len(latencies) == subscribers, f"只有 {len(latencies)} 个订阅者收到增量"
+    print(f"一次选课推送到全部订阅者: p50 {latencies[len(latencies) // 2]:.0f} ms，"
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.0f} ms，最慢 {latencies[-1]:.0f} ms"
+          f"（合并周期 {1000 / rate:.0f} ms）")
+
+    # 高频选课/退课：每个订阅者收到的批次数受合并频率限制
+    clients.reset()
+    changes = 0
+    deadline = time.perf_counter() + burst
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            student_id = student_ids[1 + changes % (len(student_ids) - 1)]
+            if changes // (len(student_ids) - 1) % 2 == 0:
+                StudentService.enroll_in_course(student_id, OFFERING_ID)
+            else:
+                StudentService.drop_course(student_id, OFFERING_ID)
+            changes += 1
+            clients.poll(0)
+    clients.wait(lambda sock: False, timeout=2.0 / rate)
+    events = [clients.buffers[sock].count(b'event: seats') for sock in clients.sockets]
+    limit = int(burst * rate) + 2
+    print(f"{burst}s 内 {changes} 次人数变化：每个订阅者收到 {min(events)}~{max(events)} 批增量（上限 {limit}）")
+    assert max(events) <= limit
+
+    clients.close()
+    time.sleep(0.5)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='选课人数实时推送基准')
+    parser.add_argument('--subscribers', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=2)
+    parser.add_argument('--burst', type=float, default=3)
+    args = parser.parse_args()
+    run(args.subscribers, args.rate, args.burst)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+选课统计内存回归基准
+开课数从 100 增长到 100,000 时，对比原"加载全部开课对象 + Python 求和"的实现
+与单条聚合查询的耗时和峰值内存（tracemalloc），聚合查询的峰值内存应保持不变
+
+用法: python benchmarks/statistics_memory.py --sizes 100 1000 10000 100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from sqlalchemy import insert
+
+from common import create_bench_app, seed_offering, seed_students
+from app import db
+from app.models import CourseOffering, Enrollment
+from app.services.seat_counter_service import SeatCounter
+from app.services.statistics_service import CourseStatisticsService
+
+TEACHER_ID = 'T0001'
+STUDENTS = 200
+ENROLLMENTS_PER_OFFERING = 3
+
+
+def legacy_enrollment_statistics(academic_year=None, semester=None):
+    """原实现：加载全部开课对象后在 Python 中三次遍历求和"""
+    query = db.session.query(CourseOffering)
+    if academic_year:
+        query = query.filter(CourseOffering.academic_year == academic_year)
+    if semester is not None:
+        query = query.filter(CourseOffering.semester == bool(semester))
+    offerings = query.all()
+    seat_counts = SeatCounter.get_many(offering.offering_id for offering in offerings)
+    total_capacity = sum(offering.max_students for offering in offerings)
+    total_enrolled = sum(seat_counts.values())
+    full_courses = sum(1 for offering in offerings if seat_counts[offering.offering_id] >= offering.max_students)
+    return {
+        'total_offerings': len(offerings),
+        'total_capacity': total_capacity,
+        'total_enrolled': total_enrolled,
+        'full_courses': full_courses,
+    }
+
+
+def grow_offerings(start, stop, student_ids, rng):
+    """批量追加开课与选课记录"""
+    offerings = []
+    enrollments = []
+    for i in range(start, stop):
+        offering_id = f'2024-1-M{i:06d}'
+        max_students = rng.randint(ENROLLMENTS_PER_OFFERING, 10)
+        offerings.append({
+            'offering_id': offering_id, 'course_id': 'M000', 'teacher_id': TEACHER_ID,
+            'academic_year': '2024', 'semester': True, 'max_students': max_students,
+            'current_students': 0, 'status': '开放选课'
+        })
+        for student_id in rng.sample(student_ids, rng.randint(0, ENROLLMENTS_PER_OFFERING)):
+            score = rng.randint(40, 100) if rng.random() < 0.5 else None
+            enrollments.append({'offering_id': offering_id, 'student_id': student_id, 'score': score})
+    for i in range(0, len(offerings), 5000):
+        db.session.execute(insert(CourseOffering), offerings[i:i + 5000])
+    for i in range(0, len(enrollments), 5000):
+        db.session.execute(insert(Enrollment), enrollments[i:i + 5000])
+    db.session.commit()
+
+
+def measure(func):
+    """返回 (结果, 耗时ms, 峰值内存KB)"""
+    db.session.remove()
+    SeatCounter.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return result, elapsed, peak / 1024
+
+
+def run(sizes):
+    app, _ = create_bench_app()
+    rng = random.Random(42)
+    with app.app_context():
+        student_ids = seed_students(STUDENTS)
+        # 只借用 seed_offering 创建课程与教师，开课记录由 grow_offerings 批量写入
+        db.session.expunge(seed_offering('2024-1-M-SEED', 'M000', teacher_id=TEACHER_ID))
+        db.session.commit()
+
+        print(f"{'开课数':>8} {'原实现(ms)':>11} {'原峰值(KB)':>11} {'聚合(ms)':>9} {'聚合峰值(KB)':>13} "
+              f"{'教师统计(ms)':>12} {'教师峰值(KB)':>12}")
+        current = 0
+        for size in sorted(sizes):
+            grow_offerings(current, size, student_ids, rng)
+            current = size
+
+            legacy, legacy_ms, legacy_kb = measure(lambda: legacy_enrollment_statistics('2024', 1))
+            stats, stats_ms, stats_kb = measure(
+                lambda: CourseStatisticsService.get_course_enrollment_statistics('2024', 1)
+            )
+            _, teacher_ms, teacher_kb = measure(
+                lambda: CourseStatisticsService.get_teacher_course_statistics(TEACHER_ID, '2024', 1)
+            )
+            for key, value in legacy.items():
+                assert stats[key] == value, (key, stats[key], value)
+
+            print(f"{size:>8} {legacy_ms:>11.1f} {legacy_kb:>11.0f} {stats_ms:>9.1f} {stats_kb:>13.0f} "
+                  f"{teacher_ms:>12.1f} {teacher_kb:>12.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='选课统计内存回归基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    args = parser.parse_args()
+    run(args.sizes)
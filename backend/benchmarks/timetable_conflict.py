@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+时间冲突检测微基准
+对比原"查询已选课程 + Python 循环"方式与周课表位图方式，
+分别在学生已选 10 / 50 / 200 门课程时测量单次冲突检测耗时
+
+用法: python benchmarks/timetable_conflict.py --rounds 200
+"""
+import argparse
+import random
+import time
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.models import CourseOffering, Enrollment
+from app.services.timetable_service import TimetableCache, WeeklyTimetable
+
+
+def legacy_find_conflict(student_id, new_offering):
+    """原实现：每次查询全部已选课程后逐个比较"""
+    enrolled_offerings = db.session.query(CourseOffering).join(Enrollment).filter(
+        Enrollment.student_id == student_id,
+        CourseOffering.day_of_week.isnot(None),
+        CourseOffering.start_time.isnot(None),
+        CourseOffering.end_time.isnot(None)
+    ).all()
+    for existing in enrolled_offerings:
+        if existing.day_of_week == new_offering.day_of_week and not (
+            existing.end_time <= new_offering.start_time or new_offering.end_time <= existing.start_time
+        ):
+            return existing.course.course_name
+    return None
+
+
+def timed(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def run(sizes, rounds):
+    app, _ = create_bench_app()
+    rng = random.Random(42)
+
+    with app.app_context():
+        student_ids = seed_students(len(sizes))
+        # 候选开课：周一到周日，08:00-21:00 之间的 50 分钟课程
+        total = max(sizes) + 1
+        for i in range(total):
+            hour = 8 + rng.randrange(13)
+            seed_offering(
+                f'2024-1-B{i:04d}-T0001', f'B{i:04d}', max_students=1000,
+                day_of_week=rng.randint(1, 7), start=(hour, 0), end=(hour, 50)
+            )
+        db.session.commit()
+        probe = db.session.get(CourseOffering, f'2024-1-B{total - 1:04d}-T0001')
+
+        print(f"{'已选课程数':>10} {'查询+循环(us)':>16} {'位图-缓存命中(us)':>20} {'位图-纯内存(us)':>18}")
+        for student_id, size in zip(student_ids, sizes):
+            db.session.add_all(
+                Enrollment(offering_id=f'2024-1-B{i:04d}-T0001', student_id=student_id)
+                for i in range(size)
+            )
+            db.session.commit()
+
+            legacy_us = timed(lambda: legacy_find_conflict(student_id, probe), rounds)
+            TimetableCache.invalidate(student_id)
+            cached_us = timed(lambda: TimetableCache.get(student_id).find_conflict(
+                probe.day_of_week, probe.start_time, probe.end_time), rounds)
+            timetable = WeeklyTimetable.load(student_id)
+            memory_us = timed(lambda: timetable.find_conflict(
+                probe.day_of_week, probe.start_time, probe.end_time), rounds * 100)
+
+            assert (legacy_find_conflict(student_id, probe) is None) == \
+                (timetable.find_conflict(probe.day_of_week, probe.start_time, probe.end_time) is None)
+            print(f"{size:>10} {legacy_us:>16.1f} {cached_us:>20.1f} {memory_us:>18.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='时间冲突检测微基准')
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+    run([10, 50, 200], args.rounds)
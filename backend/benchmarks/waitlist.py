@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+候补名单基准
+1. 满员课程上，对比"反复调用选课接口"与"轮询候补状态（ETag 命中返回 304）"的单次请求耗时
+2. 多线程并发退课，验证名额按加入顺序递补给候补学生，且选课人数始终不超过容量
+
+用法: python benchmarks/waitlist.py --capacity 100 --waiting 300 --polls 2000 --workers 16
+"""
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_jwt_extended import create_access_token
+
+from common import create_bench_app, seed_students, seed_offering
+from app import db
+from app.models import Enrollment, WaitlistEntry
+from app.services.seat_counter_service import SeatCounter
+from app.services.student_service import StudentService
+from app.services.waitlist_service import WaitlistService, STATUS_PROMOTED
+
+OFFERING_ID = '2024-1-W0001-T0001'
+
+
+def run(capacity, waiting, polls, workers):
+    # 对比的是选课逻辑本身的拒绝开销，关闭按用户限流
+    app, _ = create_bench_app(RATE_LIMIT_RATE=0)
+    with app.app_context():
+        student_ids = seed_students(capacity + waiting)
+        seed_offering(OFFERING_ID, 'W0001', max_students=capacity, day_of_week=1, start=(8, 0), end=(9, 50))
+        db.session.commit()
+        enrolled, queued = student_ids[:capacity], student_ids[capacity:]
+        for student_id in enrolled:
+            StudentService.enroll_in_course(student_id, OFFERING_ID)
+        for student_id in queued:
+            WaitlistService.join(student_id, OFFERING_ID)
+        token = create_access_token(identity=queued[-1], additional_claims={'type': 'student'})
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    started = time.perf_counter()
+    for _ in range(polls):
+        client.post(f'/api/student/courses/{OFFERING_ID}/enroll', headers=headers)
+    enroll_us = (time.perf_counter() - started) * 1e6 / polls
+
+    etag = client.get('/api/student/waitlist', headers=headers).headers.get('ETag')
+    etag = client.get('/api/student/waitlist', headers=headers).headers.get('ETag')
+    statuses = Counter()
+    started = time.perf_counter()
+    for _ in range(polls):
+        statuses[client.get('/api/student/waitlist', headers={**headers, 'If-None-Match': etag}).status_code] += 1
+    poll_us = (time.perf_counter() - started) * 1e6 / polls
+    print(f"满员课程重试选课: {enroll_us:.0f} µs/次；候补状态轮询: {poll_us:.0f} µs/次 {dict(statuses)}")
+
+    def drop(student_id):
+        with app.app_context():
+            StudentService.drop_course(student_id, OFFERING_ID)
+            return SeatCounter.get(OFFERING_ID)
+
+    drops = min(capacity, waiting)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(drop, enrolled[:drops]))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        promoted = [row[0] for row in db.session.query(WaitlistEntry.student_id).filter_by(
+            offering_id=OFFERING_ID, status=STATUS_PROMOTED
+        ).order_by(WaitlistEntry.entry_id).all()]
+        rows = Enrollment.query.filter_by(offering_id=OFFERING_ID).count()
+        print(f"并发退课 {drops} 次（{workers} 线程）: {elapsed:.2f}s；递补 {len(promoted)} 人；"
+              f"选课记录 {rows}，计数器 {SeatCounter.get(OFFERING_ID)}，退课期间计数器最大值 {max(counts)}")
+        assert promoted == queued[:drops], "递补顺序与加入顺序不一致"
+        assert rows == capacity and max(counts) <= capacity
+        print("递补顺序与加入顺序一致，未超选")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='候补名单基准')
+    parser.add_argument('--capacity', type=int, default=100)
+    parser.add_argument('--waiting', type=int, default=300)
+    parser.add_argument('--polls', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    run(args.capacity, args.waiting, args.polls, args.workers)
@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app
 from app.models import db, Student, CourseOffering, Enrollment
+from app.services.ledger_service import CreditLedgerService
 from sqlalchemy import text
 import random
 
@@ -59,6 +60,10 @@ def create_sample_enrollments():
             db.session.commit()
             print(f"成功创建 {enrollment_count} 条选课记录")
             
+            # 选课记录直接写入，需要重建学分台账
+            CreditLedgerService.rebuild()
+            print("已重建学分台账")
+            
             # 显示统计信息
             print("\n选课统计:")
             for offering in offerings:
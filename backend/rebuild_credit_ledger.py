@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+全量重建学生学分台账
+用一条聚合查询按 (学生, 学年, 学期) 重新生成 student_credit_ledger，
+并回写所有学生的 total_credits
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db, Student
+from app.services.ledger_service import CreditLedgerService
+
+def rebuild_credit_ledger():
+    """重建学分台账"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            db.create_all()
+            row_count = CreditLedgerService.rebuild()
+            student_count = Student.query.count()
+            print(f"学分台账重建完成：{student_count} 名学生，{row_count} 条学期台账")
+        except Exception as e:
+            print(f"重建学分台账失败: {e}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    rebuild_credit_ledger()
@@ -1,10 +1,24 @@
-from app import create_app, db
-
-app = create_app()
-
-if __name__ == '__main__':
-    with app.app_context():
-        # 创建数据库表（如果不存在）
-        db.create_all()
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
+from app import create_app, db
+from app.services.prerequisite_service import PrerequisiteCache
+from app.services.seat_counter_service import SeatCounter
+from app.services.revocation_service import TokenRevocation
+
+app = create_app()
+
+if __name__ == '__main__':
+    with app.app_context():
+        # 创建数据库表（如果不存在）
+        db.create_all()
+    
+    # 预先构建先修关系图缓存
+    PrerequisiteCache.warm(app)
+    
+    # 定期对账选课人数计数器
+    if app.config['SEAT_RECONCILE_INTERVAL'] > 0:
+        SeatCounter.start_reconciler(app, app.config['SEAT_RECONCILE_INTERVAL'])
+    
+    # 定期清理已过期的令牌吊销记录
+    if app.config['REVOCATION_COMPACT_INTERVAL'] > 0:
+        TokenRevocation.start_compactor(app, app.config['REVOCATION_COMPACT_INTERVAL'])
+    
+    app.run(debug=True, host='0.0.0.0', port=5000)
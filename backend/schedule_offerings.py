@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+学期自动排课
+为指定学期内尚未排时间的开课分配上课时间与教室：教室、教师不重复占用，
+教室容量满足选课上限，并按历史选课中的共同选修人数尽量减少学生冲突。
+默认只输出方案，加 --apply 后写回数据库
+
+用法: python schedule_offerings.py --year 2024 --semester 1 --rooms rooms.json
+     [--availability availability.json] [--restarts 8] [--workers 4] [--iterations 50000] [--apply]
+
+rooms.json:         [{"location": "教学楼A101", "capacity": 60}, ...]（也可以是 location,capacity 两列的 CSV）
+availability.json:  {"T001": [{"day_of_week": 1, "start_time": "08:00"}, ...]}
+"""
+
+import argparse
+import csv
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db
+from app.services.exceptions import ServiceError
+from app.services.schedule_solver import ScheduleSolverService, DEFAULT_RESTARTS, DEFAULT_ITERATIONS
+
+def load_rooms(path):
+    """读取教室列表（JSON 或 CSV）"""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            return [{'location': row['location'], 'capacity': int(row['capacity'])}
+                    for row in csv.DictReader(f)]
+        return json.load(f)
+
+def schedule_offerings(args):
+    """求解并输出排课方案"""
+    app = create_app()
+    availability = None
+    if args.availability:
+        with open(args.availability, encoding='utf-8') as f:
+            availability = json.load(f)
+
+    with app.app_context():
+        try:
+            result = ScheduleSolverService.solve_term(
+                args.year, args.semester, load_rooms(args.rooms),
+                teacher_availability=availability,
+                restarts=args.restarts, iterations=args.iterations,
+                workers=args.workers or app.config['SCHEDULER_WORKERS'] or None,
+                seed=args.seed, apply=args.apply
+            )
+        except ServiceError as e:
+            db.session.rollback()
+            print(f"自动排课失败: {e.message}")
+            return 1
+
+    for item in result['assignments']:
+        print(f"{item['offering_id']}\t周{item['day_of_week']}\t{item['start_time']}-{item['end_time']}\t"
+              f"{item['location']}\t{item['teacher_id']}")
+    print(f"\n待排 {result['pending_count']} 门（已排 {result['fixed_count']} 门保持不变），"
+          f"安排 {result['placed_count']} 门，无法安排 {len(result['unplaced'])} 门")
+    for offering_id in result['unplaced']:
+        print(f"  无法安排: {offering_id}")
+    print(f"学生冲突估计: {result['student_conflicts']}（最优种子 {result['best_seed']}，{result['workers']} 个进程）")
+    for run in result['restarts']:
+        print(f"  种子 {run['seed']}: 冲突 {run['student_conflicts']}，未安排 {run['unplaced']}，{run['seconds']}s")
+    timings = result['timings']
+    print(f"耗时: 加载 {timings['load_ms']} ms，求解 {timings['solve_ms']} ms"
+          + (f"，写回 {timings['apply_ms']} ms" if 'apply_ms' in timings else ''))
+    if result['applied']:
+        print(f"已写回 {result['applied_count']} 门开课，跳过 {len(result['skipped'])} 门")
+        for item in result['skipped']:
+            print(f"  跳过 {item['offering_id']}: {item['reason']}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='学期自动排课')
+    parser.add_argument('--year', required=True, help='学年，如 2024')
+    parser.add_argument('--semester', type=int, required=True, choices=(0, 1), help='学期：1 第一学期 / 0 第二学期')
+    parser.add_argument('--rooms', required=True, help='教室列表文件（JSON 或 CSV）')
+    parser.add_argument('--availability', help='教师可用节次（JSON），未列出的教师全部节次可用')
+    parser.add_argument('--restarts', type=int, default=DEFAULT_RESTARTS, help='随机重启次数')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='每次重启的局部搜索步数')
+    parser.add_argument('--workers', type=int, default=0, help='并行进程数，默认取 SCHEDULER_WORKERS 或 CPU 核数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--apply', action='store_true', help='把方案写回数据库')
+    sys.exit(schedule_offerings(parser.parse_args()))
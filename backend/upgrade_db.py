@@ -53,11 +53,38 @@ def upgrade_database():
         """)
         print("确保先修关系表存在")
         
+        # 创建学分台账表（如果不存在），创建后需运行 rebuild_credit_ledger.py 生成数据
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS student_credit_ledger (
+                student_id VARCHAR(12) NOT NULL,
+                academic_year VARCHAR(4) NOT NULL,
+                semester BOOLEAN NOT NULL,
+                enrolled_courses INTEGER NOT NULL DEFAULT 0,
+                enrolled_credits FLOAT NOT NULL DEFAULT 0,
+                scored_courses INTEGER NOT NULL DEFAULT 0,
+                scored_credits FLOAT NOT NULL DEFAULT 0,
+                score_credit_sum FLOAT NOT NULL DEFAULT 0,
+                passed_courses INTEGER NOT NULL DEFAULT 0,
+                earned_credits FLOAT NOT NULL DEFAULT 0,
+                passed_score_credit_sum FLOAT NOT NULL DEFAULT 0,
+                grade_excellent INTEGER NOT NULL DEFAULT 0,
+                grade_good INTEGER NOT NULL DEFAULT 0,
+                grade_fair INTEGER NOT NULL DEFAULT 0,
+                grade_pass INTEGER NOT NULL DEFAULT 0,
+                grade_fail INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME,
+                PRIMARY KEY (student_id, academic_year, semester),
+                FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE
+            )
+        """)
+        print("确保学分台账表存在")
+        
         # 创建索引以提高查询性能
         indexes = [
             "CREATE INDEX IF NOT EXISTS idx_course_offerings_time ON course_offerings(day_of_week, start_time, end_time)",
             "CREATE INDEX IF NOT EXISTS idx_course_offerings_status ON course_offerings(status)",
-            "CREATE INDEX IF NOT EXISTS idx_course_offerings_location ON course_offerings(location)"
+            "CREATE INDEX IF NOT EXISTS idx_course_offerings_location ON course_offerings(location)",
+            "CREATE INDEX IF NOT EXISTS ix_enrollments_student_id ON enrollments(student_id)"
         ]
         
         for index_sql in indexes:
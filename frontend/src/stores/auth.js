@@ -1,93 +1,145 @@
-import { defineStore } from 'pinia'
-import api from '@/utils/api'
-import { useUserStore } from './user'
-
-export const useAuthStore = defineStore('auth', {
-  state: () => ({
-    user: null,
-    token: localStorage.getItem('token') || null,
-    isAuthenticated: false
-  }),
-
-  getters: {
-    userType: (state) => state.user?.type || null,
-    userName: (state) => state.user?.name || '',
-    userId: (state) => state.user?.id || ''
-  },
-  actions: {
-    async login(credentials) {
-      try {
-        const response = await api.post('/auth/login', credentials)
-        
-        this.token = response.access_token
-        this.user = response.user
-        this.isAuthenticated = true
-        
-        // 保存token到localStorage
-        localStorage.setItem('token', this.token)
-        localStorage.setItem('user', JSON.stringify(this.user))
-        
-        // 设置用户角色并获取详细信息
-        const userStore = useUserStore()
-        userStore.setUserRole(this.user.type)
-        await userStore.fetchUserProfile()
-        
-        return response
-      } catch (error) {
-        // 抛出后端返回的实际错误信息
-        throw error.response?.data || error
-      }
-    },
-
-    async changePassword(passwordData) {
-      try {
-        const response = await api.post('/auth/change-password', passwordData)
-        return response
-      } catch (error) {
-        throw error
-      }
-    },
-
-    async verifyToken() {
-      if (!this.token) {
-        return false
-      }
-
-      try {
-        const response = await api.post('/auth/verify-token')
-        return true
-      } catch (error) {
-        this.logout()
-        return false
-      }
-    },    logout() {
-      this.user = null
-      this.token = null
-      this.isAuthenticated = false
-      
-      // 清空用户store
-      const userStore = useUserStore()
-      userStore.clearUser()
-      
-      localStorage.removeItem('token')
-      localStorage.removeItem('user')
-    },
-
-    // 初始化认证状态（从localStorage恢复）
-    async initAuth() {
-      const token = localStorage.getItem('token')
-      const user = localStorage.getItem('user')
-      
-      if (token && user) {
-        this.token = token
-        this.user = JSON.parse(user)
-        this.isAuthenticated = true
-        
-        // 初始化用户store
-        const userStore = useUserStore()
-        userStore.setUserRole(this.user.type)
-        await userStore.fetchUserProfile()
-      }
-    }
-  }
-})
+import { defineStore } from 'pinia'
+import axios from 'axios'
+import api from '@/utils/api'
+import { useUserStore } from './user'
+
+// 进行中的刷新请求
+let refreshing = null
+
+export const useAuthStore = defineStore('auth', {
+  state: () => ({
+    user: null,
+    token: localStorage.getItem('token') || null,
+    refreshToken: localStorage.getItem('refreshToken') || null,
+    isAuthenticated: false
+  }),
+
+  getters: {
+    userType: (state) => state.user?.type || null,
+    userName: (state) => state.user?.name || '',
+    userId: (state) => state.user?.id || ''
+  },
+  actions: {
+    async login(credentials) {
+      try {
+        const response = await api.post('/auth/login', credentials)
+        
+        this.setTokens(response)
+        this.user = response.user
+        this.isAuthenticated = true
+        
+        // 保存用户信息到localStorage
+        localStorage.setItem('user', JSON.stringify(this.user))
+        
+        // 设置用户角色并获取详细信息
+        const userStore = useUserStore()
+        userStore.setUserRole(this.user.type)
+        await userStore.fetchUserProfile()
+        
+        return response
+      } catch (error) {
+        // 抛出后端返回的实际错误信息
+        throw error.response?.data || error
+      }
+    },
+
+    async changePassword(passwordData) {
+      try {
+        const response = await api.post('/auth/change-password', passwordData)
+        // 修改密码后旧令牌已被吊销，换用服务端返回的新令牌
+        this.setTokens(response)
+        return response
+      } catch (error) {
+        throw error
+      }
+    },
+
+    async verifyToken() {
+      if (!this.token) {
+        return false
+      }
+
+      try {
+        const response = await api.post('/auth/verify-token')
+        // 令牌不再携带用户资料，用服务端返回的最新资料刷新本地缓存
+        if (response.user_data) {
+          this.user = response.user_data
+          localStorage.setItem('user', JSON.stringify(this.user))
+        }
+        return true
+      } catch (error) {
+        this.logout(false)
+        return false
+      }
+    },
+
+    // 保存访问令牌与刷新令牌（响应中没有的保持不变）
+    setTokens({ access_token, refresh_token }) {
+      if (access_token) {
+        this.token = access_token
+        localStorage.setItem('token', access_token)
+      }
+      if (refresh_token) {
+        this.refreshToken = refresh_token
+        localStorage.setItem('refreshToken', refresh_token)
+      }
+    },
+
+    // 访问令牌过期后用刷新令牌换取新的访问令牌，并发请求共用同一次刷新
+    refreshAccessToken() {
+      if (!this.refreshToken) {
+        return Promise.reject(new Error('no refresh token'))
+      }
+      if (!refreshing) {
+        // 不经过 api 的拦截器，避免刷新失败时递归处理 401
+        refreshing = axios.post('/api/auth/refresh', null, {
+          headers: { Authorization: `Bearer ${this.refreshToken}` }
+        }).then(response => {
+          this.setTokens(response.data)
+          return this.token
+        }).finally(() => {
+          refreshing = null
+        })
+      }
+      return refreshing
+    },
+
+    // revoke 为 true 时通知服务端吊销当前令牌（令牌已失效时无需吊销）
+    logout(revoke = true) {
+      if (revoke && this.token) {
+        axios.post('/api/auth/logout', { refresh_token: this.refreshToken }, {
+          headers: { Authorization: `Bearer ${this.token}` }
+        }).catch(() => {})
+      }
+      this.user = null
+      this.token = null
+      this.refreshToken = null
+      this.isAuthenticated = false
+      
+      // 清空用户store
+      const userStore = useUserStore()
+      userStore.clearUser()
+      
+      localStorage.removeItem('token')
+      localStorage.removeItem('refreshToken')
+      localStorage.removeItem('user')
+    },
+
+    // 初始化认证状态（从localStorage恢复）
+    async initAuth() {
+      const token = localStorage.getItem('token')
+      const user = localStorage.getItem('user')
+      
+      if (token && user) {
+        this.token = token
+        this.user = JSON.parse(user)
+        this.isAuthenticated = true
+        
+        // 初始化用户store
+        const userStore = useUserStore()
+        userStore.setUserRole(this.user.type)
+        await userStore.fetchUserProfile()
+      }
+    }
+  }
+})